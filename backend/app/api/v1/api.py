@@ -1,15 +1,68 @@
 # v1ルーターのインクルード
 
 from fastapi import APIRouter
+from app.core.config import settings
 from app.api.v1.endpoints import users
 from app.api.v1.endpoints import tasks
 from app.api.v1.endpoints import categories
 from app.api.v1.endpoints import location
 from app.api.v1.endpoints import notification
+from app.api.v1.endpoints import sync
+from app.api.v1.endpoints import events
+
+
+def with_async_routes(sync_router: APIRouter, async_router: APIRouter) -> APIRouter:
+    """
+    同期版のルートのうち、非同期版（パスとメソッドが同じもの）があるものを置き換える。
+    "/stats" と "/{task_id}" のような定義順の意味を保つため、同期版の並び順のまま置き換える。
+    """
+    async_routes = {
+        (route.path, method): route for route in async_router.routes for method in route.methods
+    }
+    merged = APIRouter()
+    used = set()
+    for route in sync_router.routes:
+        replacement = next(
+            (async_routes[(route.path, m)] for m in route.methods if (route.path, m) in async_routes),
+            None,
+        )
+        if replacement is None:
+            merged.routes.append(route)
+        elif id(replacement) not in used:
+            merged.routes.append(replacement)
+            used.add(id(replacement))
+    merged.routes.extend(route for route in async_router.routes if id(route) not in used)
+    return merged
+
+
+if settings.DB_ASYNC:
+    from app.api.v1.endpoints_async import (
+        categories as async_categories,
+        location as async_location,
+        notification as async_notification,
+        sync as async_sync,
+        tasks as async_tasks,
+        users as async_users,
+    )
+    users_router = with_async_routes(users.router, async_users.router)
+    tasks_router = with_async_routes(tasks.router, async_tasks.router)
+    categories_router = with_async_routes(categories.router, async_categories.router)
+    location_router = with_async_routes(location.router, async_location.router)
+    sync_router = with_async_routes(sync.router, async_sync.router)
+    notification_router = with_async_routes(notification.router, async_notification.router)
+else:
+    users_router = users.router
+    tasks_router = tasks.router
+    categories_router = categories.router
+    location_router = location.router
+    sync_router = sync.router
+    notification_router = notification.router
 
 api_router = APIRouter()
-api_router.include_router(users.router, tags=["users"], prefix="/users")
-api_router.include_router(tasks.router, tags=["tasks"], prefix="/tasks")
-api_router.include_router(categories.router, tags=["categories"], prefix="/categories")
-api_router.include_router(location.router, tags=["locations"], prefix="/locations")
-api_router.include_router(notification.router, tags=["notifications"])
\ No newline at end of file
+api_router.include_router(users_router, tags=["users"], prefix="/users")
+api_router.include_router(tasks_router, tags=["tasks"], prefix="/tasks")
+api_router.include_router(categories_router, tags=["categories"], prefix="/categories")
+api_router.include_router(location_router, tags=["locations"], prefix="/locations")
+api_router.include_router(sync_router, tags=["sync"], prefix="/sync")
+api_router.include_router(events.router, tags=["events"], prefix="/events")
+api_router.include_router(notification_router, tags=["notifications"])
@@ -1,17 +1,23 @@
 # タグ/カテゴリ管理
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
 from typing import List
 
 from app.db.session import get_db
+from app.core.conditional import validate_collection
+from app.core.serialization import RowProjection
 from app.models.category import Category
 from app.models.user import User
 from app.schemas.category import CategoryCreate, CategoryResponse, CategoryUpdate
+from app.services.sync_service import record_change, record_changes, record_deletion
 from app.api.v1.endpoints.users import get_current_user
 
 router = APIRouter()
 
+# 一覧はORMオブジェクトを作らず、CategoryResponse の列だけを取得してそのまま JSON にする
+CATEGORY_ROWS = RowProjection(Category, CategoryResponse)
+
 # デフォルトカテゴリの定義
 DEFAULT_CATEGORIES = [
     {"name": "家事", "color": "#10B981"},    # グリーン
@@ -20,14 +26,15 @@ DEFAULT_CATEGORIES = [
 ]
 
 
-@router.get("/", response_model=List[CategoryResponse])
+@router.get("/", response_model=List[CategoryResponse], dependencies=[Depends(validate_collection)])
 def read_categories(
+    response: Response,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """ユーザーのカテゴリ一覧を取得"""
-    categories = db.query(Category).filter(Category.user_id == current_user.id).all()
-    return categories
+    rows = db.execute(CATEGORY_ROWS.select().where(Category.user_id == current_user.id)).all()
+    return CATEGORY_ROWS.response(rows, response)
 
 
 @router.post("/", response_model=CategoryResponse)
@@ -44,6 +51,8 @@ def create_category(
         user_id=current_user.id
     )
     db.add(db_category)
+    db.flush()
+    record_change(db, current_user.id, "category", db_category.id)
     db.commit()
     db.refresh(db_category)
     return db_category
@@ -71,6 +80,8 @@ def initialize_default_categories(
             created_categories.append(db_category)
     
     if created_categories:
+        db.flush()
+        record_changes(db, current_user.id, (("category", cat.id, False) for cat in created_categories))
         db.commit()
         for cat in created_categories:
             db.refresh(cat)
@@ -79,7 +90,7 @@ def initialize_default_categories(
     return db.query(Category).filter(Category.user_id == current_user.id).all()
 
 
-@router.get("/{category_id}", response_model=CategoryResponse)
+@router.get("/{category_id}", response_model=CategoryResponse, dependencies=[Depends(validate_collection)])
 def read_category(
     *,
     db: Session = Depends(get_db),
@@ -115,6 +126,7 @@ def update_category(
     update_data = category_in.model_dump(exclude_unset=True)
     for key, value in update_data.items():
         setattr(category, key, value)
+    record_change(db, current_user.id, "category", category.id)
     
     db.add(category)
     db.commit()
@@ -137,6 +149,7 @@ def delete_category(
     if not category:
         raise HTTPException(status_code=404, detail="Category not found")
     
+    record_deletion(db, current_user.id, "category", category.id)
     db.delete(category)
     db.commit()
     return {"message": "Category deleted"}
\ No newline at end of file
@@ -0,0 +1,108 @@
+# 変更通知ストリーム (Server-Sent Events)
+# 他の端末での変更をリアルタイムに受け取る。通知はIDだけなので、内容は /sync?since= で取得する
+
+import asyncio
+import json
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from fastapi.security import OAuth2PasswordBearer
+from starlette.background import BackgroundTask
+
+from app.core.config import settings
+from app.core.events import RESYNC, event_broker
+from app.core.security import get_current_user
+from app.services.sync_service import collection_version
+
+router = APIRouter()
+
+# EventSource はヘッダを付けられないため、クエリの access_token も受け付ける
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/users/login/", auto_error=False)
+
+
+def _authenticate(request: Request, token: str) -> int:
+    # ストリームの間DB接続を保持しないよう、DBアクセスは短いセッションで行う
+    with request.app.state.SessionLocal() as db:
+        return get_current_user(db, token).id
+
+
+def _current_seq(request: Request, user_id: int) -> int:
+    with request.app.state.SessionLocal() as db:
+        return collection_version(db, user_id)[0]
+
+
+def format_event(item: dict) -> str:
+    """SSE の1イベント分の文字列にする。変更通知は seq を id にする（再接続時の Last-Event-ID）"""
+    lines = []
+    if "seq" in item:
+        lines.append(f"id: {item['seq']}")
+    lines.append(f"event: {item['type']}")
+    lines.append(f"data: {json.dumps(item)}")
+    return "\n".join(lines) + "\n\n"
+
+
+@router.get("/stream")
+async def stream_events(
+    request: Request,
+    header_token: Optional[str] = Depends(optional_oauth2_scheme),
+    access_token: Optional[str] = Query(None),
+    last_event_id: Optional[int] = Header(None),
+):
+    """
+    ログインユーザーのタスク・カテゴリ・場所の変更を text/event-stream で送る。
+    event: change は1件の変更 (seq, entity, id, deleted)、
+    event: resync は取りこぼしがあったことを表す（/sync で取り直す）。
+    接続は EVENT_STREAM_MAX_SECONDS で閉じ、クライアントは Last-Event-ID 付きで再接続する。
+    """
+    token = header_token or access_token
+    if not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    user_id = await run_in_threadpool(_authenticate, request, token)
+
+    subscription = event_broker.hub.subscribe(user_id)
+    if subscription is None:
+        raise HTTPException(status_code=429, detail="Too many event streams")
+
+    # 購読を始めてから現在の番号を見る。再接続までの間に変更があれば再同期を促す
+    if last_event_id is not None:
+        try:
+            current_seq = await run_in_threadpool(_current_seq, request, user_id)
+        except BaseException:
+            event_broker.hub.unsubscribe(subscription)
+            raise
+        if current_seq > last_event_id:
+            subscription.offer(RESYNC)
+
+    async def unsubscribe():
+        event_broker.hub.unsubscribe(subscription)
+
+    async def body():
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.EVENT_STREAM_MAX_SECONDS
+        try:
+            # 切断時のクライアントの再接続間隔 (ミリ秒)
+            yield "retry: 3000\n\n"
+            while (remaining := deadline - loop.time()) > 0:
+                item = await subscription.get(timeout=min(settings.EVENT_HEARTBEAT_SECONDS, remaining))
+                if item is None:
+                    # プロキシに切られないよう、一定時間ごとにコメント行を送る
+                    yield ": keep-alive\n\n"
+                else:
+                    yield format_event(item)
+        finally:
+            await unsubscribe()
+
+    # 送信が詰まると body() の読み出しが止まり、接続ごとのキューが上限に達した分は再同期の通知にまとめられる
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        # 本文の送信が始まる前に切断された場合も購読を解除する
+        background=BackgroundTask(unsubscribe),
+    )
@@ -1,42 +1,55 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
-import math
+from datetime import datetime
 
 from app.db.session import get_db
+from app.core.conditional import validate_collection
+from app.core.serialization import RowProjection
 from app.models.location import Location
 from app.models.user import User
-from app.schemas.location import LocationCreate, LocationResponse, LocationUpdate, NearbyLocationResponse
+from app.schemas.location import (
+    GeofenceBatchRequest, GeofenceBatchResponse, GeofenceSessionUpdate, GeofenceTransition,
+    LocationCreate, LocationResponse, LocationUpdate, NearbyLocationResponse,
+)
 from app.api.v1.endpoints.users import get_current_user
+from app.models.geofence import GeofenceSession
+from app.services.location_service import (
+    clear_geofence_sessions, evaluate_trace, find_nearest_location, update_geofence_session,
+)
+from app.services.calendar_service import as_utc, utc_now
+from app.services.sync_service import record_change, record_deletion
 
 router = APIRouter()
 
+# 一覧はORMオブジェクトを作らず、LocationResponse の列だけを取得してそのまま JSON にする
+LOCATION_ROWS = RowProjection(Location, LocationResponse)
 
-def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-    """
-    Haversine公式を使用して2点間の距離（メートル）を計算
-    """
-    R = 6371000  # 地球の半径（メートル）
-    
-    phi1 = math.radians(lat1)
-    phi2 = math.radians(lat2)
-    delta_phi = math.radians(lat2 - lat1)
-    delta_lambda = math.radians(lon2 - lon1)
-    
-    a = math.sin(delta_phi / 2) ** 2 + \
-        math.cos(phi1) * math.cos(phi2) * math.sin(delta_lambda / 2) ** 2
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-    
-    return R * c
+
+def session_transitions(
+    previous_id: Optional[int], current_id: Optional[int], distance: float, timestamp: datetime
+) -> List[GeofenceTransition]:
+    """前回と今回のエリアから exit/enter イベントを作る"""
+    transitions = []
+    if current_id != previous_id:
+        if previous_id is not None:
+            transitions.append(GeofenceTransition(timestamp=timestamp, event="exit", location_id=previous_id))
+        if current_id is not None:
+            transitions.append(GeofenceTransition(
+                timestamp=timestamp, event="enter", location_id=current_id, distance=distance
+            ))
+    return transitions
 
 
 # 場所一覧取得
-@router.get("/", response_model=List[LocationResponse])
+@router.get("/", response_model=List[LocationResponse], dependencies=[Depends(validate_collection)])
 def read_locations(
+    response: Response,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    return db.query(Location).filter(Location.owner_id == current_user.id).all()
+    rows = db.execute(LOCATION_ROWS.select().where(Location.owner_id == current_user.id)).all()
+    return LOCATION_ROWS.response(rows, response)
 
 
 # 現在地から近くの場所を検索
@@ -50,21 +63,10 @@ def find_nearby_location(
     """
     現在地から最も近い登録場所を検索し、その場所のエリア内であれば返す
     """
-    locations = db.query(Location).filter(Location.owner_id == current_user.id).all()
-    
-    nearest_location = None
-    min_distance = float('inf')
-    
-    for location in locations:
-        distance = calculate_distance(
-            latitude, longitude,
-            location.latitude, location.longitude
-        )
-        
-        # エリア内かつ最も近い場所を検索
-        if distance <= location.radius and distance < min_distance:
-            min_distance = distance
-            nearest_location = location
+    # 範囲で候補を絞り込んでから距離を計算する
+    nearest_location, min_distance = find_nearest_location(
+        db, current_user.id, latitude, longitude
+    )
     
     if nearest_location:
         return NearbyLocationResponse(
@@ -81,6 +83,75 @@ def find_nearby_location(
     return None
 
 
+# 位置情報の列をまとめて判定し、エリアの出入りを返す
+@router.post("/nearby/batch", response_model=GeofenceBatchResponse)
+def evaluate_location_trace(
+    batch_in: GeofenceBatchRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    端末がまとめて送ってきた位置情報を時刻順に判定し、
+    エリアに入った(enter)・出た(exit)イベントだけを返す
+    """
+    fixes = sorted(batch_in.fixes, key=lambda fix: fix.timestamp)
+    changes = evaluate_trace(
+        db, current_user.id,
+        [fix.latitude for fix in fixes],
+        [fix.longitude for fix in fixes],
+        batch_in.current_location_id,
+    )
+
+    transitions = []
+    state = batch_in.current_location_id
+    for index, location_id, distance in changes:
+        timestamp = fixes[index].timestamp
+        if state is not None:
+            transitions.append(GeofenceTransition(timestamp=timestamp, event="exit", location_id=state))
+        if location_id is not None:
+            transitions.append(GeofenceTransition(
+                timestamp=timestamp, event="enter", location_id=location_id, distance=distance
+            ))
+        state = location_id
+
+    return GeofenceBatchResponse(transitions=transitions, current_location_id=state)
+
+
+# 現在地を送り、前回からのエリアの出入りだけを受け取る
+@router.post("/session", response_model=GeofenceBatchResponse)
+def update_location_session(
+    update_in: GeofenceSessionUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    サーバー側で最後に居たエリアを覚えておき、変化があった場合だけ
+    exit/enter イベントを返す。エリア内に居続ける間は距離計算1回で済む。
+    """
+    timestamp = as_utc(update_in.timestamp) if update_in.timestamp else utc_now()
+    previous_id, location, distance = update_geofence_session(
+        db, current_user.id, update_in.latitude, update_in.longitude
+    )
+    current_id = location.id if location else None
+    transitions = session_transitions(previous_id, current_id, distance, timestamp)
+    # エリアが変わった場合だけ状態を書き込んでいる
+    if current_id != previous_id:
+        db.commit()
+
+    return GeofenceBatchResponse(transitions=transitions, current_location_id=current_id)
+
+
+# ジオフェンス状態をリセット（ログアウト時など）
+@router.delete("/session")
+def reset_location_session(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    db.query(GeofenceSession).filter(GeofenceSession.user_id == current_user.id).delete()
+    db.commit()
+    return {"message": "Location session reset"}
+
+
 # 場所登録
 @router.post("/", response_model=LocationResponse)
 def create_location(
@@ -90,13 +161,15 @@ def create_location(
 ):
     location = Location(**location_in.model_dump(), owner_id=current_user.id)
     db.add(location)
+    db.flush()
+    record_change(db, current_user.id, "location", location.id)
     db.commit()
     db.refresh(location)
     return location
 
 
 # 場所取得
-@router.get("/{location_id}", response_model=LocationResponse)
+@router.get("/{location_id}", response_model=LocationResponse, dependencies=[Depends(validate_collection)])
 def read_location(
     location_id: int,
     db: Session = Depends(get_db),
@@ -129,6 +202,7 @@ def update_location(
     update_data = location_in.model_dump(exclude_unset=True)
     for key, value in update_data.items():
         setattr(location, key, value)
+    record_change(db, current_user.id, "location", location.id)
     
     db.add(location)
     db.commit()
@@ -149,6 +223,8 @@ def delete_location(
     ).first()
     if not location:
         raise HTTPException(status_code=404, detail="Location not found")
+    clear_geofence_sessions(db, location.id)
+    record_deletion(db, current_user.id, "location", location.id)
     db.delete(location)
     db.commit()
     return {"message": "Location deleted"}
\ No newline at end of file
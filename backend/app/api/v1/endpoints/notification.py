@@ -1,10 +1,10 @@
 from typing import Any
 from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session, select
+from sqlalchemy.orm import Session
 from app.api import deps
 from app.models.user import User
-from app.models.notification import NotificationDevice
 from app.schemas.notification import NotificationDeviceCreate, NotificationDeviceResponse
+from app.services import device_service
 
 router = APIRouter()
 
@@ -16,29 +16,14 @@ def register_device(
 ) -> Any:
     """
     プッシュ通知用のデバイストークンを登録する。
-    既に同じトークンがある場合は登録済みのものを返す。
+    既に同じトークンがある場合は device_type を更新して返す（1文の upsert）。
     """
-    # 既存チェック
-    statement = select(NotificationDevice).where(
-        NotificationDevice.user_id == current_user.id,
-        NotificationDevice.device_token == device_in.device_token
+    device = device_service.register_device(
+        db, current_user.id, device_in.device_token, device_in.device_type
     )
-    existing_device = db.exec(statement).first()
-
-    if existing_device:
-        # 既に存在する場合は更新せずそのまま返す（必要なら最終アクセス日時などを更新）
-        return existing_device
-
-    # 新規作成
-    new_device = NotificationDevice(
-        user_id=current_user.id,
-        device_token=device_in.device_token,
-        device_type=device_in.device_type
-    )
-    db.add(new_device)
+    response = NotificationDeviceResponse.model_validate(device)
     db.commit()
-    db.refresh(new_device)
-    return new_device
+    return response
 
 @router.delete("/users/me/devices/{device_token}")
 def delete_device(
@@ -49,15 +34,8 @@ def delete_device(
     """
     指定されたデバイストークンを削除する（ログアウト時など）。
     """
-    statement = select(NotificationDevice).where(
-        NotificationDevice.user_id == current_user.id,
-        NotificationDevice.device_token == device_token
-    )
-    device = db.exec(statement).first()
-
-    if not device:
+    if not device_service.delete_device(db, current_user.id, device_token):
         raise HTTPException(status_code=404, detail="Device not found")
 
-    db.delete(device)
     db.commit()
-    return {"status": "success", "message": "Device token deleted"}
\ No newline at end of file
+    return {"status": "success", "message": "Device token deleted"}
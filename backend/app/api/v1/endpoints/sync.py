@@ -0,0 +1,24 @@
+# 差分同期（オフライン対応クライアント用）
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from app.db.session import get_db
+from app.models.user import User
+from app.schemas.sync import SyncResponse
+from app.services.sync_service import read_changes
+from app.api.v1.endpoints.users import get_current_user
+
+router = APIRouter()
+
+
+@router.get("/", response_model=SyncResponse)
+def sync_changes(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    since: int = Query(0, ge=0),            # 前回のレスポンスの seq（初回は0）
+    limit: int = Query(500, ge=1, le=5000)
+):
+    """since 以降に変更・削除されたタスク・カテゴリ・場所だけを返す"""
+    # 読み出しのみ（ジャーナルは最初の変更の記録時に作られる）
+    return read_changes(db, current_user.id, since, limit)
@@ -1,29 +1,51 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List, Optional
-from datetime import datetime
+from typing import AsyncIterable, Awaitable, Callable, Iterable, List, Optional, Union
+from datetime import date, datetime
 
 from app.db.session import get_db
+from app.core.conditional import validate_collection
+from app.core.serialization import RowProjection
 from app.models.task import Task
 from app.models.user import User
-from app.schemas.task import TaskCreate, TaskResponse, TaskUpdate
+from app.schemas.task import (
+    TaskBatchRequest, TaskBatchResponse, TaskCalendarResponse, TaskCreate, TaskImportResponse, TaskResponse,
+    TaskUpdate,
+)
+from app.services.task_service import SortBy, SortOrder, apply_task_batch, paginate_tasks, task_stats
+from app.services.calendar_service import parse_calendar_range, task_calendar, utc_now
+from app.services.search_service import search_tasks
+from app.services.task_io_service import (
+    MEDIA_TYPES, TaskFileEncoder, TaskFileError, TaskFileFormat, TaskFileParser, TaskImporter, export_tasks,
+)
+from app.services.task_stats_service import apply_task_change, snapshot
+from app.services.sync_service import record_change, record_deletion
 from app.api.v1.endpoints.users import get_current_user
 
 router = APIRouter()
 
+# 一覧はORMオブジェクトを作らず、TaskResponse の列だけを取得してそのまま JSON にする
+TASK_ROWS = RowProjection(Task, TaskResponse)
+
 @router.get("/stats")
 def get_task_stats(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    start: Optional[datetime] = None,  # 集計期間の開始（期限がこの日時以降）
+    end: Optional[datetime] = None     # 集計期間の終了（期限がこの日時より前）
 ):
-    all_tasks = db.query(Task).filter(Task.owner_id == current_user.id).all()
-    
-    total = len(all_tasks)
-    completed = sum(1 for t in all_tasks if t.is_completed)
-    progress_rate = int((completed / total) * 100) if total > 0 else 0
-    
-    now = datetime.now()
-    overdue = sum(1 for t in all_tasks if not t.is_completed and t.deadline and t.deadline < now)
+    # 期限はタイムゾーンなしのUTCで保存されているため、現在時刻もUTCで比べる
+    stats = task_stats(db, current_user.id, utc_now(), start, end)
+    return {**stats, **task_mood(stats)}
+
+
+def task_mood(stats: dict) -> dict:
+    """集計値からキャラクターの機嫌とメッセージを決める"""
+    total = stats["total"]
+    overdue = stats["overdue"]
+    progress_rate = stats["progress_rate"]
 
     # 機嫌ロジック
     mood = "normal"
@@ -38,27 +60,23 @@ def get_task_stats(
         mood = "happy"
         message = "完璧ね！素晴らしい！"
 
-    return {
-        "total": total,
-        "completed": completed,
-        "overdue": overdue,
-        "progress_rate": progress_rate,
-        "mood": mood,
-        "message": message
-    }
+    return {"mood": mood, "message": message}
 
-@router.get("/", response_model=List[TaskResponse])
+@router.get("/", response_model=List[TaskResponse], dependencies=[Depends(validate_collection)])
 def read_tasks(
+    response: Response,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
-    skip: int = 0,
-    limit: int = 100,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,           # 前ページの X-Next-Cursor の値
+    sort_by: SortBy = "created_at",
+    sort_order: SortOrder = "desc",
     is_completed: Optional[bool] = None,    # 完了状態で絞り込み
     location_id: Optional[int] = None,      # 場所で絞り込み
     start_date: Optional[datetime] = None,  # カレンダー用開始日
     end_date: Optional[datetime] = None     # カレンダー用終了日
 ):
-    query = db.query(Task).filter(Task.owner_id == current_user.id)
+    query = db.query(*TASK_ROWS.columns).filter(Task.owner_id == current_user.id)
 
     # 各条件があればフィルタに追加
     if is_completed is not None:
@@ -70,7 +88,120 @@ def read_tasks(
     if end_date:
         query = query.filter(Task.deadline <= end_date)
 
-    return query.offset(skip).limit(limit).all()
+    # (ソートキー, id) のキーセットでページング。次ページがあればヘッダで返す
+    rows, next_cursor = paginate_tasks(query, sort_by, sort_order, cursor, limit)
+    return TASK_ROWS.response(rows, response, next_cursor)
+
+
+@router.get("/search", response_model=List[TaskResponse], dependencies=[Depends(validate_collection)])
+def search(
+    response: Response,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    q: str = Query(..., min_length=1, max_length=200),  # 空白区切りで AND 検索
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,           # 前ページの X-Next-Cursor の値
+):
+    # タイトル・説明文の全文検索（関連度順）
+    tasks, next_cursor = search_tasks(db, current_user.id, q, cursor, limit)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return tasks
+
+
+# 期限切れの件数は書き込みがなくても時刻だけで変わるため、変更シーケンスによる条件付きGETは使わない
+@router.get("/calendar", response_model=TaskCalendarResponse)
+def read_task_calendar(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    start: date = Query(...),  # 表示する最初の日
+    end: date = Query(...),    # 表示する最後の日の翌日
+    tz: str = "UTC",           # 日付の区切りに使うタイムゾーン（例: Asia/Tokyo）
+):
+    # 月表示用の日別件数。その日のタスクは days[].start / end を start_date / end_date にして取得する
+    zone = parse_calendar_range(start, end, tz)
+    days = task_calendar(db, current_user.id, start, end, zone, utc_now())
+    return {"tz": tz, "days": days}
+
+
+def export_response(chunks: Union[Iterable[bytes], AsyncIterable[bytes]], file_format: TaskFileFormat) -> StreamingResponse:
+    return StreamingResponse(
+        chunks,
+        media_type=MEDIA_TYPES[file_format],
+        headers={"Content-Disposition": f'attachment; filename="tasks.{file_format}"'},
+    )
+
+
+async def read_import_body(
+    request: Request,
+    file_format: TaskFileFormat,
+    importer: TaskImporter,
+    flush: Callable[[], Awaitable[None]],
+) -> None:
+    """
+    リクエスト本文を受信しながら解析・検証し、IMPORT_CHUNK_SIZE 件たまるごとに flush で登録・コミットする。
+    続きを読めない誤り（文字コード・CSVの列名）は400にする（それまでに登録した分は残る）。
+    """
+    parser = TaskFileParser(file_format)
+
+    def consume(chunk: Optional[bytes]) -> None:
+        for line, record in parser.feed(chunk) if chunk is not None else parser.close():
+            importer.add(line, record)
+
+    try:
+        async for chunk in request.stream():
+            if chunk:
+                # 解析と検証はCPUを使うのでスレッドプールで行う
+                await run_in_threadpool(consume, chunk)
+                if importer.chunk_ready:
+                    await flush()
+        await run_in_threadpool(consume, None)
+    except TaskFileError as exc:
+        raise HTTPException(
+            status_code=400,
+            detail={"line": exc.line, "error": str(exc), "created": importer.created},
+        )
+    await flush()
+
+
+def insert_import_chunk(db: Session, importer: TaskImporter) -> None:
+    """インポートでためた行を登録してコミットする"""
+    importer.insert_pending(db)
+    db.commit()
+
+
+# 全タスクのエクスポート（NDJSON または CSV）
+# 送信しながらDBから少しずつ読むため、リクエストのセッションではなくレスポンス用のセッションを開く
+@router.get("/export")
+def export_tasks_file(
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    format: TaskFileFormat = "ndjson",
+):
+    owner_id = current_user.id
+    SessionLocal = request.app.state.SessionLocal
+    encoder = TaskFileEncoder(format, TASK_ROWS.fields)
+
+    def chunks():
+        with SessionLocal() as db:
+            yield from export_tasks(db, owner_id, encoder, TASK_ROWS.columns)
+
+    return export_response(chunks(), format)
+
+
+# タスクのインポート（本文にファイルの内容をそのまま送る。形式は format で指定）
+# 正しい行だけを登録し、誤りのある行は行番号とともに返す
+@router.post("/import", response_model=TaskImportResponse)
+async def import_tasks_file(
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    format: TaskFileFormat = "ndjson",
+):
+    importer = TaskImporter(current_user.id)
+    await run_in_threadpool(importer.load_references, db)
+    await read_import_body(request, format, importer, lambda: run_in_threadpool(insert_import_chunk, db, importer))
+    return importer.report()
 
 
 @router.post("/", response_model=TaskResponse)
@@ -81,12 +212,28 @@ def create_task(
     current_user: User = Depends(get_current_user)
 ):
     db_task = Task(**task_in.model_dump(), owner_id=current_user.id)
+    apply_task_change(db, current_user.id, None, snapshot(db_task))
     db.add(db_task)
+    db.flush()
+    record_change(db, current_user.id, "task", db_task.id)
     db.commit()
     db.refresh(db_task)
     return db_task
 
-@router.get("/{task_id}", response_model=TaskResponse)
+@router.post("/batch", response_model=TaskBatchResponse)
+def batch_tasks(
+    *,
+    db: Session = Depends(get_db),
+    batch_in: TaskBatchRequest,
+    current_user: User = Depends(get_current_user)
+):
+    results = apply_task_batch(db, current_user.id, batch_in.operations)
+    # コミットで属性が期限切れになる前にレスポンスを組み立てる（再SELECTを避ける）
+    response = TaskBatchResponse.model_validate({"results": results}, from_attributes=True)
+    db.commit()
+    return response
+
+@router.get("/{task_id}", response_model=TaskResponse, dependencies=[Depends(validate_collection)])
 def read_task(
     *, 
     db: Session = Depends(get_db), 
@@ -110,9 +257,12 @@ def update_task(
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
 
+    before = snapshot(task)
     update_data = task_in.model_dump(exclude_unset=True)
     for key, value in update_data.items():
         setattr(task, key, value)
+    apply_task_change(db, current_user.id, before, snapshot(task))
+    record_change(db, current_user.id, "task", task.id)
 
     db.add(task)
     db.commit()
@@ -129,7 +279,9 @@ def delete_task(
     task = db.query(Task).filter(Task.id == task_id, Task.owner_id == current_user.id).first()
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
-        
+
+    apply_task_change(db, current_user.id, snapshot(task), None)
+    record_deletion(db, current_user.id, "task", task.id)
     db.delete(task)
     db.commit()
     return {"message": "Task deleted"}
\ No newline at end of file
@@ -1,59 +1,66 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, File, HTTPException, Request, Response, UploadFile, status
+from fastapi.responses import FileResponse
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from fastapi.security import OAuth2PasswordRequestForm
 from typing import Any
 
 from app.db.session import get_db
+from app.core.conditional import validate_current_user
 from app.schemas.user import UserCreate, UserResponse, UserUpdate
 from app.schemas.token import Token
 from app.models.user import User
-from app.core.security import get_password_hash, create_access_token, verify_password, get_current_user
+from app.core.config import settings
+from app.core.security import create_access_token, get_current_user, password_hasher
+from app.services.avatar_service import avatar_path, store_avatar
+from app.services.user_service import add_user, get_user_by_username, set_avatar
 
 router = APIRouter()
 
 # ユーザー登録
+# bcrypt は専用プロセスプールで実行し、DBアクセスはスレッドプールで行う
 @router.post("/", response_model=UserResponse)
-def register_user(*, db: Session = Depends(get_db), user_in: UserCreate):
-    # SQLAlchemyスタイルの検索
-    db_user = db.query(User).filter(User.username == user_in.username).first()
+async def register_user(*, db: Session = Depends(get_db), user_in: UserCreate):
+    db_user = await run_in_threadpool(get_user_by_username, db, user_in.username)
     
     if db_user:
         raise HTTPException(status_code=400, detail="Username already registered")
         
-    hashed_password = get_password_hash(user_in.password)
+    hashed_password = await password_hasher.hash(user_in.password)
     
     # Userモデルの作成
     new_user = User(
         username=user_in.username,
         hashed_password=hashed_password,
     )
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
-    return new_user
+    return await run_in_threadpool(add_user, db, new_user)
 
 # ログイン (レスポンスモデルにTokenを指定)
 @router.post("/login/", response_model=Token)
-def login_for_access_token(
+async def login_for_access_token(
     form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)
 ):
-    # SQLAlchemyスタイルの検索
-    user = db.query(User).filter(User.username == form_data.username).first()
+    user = await run_in_threadpool(get_user_by_username, db, form_data.username)
     
     # ユーザーがいない or パスワード違い
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    if not user or not await password_hasher.verify(form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+
+    # コスト設定が変わっていれば新しいコストで再ハッシュして保存
+    if password_hasher.needs_rehash(user.hashed_password):
+        user.hashed_password = await password_hasher.hash(form_data.password)
+        await run_in_threadpool(db.commit)
     
     # IDをsubjectとしてトークン生成
     access_token = create_access_token(subject=user.id)
     return {"access_token": access_token, "token_type": "bearer"}
 
 # 自分の情報取得
-@router.get("/me", response_model=UserResponse)
+@router.get("/me", response_model=UserResponse, dependencies=[Depends(validate_current_user)])
 def read_users_me(current_user: User = Depends(get_current_user)):
     return current_user
 
@@ -75,4 +82,44 @@ def update_profile(
     db.add(current_user)
     db.commit()
     db.refresh(current_user)
-    return current_user
\ No newline at end of file
+    return current_user
+
+# アイコン画像のアップロード
+# 画像の検証・サムネイル作成はスレッドプールで行い、users にはハッシュだけを保存する
+@router.put("/me/avatar", response_model=UserResponse)
+async def upload_avatar(
+    *,
+    db: Session = Depends(get_db),
+    file: UploadFile = File(...),
+    current_user: User = Depends(get_current_user)
+):
+    data = await file.read(settings.AVATAR_MAX_BYTES + 1)
+    avatar_hash = await run_in_threadpool(store_avatar, data)
+    return await run_in_threadpool(set_avatar, db, current_user, avatar_hash)
+
+# アイコン画像の削除（保存済みのファイルは他のユーザーも使っている可能性があるため残す）
+@router.delete("/me/avatar", response_model=UserResponse)
+def delete_avatar(
+    *,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    return set_avatar(db, current_user, None)
+
+# アイコン画像の配信
+# URLは内容のハッシュなので変わらない。認証なしで <img> から読めるようにし、長期キャッシュさせる
+@router.get("/avatars/{avatar_hash}/{size}.webp")
+def read_avatar(request: Request, avatar_hash: str, size: int):
+    path = avatar_path(avatar_hash, size)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Avatar not found")
+    # 内容はハッシュとサイズで決まるため、ファイルの更新日時ではなくそれをETagにする
+    headers = {
+        "ETag": f'"{avatar_hash}-{size}"',
+        "Cache-Control": "public, max-age=31536000, immutable",
+    }
+    if_none_match = request.headers.get("if-none-match", "")
+    if headers["ETag"] in (tag.strip() for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers=headers)
+    # サーバーが対応していれば (ASGI pathsend) ファイルをそのまま送り、アプリ側で読み込まない
+    return FileResponse(path, media_type="image/webp", headers=headers)
@@ -0,0 +1,81 @@
+# カテゴリAPIの非同期DB版（DB_ASYNC=True のときに endpoints/categories.py の同名ルートを置き換える）
+# 本体は同期版のハンドラを run_handler で AsyncSession 上で実行する。ここでは依存関係だけを非同期版にする
+
+from fastapi import APIRouter, Depends, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List
+
+from app.core.security import get_current_user_async
+from app.core.conditional import validate_collection_async
+from app.db.session import get_async_db, run_handler
+from app.models.user import User
+from app.schemas.category import CategoryCreate, CategoryResponse, CategoryUpdate
+from app.api.v1.endpoints import categories as handlers
+
+router = APIRouter()
+
+
+@router.get("/", response_model=List[CategoryResponse], dependencies=[Depends(validate_collection_async)])
+async def read_categories(
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
+):
+    """ユーザーのカテゴリ一覧を取得"""
+    return await run_handler(db, handlers.read_categories, response=response, current_user=current_user)
+
+
+@router.post("/", response_model=CategoryResponse)
+async def create_category(
+    *,
+    db: AsyncSession = Depends(get_async_db),
+    category_in: CategoryCreate,
+    current_user: User = Depends(get_current_user_async)
+):
+    """新しいカテゴリを作成"""
+    return await run_handler(db, handlers.create_category, category_in=category_in, current_user=current_user)
+
+
+@router.post("/init", response_model=List[CategoryResponse])
+async def initialize_default_categories(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
+):
+    """デフォルトカテゴリ（家事、仕事、課題）を初期化"""
+    return await run_handler(db, handlers.initialize_default_categories, current_user=current_user)
+
+
+@router.get("/{category_id}", response_model=CategoryResponse, dependencies=[Depends(validate_collection_async)])
+async def read_category(
+    *,
+    db: AsyncSession = Depends(get_async_db),
+    category_id: int,
+    current_user: User = Depends(get_current_user_async)
+):
+    """特定のカテゴリを取得"""
+    return await run_handler(db, handlers.read_category, category_id=category_id, current_user=current_user)
+
+
+@router.put("/{category_id}", response_model=CategoryResponse)
+async def update_category(
+    *,
+    db: AsyncSession = Depends(get_async_db),
+    category_id: int,
+    category_in: CategoryUpdate,
+    current_user: User = Depends(get_current_user_async)
+):
+    """カテゴリを更新"""
+    return await run_handler(
+        db, handlers.update_category, category_id=category_id, category_in=category_in, current_user=current_user,
+    )
+
+
+@router.delete("/{category_id}")
+async def delete_category(
+    *,
+    db: AsyncSession = Depends(get_async_db),
+    category_id: int,
+    current_user: User = Depends(get_current_user_async)
+):
+    """カテゴリを削除"""
+    return await run_handler(db, handlers.delete_category, category_id=category_id, current_user=current_user)
@@ -0,0 +1,113 @@
+# 場所APIの非同期DB版（DB_ASYNC=True のときに endpoints/location.py の同名ルートを置き換える）
+# 本体は同期版のハンドラを run_handler で AsyncSession 上で実行する。ここでは依存関係だけを非同期版にする
+
+from fastapi import APIRouter, Depends, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+
+from app.core.security import get_current_user_async
+from app.core.conditional import validate_collection_async
+from app.db.session import get_async_db, run_handler
+from app.models.user import User
+from app.schemas.location import (
+    GeofenceBatchRequest, GeofenceBatchResponse, GeofenceSessionUpdate,
+    LocationCreate, LocationResponse, LocationUpdate, NearbyLocationResponse,
+)
+from app.api.v1.endpoints import location as handlers
+
+router = APIRouter()
+
+
+# 場所一覧取得
+@router.get("/", response_model=List[LocationResponse], dependencies=[Depends(validate_collection_async)])
+async def read_locations(
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
+):
+    return await run_handler(db, handlers.read_locations, response=response, current_user=current_user)
+
+
+# 現在地から近くの場所を検索
+@router.get("/nearby", response_model=Optional[NearbyLocationResponse])
+async def find_nearby_location(
+    latitude: float = Query(..., description="現在地の緯度"),
+    longitude: float = Query(..., description="現在地の経度"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
+):
+    return await run_handler(
+        db, handlers.find_nearby_location, latitude=latitude, longitude=longitude, current_user=current_user,
+    )
+
+
+# 位置情報の列をまとめて判定し、エリアの出入りを返す
+@router.post("/nearby/batch", response_model=GeofenceBatchResponse)
+async def evaluate_location_trace(
+    batch_in: GeofenceBatchRequest,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
+):
+    return await run_handler(db, handlers.evaluate_location_trace, batch_in=batch_in, current_user=current_user)
+
+
+# 現在地を送り、前回からのエリアの出入りだけを受け取る
+@router.post("/session", response_model=GeofenceBatchResponse)
+async def update_location_session(
+    update_in: GeofenceSessionUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
+):
+    return await run_handler(db, handlers.update_location_session, update_in=update_in, current_user=current_user)
+
+
+# ジオフェンス状態をリセット（ログアウト時など）
+@router.delete("/session")
+async def reset_location_session(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
+):
+    return await run_handler(db, handlers.reset_location_session, current_user=current_user)
+
+
+# 場所登録
+@router.post("/", response_model=LocationResponse)
+async def create_location(
+    location_in: LocationCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
+):
+    return await run_handler(db, handlers.create_location, location_in=location_in, current_user=current_user)
+
+
+# 場所取得
+@router.get("/{location_id}", response_model=LocationResponse, dependencies=[Depends(validate_collection_async)])
+async def read_location(
+    location_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
+):
+    return await run_handler(db, handlers.read_location, location_id=location_id, current_user=current_user)
+
+
+# 場所更新
+@router.put("/{location_id}", response_model=LocationResponse)
+async def update_location(
+    location_id: int,
+    location_in: LocationUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
+):
+    return await run_handler(
+        db, handlers.update_location, location_id=location_id, location_in=location_in, current_user=current_user,
+    )
+
+
+# 場所削除
+@router.delete("/{location_id}")
+async def delete_location(
+    location_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
+):
+    return await run_handler(db, handlers.delete_location, location_id=location_id, current_user=current_user)
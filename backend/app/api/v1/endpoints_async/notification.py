@@ -0,0 +1,35 @@
+# プッシュ通知デバイスAPIの非同期DB版（DB_ASYNC=True のときに endpoints/notification.py の同名ルートを置き換える）
+# 本体は同期版のハンドラを run_handler で AsyncSession 上で実行する。ここでは依存関係だけを非同期版にする
+
+from typing import Any
+
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.security import get_current_user_async
+from app.db.session import get_async_db, run_handler
+from app.models.user import User
+from app.schemas.notification import NotificationDeviceCreate, NotificationDeviceResponse
+from app.api.v1.endpoints import notification as handlers
+
+router = APIRouter()
+
+
+@router.post("/users/me/devices", response_model=NotificationDeviceResponse)
+async def register_device(
+    device_in: NotificationDeviceCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
+) -> Any:
+    """プッシュ通知用のデバイストークンを登録する"""
+    return await run_handler(db, handlers.register_device, device_in=device_in, current_user=current_user)
+
+
+@router.delete("/users/me/devices/{device_token}")
+async def delete_device(
+    device_token: str,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
+) -> Any:
+    """指定されたデバイストークンを削除する"""
+    return await run_handler(db, handlers.delete_device, device_token=device_token, current_user=current_user)
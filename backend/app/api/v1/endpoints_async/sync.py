@@ -0,0 +1,24 @@
+# 差分同期APIの非同期DB版（DB_ASYNC=True のときに endpoints/sync.py の同名ルートを置き換える）
+# 本体は同期版のハンドラを run_handler で AsyncSession 上で実行する。ここでは依存関係だけを非同期版にする
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.security import get_current_user_async
+from app.db.session import get_async_db, run_handler
+from app.models.user import User
+from app.schemas.sync import SyncResponse
+from app.api.v1.endpoints import sync as handlers
+
+router = APIRouter()
+
+
+@router.get("/", response_model=SyncResponse)
+async def sync_changes(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
+    since: int = Query(0, ge=0),
+    limit: int = Query(500, ge=1, le=5000)
+):
+    """since 以降に変更・削除されたタスク・カテゴリ・場所だけを返す"""
+    return await run_handler(db, handlers.sync_changes, current_user=current_user, since=since, limit=limit)
@@ -0,0 +1,165 @@
+# タスクAPIの非同期DB版（DB_ASYNC=True のときに endpoints/tasks.py の同名ルートを置き換える）
+# 本体は同期版のハンドラを run_handler で AsyncSession 上で実行する。ここでは依存関係だけを非同期版にする
+
+from fastapi import APIRouter, Depends, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from datetime import date, datetime
+
+from app.core.security import get_current_user_async
+from app.core.conditional import validate_collection_async
+from app.db.session import get_async_db, run_handler
+from app.models.user import User
+from app.schemas.task import (
+    TaskBatchRequest, TaskBatchResponse, TaskCalendarResponse, TaskCreate, TaskImportResponse, TaskResponse,
+    TaskUpdate,
+)
+from app.services.task_service import SortBy, SortOrder
+from app.services.task_io_service import TaskFileEncoder, TaskFileFormat, TaskImporter, export_tasks_async
+from app.api.v1.endpoints import tasks as handlers
+from app.api.v1.endpoints.tasks import TASK_ROWS, export_response, insert_import_chunk, read_import_body
+
+router = APIRouter()
+
+
+@router.get("/stats")
+async def get_task_stats(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+):
+    return await run_handler(db, handlers.get_task_stats, current_user=current_user, start=start, end=end)
+
+
+@router.get("/", response_model=List[TaskResponse], dependencies=[Depends(validate_collection_async)])
+async def read_tasks(
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    sort_by: SortBy = "created_at",
+    sort_order: SortOrder = "desc",
+    is_completed: Optional[bool] = None,
+    location_id: Optional[int] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None
+):
+    return await run_handler(
+        db, handlers.read_tasks,
+        response=response, current_user=current_user, limit=limit, cursor=cursor,
+        sort_by=sort_by, sort_order=sort_order, is_completed=is_completed, location_id=location_id,
+        start_date=start_date, end_date=end_date,
+    )
+
+
+@router.get("/search", response_model=List[TaskResponse], dependencies=[Depends(validate_collection_async)])
+async def search(
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+):
+    return await run_handler(
+        db, handlers.search, response=response, current_user=current_user, q=q, limit=limit, cursor=cursor,
+    )
+
+
+@router.get("/calendar", response_model=TaskCalendarResponse)
+async def read_task_calendar(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
+    start: date = Query(...),
+    end: date = Query(...),
+    tz: str = "UTC",
+):
+    return await run_handler(
+        db, handlers.read_task_calendar, current_user=current_user, start=start, end=end, tz=tz,
+    )
+
+
+# 送信しながら少しずつ読むため、同期版と同じくレスポンス用のセッション（ここでは AsyncSession）を開く
+@router.get("/export")
+async def export_tasks_file(
+    request: Request,
+    current_user: User = Depends(get_current_user_async),
+    format: TaskFileFormat = "ndjson",
+):
+    owner_id = current_user.id
+    AsyncSessionLocal = request.app.state.AsyncSessionLocal
+    encoder = TaskFileEncoder(format, TASK_ROWS.fields)
+
+    async def chunks():
+        async with AsyncSessionLocal() as db:
+            async for chunk in export_tasks_async(db, owner_id, encoder, TASK_ROWS.columns):
+                yield chunk
+
+    return export_response(chunks(), format)
+
+
+# 本文の受信は同期版と共通 (read_import_body)。登録は AsyncSession 上で行う
+@router.post("/import", response_model=TaskImportResponse)
+async def import_tasks_file(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
+    format: TaskFileFormat = "ndjson",
+):
+    importer = TaskImporter(current_user.id)
+    await db.run_sync(importer.load_references)
+    await read_import_body(request, format, importer, lambda: db.run_sync(insert_import_chunk, importer))
+    return importer.report()
+
+
+@router.post("/", response_model=TaskResponse)
+async def create_task(
+    *,
+    db: AsyncSession = Depends(get_async_db),
+    task_in: TaskCreate,
+    current_user: User = Depends(get_current_user_async)
+):
+    return await run_handler(db, handlers.create_task, task_in=task_in, current_user=current_user)
+
+
+@router.post("/batch", response_model=TaskBatchResponse)
+async def batch_tasks(
+    *,
+    db: AsyncSession = Depends(get_async_db),
+    batch_in: TaskBatchRequest,
+    current_user: User = Depends(get_current_user_async)
+):
+    return await run_handler(db, handlers.batch_tasks, batch_in=batch_in, current_user=current_user)
+
+
+@router.get("/{task_id}", response_model=TaskResponse, dependencies=[Depends(validate_collection_async)])
+async def read_task(
+    *,
+    db: AsyncSession = Depends(get_async_db),
+    task_id: int,
+    current_user: User = Depends(get_current_user_async)
+):
+    return await run_handler(db, handlers.read_task, task_id=task_id, current_user=current_user)
+
+
+@router.put("/{task_id}", response_model=TaskResponse)
+async def update_task(
+    *,
+    db: AsyncSession = Depends(get_async_db),
+    task_id: int,
+    task_in: TaskUpdate,
+    current_user: User = Depends(get_current_user_async)
+):
+    return await run_handler(db, handlers.update_task, task_id=task_id, task_in=task_in, current_user=current_user)
+
+
+@router.delete("/{task_id}")
+async def delete_task(
+    *,
+    db: AsyncSession = Depends(get_async_db),
+    task_id: int,
+    current_user: User = Depends(get_current_user_async)
+):
+    return await run_handler(db, handlers.delete_task, task_id=task_id, current_user=current_user)
@@ -0,0 +1,99 @@
+# ユーザーAPIの非同期DB版（DB_ASYNC=True のときに endpoints/users.py の同名ルートを置き換える）
+# DBアクセスは同期版と同じ関数 (user_service) やハンドラを AsyncSession 上で実行する。
+# bcrypt・画像の変換はイベントループの外で行う（同期版と同じ）。アイコン画像の配信はDBを使わないため同期版のまま
+
+from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.conditional import validate_current_user_async
+from app.core.config import settings
+from app.core.security import create_access_token, get_current_user_async, password_hasher
+from app.db.session import get_async_db, run_handler
+from app.models.user import User
+from app.schemas.token import Token
+from app.schemas.user import UserCreate, UserResponse, UserUpdate
+from app.services.avatar_service import store_avatar
+from app.services.user_service import add_user, get_user_by_username, set_avatar
+from app.api.v1.endpoints import users as handlers
+
+router = APIRouter()
+
+
+# ユーザー登録
+@router.post("/", response_model=UserResponse)
+async def register_user(*, db: AsyncSession = Depends(get_async_db), user_in: UserCreate):
+    db_user = await db.run_sync(get_user_by_username, user_in.username)
+    if db_user:
+        raise HTTPException(status_code=400, detail="Username already registered")
+
+    new_user = User(
+        username=user_in.username,
+        hashed_password=await password_hasher.hash(user_in.password),
+    )
+    return await db.run_sync(add_user, new_user)
+
+
+# ログイン
+@router.post("/login/", response_model=Token)
+async def login_for_access_token(
+    form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)
+):
+    user = await db.run_sync(get_user_by_username, form_data.username)
+
+    # ユーザーがいない or パスワード違い
+    if not user or not await password_hasher.verify(form_data.password, user.hashed_password):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Incorrect username or password",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    # コスト設定が変わっていれば新しいコストで再ハッシュして保存
+    if password_hasher.needs_rehash(user.hashed_password):
+        user.hashed_password = await password_hasher.hash(form_data.password)
+        await db.commit()
+
+    access_token = create_access_token(subject=user.id)
+    return {"access_token": access_token, "token_type": "bearer"}
+
+
+# 自分の情報取得
+@router.get("/me", response_model=UserResponse, dependencies=[Depends(validate_current_user_async)])
+async def read_users_me(current_user: User = Depends(get_current_user_async)):
+    return current_user
+
+
+# プロフィール更新
+@router.put("/me", response_model=UserResponse)
+async def update_profile(
+    *,
+    db: AsyncSession = Depends(get_async_db),
+    user_in: UserUpdate,
+    current_user: User = Depends(get_current_user_async)
+):
+    return await run_handler(db, handlers.update_profile, user_in=user_in, current_user=current_user)
+
+
+# アイコン画像のアップロード
+@router.put("/me/avatar", response_model=UserResponse)
+async def upload_avatar(
+    *,
+    db: AsyncSession = Depends(get_async_db),
+    file: UploadFile = File(...),
+    current_user: User = Depends(get_current_user_async)
+):
+    data = await file.read(settings.AVATAR_MAX_BYTES + 1)
+    avatar_hash = await run_in_threadpool(store_avatar, data)
+    return await db.run_sync(set_avatar, current_user, avatar_hash)
+
+
+# アイコン画像の削除
+@router.delete("/me/avatar", response_model=UserResponse)
+async def delete_avatar(
+    *,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
+):
+    return await run_handler(db, handlers.delete_avatar, current_user=current_user)
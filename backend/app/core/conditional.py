@@ -0,0 +1,128 @@
+# 条件付きGET (ETag / Last-Modified) の検証
+# 一覧・詳細のハンドラより先に依存関係として実行し、変更がなければ 304 を返して本体の処理を省く
+
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import Depends, HTTPException, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.security import get_current_user, get_current_user_async
+from app.db.session import get_async_db, get_db
+from app.models.user import User
+from app.services.sync_service import collection_version
+
+# 304 を返す場合もこのヘッダは付ける
+_VALIDATOR_HEADERS = ("ETag", "Last-Modified", "Cache-Control")
+
+
+def make_etag(*parts) -> str:
+    """バージョンを表す値から弱いETagを作る"""
+    digest = hashlib.blake2b("|".join(map(str, parts)).encode(), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match は弱い比較（W/ の有無を無視する）
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+def _not_modified_since(if_modified_since: str, last_modified: datetime) -> bool:
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    # HTTP日付は秒単位
+    return last_modified.replace(microsecond=0) <= since
+
+
+def check_not_modified(
+    request: Request,
+    response: Response,
+    etag: str,
+    last_modified: Optional[datetime] = None,
+) -> None:
+    """
+    検証用のヘッダをレスポンスに付け、クライアントのキャッシュが最新なら 304 を送出する。
+    If-None-Match があればそれだけで判定し、なければ If-Modified-Since で判定する。
+    last_modified は UTC の naive な日時。
+    """
+    response.headers["ETag"] = etag
+    # キャッシュは使ってよいが、毎回検証させる
+    response.headers["Cache-Control"] = "private, no-cache"
+    if last_modified is not None:
+        last_modified = last_modified.replace(tzinfo=timezone.utc)
+        response.headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        not_modified = _etag_matches(if_none_match, etag)
+    else:
+        if_modified_since = request.headers.get("if-modified-since")
+        not_modified = (
+            if_modified_since is not None
+            and last_modified is not None
+            and _not_modified_since(if_modified_since, last_modified)
+        )
+    if not_modified:
+        headers = {key: response.headers[key] for key in _VALIDATOR_HEADERS if key in response.headers}
+        raise HTTPException(status_code=304, headers=headers)
+
+
+def _collection_etag(request: Request, user_id: int, version: int) -> str:
+    # クエリ（絞り込み・ソート・カーソル）ごとに内容が変わるので ETag に含める
+    return make_etag(request.url.path, request.url.query, user_id, version)
+
+
+def validate_collection(
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> None:
+    """タスク・カテゴリ・場所の一覧用。変更シーケンスをバージョンにする"""
+    version, last_modified = collection_version(db, current_user.id)
+    check_not_modified(request, response, _collection_etag(request, current_user.id, version), last_modified)
+
+
+async def validate_collection_async(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
+) -> None:
+    """validate_collection の非同期DB版"""
+    user_id = current_user.id
+    version, last_modified = await db.run_sync(lambda session: collection_version(session, user_id))
+    check_not_modified(request, response, _collection_etag(request, user_id, version), last_modified)
+
+
+def _user_etag(request: Request, user: User) -> str:
+    # レスポンスに出る項目の値をバージョンにする（ユーザーはキャッシュ済みなのでDBアクセスなし）
+    return make_etag(request.url.path, user.id, user.username, user.display_name, user.avatar_hash)
+
+
+def validate_current_user(
+    request: Request,
+    response: Response,
+    current_user: User = Depends(get_current_user),
+) -> None:
+    """/users/me 用"""
+    check_not_modified(request, response, _user_etag(request, current_user))
+
+
+async def validate_current_user_async(
+    request: Request,
+    response: Response,
+    current_user: User = Depends(get_current_user_async),
+) -> None:
+    """validate_current_user の非同期DB版"""
+    check_not_modified(request, response, _user_etag(request, current_user))
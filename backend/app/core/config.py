@@ -1,4 +1,5 @@
 import os
+from typing import Dict
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -9,6 +10,66 @@ class Settings(BaseSettings):
     # 環境変数から読み込む。設定されていない場合はSQLiteをデフォルトとする。
     SQLALCHEMY_DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./sql_app.db")
 
+    # True にすると v1 の主要エンドポイントを AsyncEngine + AsyncSession で処理する
+    # (SQLiteは aiosqlite、PostgreSQLは asyncpg を使用)
+    DB_ASYNC: bool = False
+
+    # コネクションプール設定（SQLite以外）
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30       # 接続待ちの上限（秒）
+    DB_POOL_PRE_PING: bool = True   # 使用前に接続の生存確認をする
+    DB_POOL_RECYCLE: int = 1800     # この秒数を超えた接続は作り直す
+
+    # SQLite設定（接続ごとにPRAGMAで設定）
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_CACHE_SIZE: int = -64000       # 負の値はKiB単位（約64MB）
+    SQLITE_MMAP_SIZE: int = 268435456     # 256MB
+
+    # 認証キャッシュ設定（get_current_user のユーザー・トークンのプロセス内キャッシュ）
+    AUTH_CACHE_ENABLED: bool = True
+    USER_CACHE_TTL_SECONDS: int = 60
+    USER_CACHE_MAX_SIZE: int = 10000
+    TOKEN_CACHE_MAX_SIZE: int = 10000
+
+    # パスワードハッシュ設定
+    BCRYPT_ROUNDS: int = 12              # 変更するとログイン時に新しいコストで再ハッシュされる
+    PASSWORD_HASH_WORKERS: int = 2       # bcrypt用プロセス数（0でプロセスを使わずスレッドで実行）
+    PASSWORD_HASH_MAX_PENDING: int = 16  # 実行中＋待機中の上限。超えると503を返す
+
+    # 変更通知 (/events/stream)
+    EVENT_BROKER: str = "local"                     # "local": プロセス内のみ / "tcp": 中継プロセス経由で全ワーカーに配る
+    EVENT_BROKER_URL: str = "tcp://127.0.0.1:8765"  # python -m app.core.events で起動する中継
+    EVENT_QUEUE_SIZE: int = 100                     # 接続ごとのキューの上限。溢れたら再同期を通知する
+    EVENT_HEARTBEAT_SECONDS: int = 15
+    EVENT_STREAM_MAX_SECONDS: int = 120             # 1接続の最長時間。クライアントは自動で再接続する（停止時の待ちも抑える）
+    EVENT_MAX_STREAMS_PER_USER: int = 5
+
+    # 期限通知 (app.services.notification_service)
+    # ワーカーごとに動くと通知が重複するため既定は無効。ワーカーが1つの場合だけ true にし、
+    # 複数の場合は専用プロセス (python -m app.services.notification_service) で動かす
+    DEADLINE_SCHEDULER_ENABLED: bool = False
+    DEADLINE_NOTIFY_BEFORE_MINUTES: int = 30  # 期限の何分前に通知するか
+
+    # プッシュ通知 (app.services.push_service)
+    PUSH_GATEWAY_URLS: Dict[str, str] = {}  # device_type ごとの送信先（JSON）。空なら期限通知はログ出力のみ
+    PUSH_BATCH_SIZE: int = 500              # 1リクエストで送る件数
+    PUSH_CONCURRENCY: int = 10              # 同時に送信中のリクエスト数（接続プールの大きさも同じ）
+    PUSH_MAX_ATTEMPTS: int = 4
+    PUSH_BACKOFF_SECONDS: float = 0.5       # 再送の待ちの基準（0〜基準×2^n 秒のランダム）
+    PUSH_TIMEOUT_SECONDS: float = 10
+
+    # メトリクス (app.core.metrics)。/metrics に Prometheus 形式で出力する
+    # 複数ワーカーの場合は環境変数 PROMETHEUS_MULTIPROC_DIR も指定する（prometheus_client が直接読む）
+    METRICS_ENABLED: bool = True
+
+    # アイコン画像 (app.services.avatar_service)
+    AVATAR_STORAGE_DIR: str = "./avatar_store"  # 内容のハッシュをキーに保存するディレクトリ
+    AVATAR_MAX_BYTES: int = 5 * 1024 * 1024     # アップロードの上限
+    AVATAR_MAX_PIXELS: int = 40_000_000         # 展開後の画素数の上限（巨大画像による負荷を防ぐ）
+
     class Config:
         case_sensitive = True
 
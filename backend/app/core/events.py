@@ -0,0 +1,257 @@
+# ユーザーごとの変更通知 (pub/sub)
+# 変更はコミット後に発行し、/events/stream (SSE) の接続ごとのキューへ配る。
+# 複数ワーカーで共有する場合は EVENT_BROKER=tcp にして中継プロセスを起動する:
+#   python -m app.core.events [--host 127.0.0.1] [--port 8765]
+
+import argparse
+import asyncio
+import json
+import logging
+from typing import Callable, Dict, List, Optional, Set
+from urllib.parse import urlparse
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# クライアントに /sync での再同期を促すイベント（キューが溢れた・中継が切れた場合）
+RESYNC = {"type": "resync"}
+
+# 中継との接続で、書き込み待ちがこれを超えた相手は切断する
+_MAX_WRITE_BUFFER = 1 << 20
+
+
+class Subscription:
+    """1接続分の上限付きキュー。イベントループのスレッドからだけ操作する"""
+
+    def __init__(self, user_id: int, maxsize: int):
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self.dropped = 0
+
+    def offer(self, item: dict) -> None:
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            # 読み出しが追いつかない接続は溜まった分を捨て、再同期の通知1件に置き換える
+            self.dropped += self.queue.qsize()
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+            if item is not RESYNC:
+                self.queue.put_nowait(item)
+
+    async def get(self, timeout: float) -> Optional[dict]:
+        """次のイベントを返す。timeout 秒来なければ None"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class EventHub:
+    """このプロセス内の購読者の一覧"""
+
+    def __init__(self, queue_size: int, max_per_user: int):
+        # 溢れたときに再同期の通知と新しいイベントを入れるため2以上にする
+        self.queue_size = max(2, queue_size)
+        self.max_per_user = max_per_user
+        self._subscribers: Dict[int, Set[Subscription]] = {}
+        # 全ユーザーのイベントを受け取るプロセス内の処理（期限通知のスケジューラなど）
+        self._listeners: List[Callable[[int, List[dict]], None]] = []
+
+    def add_listener(self, listener: Callable[[int, List[dict]], None]) -> None:
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[int, List[dict]], None]) -> None:
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def subscribe(self, user_id: int) -> Optional[Subscription]:
+        """購読を開始する。ユーザーあたりの接続数が上限なら None"""
+        subscriptions = self._subscribers.setdefault(user_id, set())
+        if len(subscriptions) >= self.max_per_user:
+            return None
+        subscription = Subscription(user_id, self.queue_size)
+        subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscriptions = self._subscribers.get(subscription.user_id)
+        if subscriptions is None:
+            return
+        subscriptions.discard(subscription)
+        if not subscriptions:
+            del self._subscribers[subscription.user_id]
+
+    def dispatch(self, user_id: int, events: List[dict]) -> None:
+        for listener in self._listeners:
+            try:
+                listener(user_id, events)
+            except Exception:
+                logger.exception("event listener failed")
+        for subscription in self._subscribers.get(user_id, ()):
+            for item in events:
+                subscription.offer(item)
+
+    def resync_all(self) -> None:
+        for subscriptions in self._subscribers.values():
+            for subscription in subscriptions:
+                subscription.offer(RESYNC)
+
+    def stats(self) -> Dict[str, int]:
+        subscriptions = [s for subs in self._subscribers.values() for s in subs]
+        return {
+            "users": len(self._subscribers),
+            "connections": len(subscriptions),
+            "queued": sum(s.queue.qsize() for s in subscriptions),
+            "dropped": sum(s.dropped for s in subscriptions),
+        }
+
+
+class LocalBroker:
+    """プロセス内だけで配るブローカー（ワーカー1つの場合）"""
+
+    def __init__(self, hub: EventHub):
+        self.hub = hub
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+
+    async def stop(self) -> None:
+        self._loop = None
+
+    def publish(self, user_id: int, events: List[dict]) -> None:
+        """どのスレッドからでも呼べる。起動前（CLIなど）は何もしない"""
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._deliver, user_id, events)
+
+    def _deliver(self, user_id: int, events: List[dict]) -> None:
+        self.hub.dispatch(user_id, events)
+
+
+class TcpBroker(LocalBroker):
+    """
+    中継プロセス (python -m app.core.events) 経由で全ワーカーに配るブローカー。
+    自分が発行したイベントも中継から戻ってきたものだけを配る。
+    中継との接続が切れていた間のイベントは失われるため、再接続時に全購読者へ再同期を通知する。
+    """
+
+    def __init__(self, hub: EventHub, url: str):
+        super().__init__(hub)
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "127.0.0.1"
+        self.port = parsed.port or 8765
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        await super().start()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        await super().stop()
+
+    async def _run(self) -> None:
+        connected_before = False
+        while True:
+            try:
+                reader, writer = await asyncio.open_connection(self.host, self.port)
+            except OSError as exc:
+                logger.warning("event broker %s:%s unavailable: %s", self.host, self.port, exc)
+                await asyncio.sleep(1)
+                continue
+            self._writer = writer
+            if connected_before:
+                self.hub.resync_all()
+            connected_before = True
+            try:
+                while line := await reader.readline():
+                    message = json.loads(line)
+                    self.hub.dispatch(message["user_id"], message["events"])
+            except (OSError, ValueError, KeyError) as exc:
+                logger.warning("event broker connection lost: %s", exc)
+            finally:
+                self._writer = None
+                writer.close()
+
+    def _deliver(self, user_id: int, events: List[dict]) -> None:
+        writer = self._writer
+        if writer is None or writer.is_closing():
+            logger.warning("event broker not connected, dropping events for user %s", user_id)
+            return
+        writer.write(json.dumps({"user_id": user_id, "events": events}).encode() + b"\n")
+
+
+def create_broker() -> LocalBroker:
+    hub = EventHub(settings.EVENT_QUEUE_SIZE, settings.EVENT_MAX_STREAMS_PER_USER)
+    if settings.EVENT_BROKER == "tcp":
+        return TcpBroker(hub, settings.EVENT_BROKER_URL)
+    return LocalBroker(hub)
+
+
+# lifespan で start/stop する
+event_broker = create_broker()
+
+
+def publish_after_commit(db: Session, user_id: int, events: List[dict]) -> None:
+    """db のトランザクションがコミットされたらイベントを発行する（ロールバックなら捨てる）"""
+    db.info.setdefault("pending_events", []).append((user_id, events))
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_pending(session: Session) -> None:
+    for user_id, events in session.info.pop("pending_events", ()):
+        event_broker.publish(user_id, events)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session: Session) -> None:
+    session.info.pop("pending_events", None)
+
+
+async def run_relay(host: str, port: int) -> None:
+    """受け取った行を接続中のすべてのワーカーへそのまま送る中継サーバー"""
+    clients: Set[asyncio.StreamWriter] = set()
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        clients.add(writer)
+        try:
+            while line := await reader.readline():
+                for client in list(clients):
+                    # 受け取れていないワーカーは切断する（再接続時に再同期される）
+                    if client.transport.get_write_buffer_size() > _MAX_WRITE_BUFFER:
+                        clients.discard(client)
+                        client.close()
+                    else:
+                        client.write(line)
+        except OSError:
+            pass
+        finally:
+            clients.discard(writer)
+            writer.close()
+
+    server = await asyncio.start_server(handle, host, port)
+    logger.info("event relay listening on %s:%s", host, port)
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="複数ワーカー間で変更通知を中継する")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run_relay(args.host, args.port))
@@ -0,0 +1,18 @@
+# アプリ全体の例外ハンドラ
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from app.core.hashing import PasswordHasherBusy
+
+
+async def password_hasher_busy_handler(request: Request, exc: PasswordHasherBusy) -> JSONResponse:
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Server is busy, please retry shortly"},
+        headers={"Retry-After": "1"},
+    )
+
+
+def register_exception_handlers(app: FastAPI) -> None:
+    app.add_exception_handler(PasswordHasherBusy, password_hasher_busy_handler)
@@ -0,0 +1,92 @@
+# bcrypt の計算を専用のプロセスプールで実行する
+
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+import bcrypt
+
+from app.core.metrics import PASSWORD_HASH_DURATION, PASSWORD_HASH_PENDING, PASSWORD_HASH_REJECTED, record_phase
+
+
+class PasswordHasherBusy(Exception):
+    """ハッシュ計算の待ちが上限に達した（exception_handlers で503に変換する）"""
+
+
+def hash_password(password: str, rounds: int) -> str:
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=rounds)).decode('utf-8')
+
+
+def check_password(plain_password: str, hashed_password: str) -> bool:
+    return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+
+
+def hash_rounds(hashed_password: str) -> Optional[int]:
+    """"$2b$12$..." 形式のハッシュからコスト（rounds）を取り出す"""
+    try:
+        return int(hashed_password.split("$")[2])
+    except (IndexError, ValueError):
+        return None
+
+
+class PasswordHasher:
+    """
+    bcrypt をイベントループ・Starletteのスレッドプールの外で実行する。
+    workers=0 の場合はプロセスを使わず asyncio の既定スレッドプールで実行する（サーバーレス環境向け）。
+    実行中＋待機中の件数が max_pending に達したら PasswordHasherBusy を送出する。
+    """
+
+    def __init__(self, workers: int, max_pending: int, rounds: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.rounds = rounds
+        self._pending = 0
+        self._executor: Optional[Executor] = None
+
+    def _get_executor(self) -> Optional[Executor]:
+        if self.workers > 0 and self._executor is None:
+            # スレッドを持つプロセスからのforkを避けるため spawn を使う
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    async def _run(self, operation: str, fn, *args):
+        # イベントループ上でのみ呼ばれるため、判定と加算の間に他の処理は割り込まない
+        if self._pending >= self.max_pending:
+            PASSWORD_HASH_REJECTED.inc()
+            raise PasswordHasherBusy()
+        self._pending += 1
+        PASSWORD_HASH_PENDING.inc()
+        start = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), fn, *args)
+        except BrokenProcessPool:
+            # ワーカーが落ちた場合は次回作り直す
+            self.shutdown()
+            raise PasswordHasherBusy()
+        finally:
+            self._pending -= 1
+            PASSWORD_HASH_PENDING.dec()
+            elapsed = time.perf_counter() - start
+            PASSWORD_HASH_DURATION.labels(operation=operation).observe(elapsed)
+            record_phase("password_hash", elapsed)
+
+    async def hash(self, password: str) -> str:
+        return await self._run("hash", hash_password, password, self.rounds)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run("verify", check_password, plain_password, hashed_password)
+
+    def needs_rehash(self, hashed_password: str) -> bool:
+        return hash_rounds(hashed_password) != self.rounds
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
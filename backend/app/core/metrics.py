@@ -0,0 +1,293 @@
+# Prometheus 形式のメトリクス (/metrics)。値の集計と出力は prometheus_client を使う
+#
+# リクエストのレイテンシ・ステータス・処理中の件数、DBクエリの件数と時間、接続プールの状態と接続の取得時間、
+# bcrypt の時間、認証キャッシュのヒット率と件数を記録する。リクエストごとの内訳 (http_request_phase_seconds) で、遅さの原因が
+#   db              : SQL の実行（クエリの開始から終了まで）
+#   password_hash   : bcrypt（プロセスプールの待ちを含む）
+#   serialization   : 一覧の orjson 化・エクスポートのエンコード
+#   app             : それ以外（バリデーション・response_model の変換・アプリの処理など）
+# のどれかを切り分けられる。
+# uvicorn --workers などで複数ワーカーにする場合は、起動前に環境変数 PROMETHEUS_MULTIPROC_DIR に
+# 空のディレクトリを指定する（prometheus_client のマルチプロセスモード。全ワーカーの合計を出力する）。
+# 指定しない場合、値は /metrics に応答したワーカーのものだけになる。
+
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, Optional
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess,
+)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+CONTENT_TYPE = CONTENT_TYPE_LATEST
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PHASE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+CHECKOUT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+PASSWORD_HASH_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+PHASES = ("db", "password_hash", "serialization")
+
+# リクエスト以外（期限通知のスケジューラなど）から実行されたクエリの route ラベル
+BACKGROUND_ROUTE = "background"
+# どのルートにも一致しなかったリクエスト（404）。パスをそのまま使うとラベルの種類が際限なく増える
+UNMATCHED_ROUTE = "unmatched"
+
+# マルチプロセスモードのゲージは、動いているワーカーの値の合計を出す
+_LIVE_SUM = "livesum"
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "HTTP requests by route template and status code.", ("method", "route", "status"),
+)
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "HTTP request latency until the response body is sent.", ("method", "route"),
+    buckets=LATENCY_BUCKETS,
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress", "HTTP requests currently being handled.", ("method",),
+    multiprocess_mode=_LIVE_SUM,
+)
+HTTP_REQUEST_PHASE = Histogram(
+    "http_request_phase_seconds",
+    "Time spent per request in db, password_hash, serialization and the remaining app code.",
+    ("route", "phase"), buckets=PHASE_BUCKETS,
+)
+HTTP_REQUEST_DB_QUERIES = Histogram(
+    "http_request_db_queries", "Number of SQL statements executed per request.", ("route",),
+    buckets=QUERY_COUNT_BUCKETS,
+)
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds", "SQL statement execution time.", ("engine", "route"), buckets=QUERY_BUCKETS,
+)
+DB_POOL_CHECKOUT = Histogram(
+    "db_pool_checkout_seconds",
+    "Time to obtain a connection from the pool, including waiting and opening new connections.",
+    ("engine",), buckets=CHECKOUT_BUCKETS,
+)
+DB_POOL_CONNECTIONS = Gauge(
+    "db_pool_connections", "Pool connections by state (checked_out, idle, overflow) and the configured size.",
+    ("engine", "state"), multiprocess_mode=_LIVE_SUM,
+)
+PASSWORD_HASH_DURATION = Histogram(
+    "password_hash_seconds", "bcrypt hash/verify time including the wait for a worker.",
+    ("operation",), buckets=PASSWORD_HASH_BUCKETS,
+)
+PASSWORD_HASH_PENDING = Gauge(
+    "password_hash_pending", "bcrypt operations running or waiting for a worker.",
+    multiprocess_mode=_LIVE_SUM,
+)
+PASSWORD_HASH_REJECTED = Counter(
+    "password_hash_rejected_total", "bcrypt operations rejected with 503 because the queue was full.",
+)
+CACHE_REQUESTS = Counter(
+    "cache_requests_total", "In-process cache lookups by cache name and result (hit, miss).", ("cache", "result"),
+)
+CACHE_ENTRIES = Gauge(
+    "cache_entries", "Entries currently held by the in-process cache.", ("cache",), multiprocess_mode=_LIVE_SUM,
+)
+
+
+# ---- リクエストごとの集計 ----
+
+def route_template(scope: dict) -> Optional[str]:
+    """一致したルートのパスのテンプレート（例: /api/v1/tasks/{task_id}）。ルーティング前や404は None"""
+    route = scope.get("route")
+    template = getattr(route, "path_format", None) or getattr(route, "path", None)
+    if not template:
+        return None
+    # include_router で登録したルートは、FastAPI のバージョンによってはプレフィックスを含まない。
+    # テンプレートに実際の値を入れたものがパスの末尾と一致すれば、その前の部分をプレフィックスとして補う
+    try:
+        matched = template.format(**scope.get("path_params", {}))
+    except (KeyError, IndexError, ValueError):
+        return template
+    path = scope.get("path", "")
+    if matched != path and path.endswith(matched):
+        return path[: len(path) - len(matched)] + template
+    return template
+
+
+@dataclass
+class RequestStats:
+    scope: dict
+    db_queries: int = 0
+    phases: Dict[str, float] = field(default_factory=lambda: dict.fromkeys(PHASES, 0.0))
+    _route: Optional[str] = None
+
+    @property
+    def route(self) -> str:
+        # パスではなくテンプレートを使う（ラベルの種類を増やさない）。ルーティング後は変わらないので1回だけ求める
+        if self._route is None:
+            self._route = route_template(self.scope)
+        return self._route or UNMATCHED_ROUTE
+
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def record_phase(phase: str, seconds: float) -> None:
+    """実行中のリクエストの phase に時間を加える（リクエスト外では何もしない）"""
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.phases[phase] += seconds
+
+
+@contextmanager
+def track(phase: str) -> Iterator[None]:
+    """with の中の時間を実行中のリクエストの phase に加える"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_phase(phase, time.perf_counter() - start)
+
+
+class MetricsMiddleware:
+    """HTTPリクエストのレイテンシ・ステータス・処理中の件数と、その内訳を記録するASGIミドルウェア"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        stats = RequestStats(scope)
+        # 応答を返す前に例外が出た場合は 500
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        token = _request_stats.set(stats)
+        in_progress = HTTP_REQUESTS_IN_PROGRESS.labels(method=method)
+        in_progress.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            in_progress.dec()
+            _request_stats.reset(token)
+
+            route = stats.route
+            HTTP_REQUESTS.labels(method=method, route=route, status=str(status)).inc()
+            HTTP_REQUEST_DURATION.labels(method=method, route=route).observe(elapsed)
+            HTTP_REQUEST_DB_QUERIES.labels(route=route).observe(stats.db_queries)
+            for phase, seconds in stats.phases.items():
+                HTTP_REQUEST_PHASE.labels(route=route, phase=phase).observe(seconds)
+            HTTP_REQUEST_PHASE.labels(route=route, phase="app").observe(max(0.0, elapsed - sum(stats.phases.values())))
+
+
+# ---- SQLAlchemy ----
+
+def _pool_label(pool) -> str:
+    return "async" if isinstance(pool, AsyncAdaptedQueuePool) else "sync"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    if context is not None:
+        context._metrics_start = time.perf_counter()
+
+
+def _record_query(label: str, context) -> None:
+    start = getattr(context, "_metrics_start", None)
+    if start is None:
+        return
+    elapsed = time.perf_counter() - start
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.db_queries += 1
+        stats.phases["db"] += elapsed
+        route = stats.route
+    else:
+        route = BACKGROUND_ROUTE
+    DB_QUERY_DURATION.labels(engine=label, route=route).observe(elapsed)
+
+
+def instrument_engine(engine: Engine, label: str) -> None:
+    """クエリの件数・時間を記録するイベントを登録する（非同期エンジンは sync_engine を渡す）"""
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        _record_query(label, context)
+
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+
+
+class _TimedPool:
+    """
+    プールから接続を取り出す時間（空きがなければ返却を待つ時間も含む）を記録し、
+    取り出し・返却のたびにプールの状態をゲージに設定する（/metrics に応答しないワーカーの値も最新になる）。
+    """
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_CHECKOUT.labels(engine=_pool_label(self)).observe(time.perf_counter() - start)
+            self._set_gauges()
+
+    def _do_return_conn(self, record) -> None:
+        try:
+            super()._do_return_conn(record)
+        finally:
+            self._set_gauges()
+
+    def _set_gauges(self) -> None:
+        label = _pool_label(self)
+        DB_POOL_CONNECTIONS.labels(engine=label, state="size").set(self.size())
+        DB_POOL_CONNECTIONS.labels(engine=label, state="checked_out").set(self.checkedout())
+        DB_POOL_CONNECTIONS.labels(engine=label, state="idle").set(self.checkedin())
+        DB_POOL_CONNECTIONS.labels(engine=label, state="overflow").set(max(0, self.overflow()))
+
+
+class TimedQueuePool(_TimedPool, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(_TimedPool, AsyncAdaptedQueuePool):
+    pass
+
+
+_TIMED_POOLS = {QueuePool: TimedQueuePool, AsyncAdaptedQueuePool: TimedAsyncAdaptedQueuePool}
+
+
+def timed_pool_class(pool_class):
+    """create_engine の poolclass に渡すプール（QueuePool 以外のプールはそのまま返す）"""
+    return _TIMED_POOLS.get(pool_class, pool_class)
+
+
+# ---- 出力 ----
+
+def _multiprocess_dir() -> Optional[str]:
+    return os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+
+
+def render() -> bytes:
+    """/metrics の本文。マルチプロセスモードでは全ワーカーの値を集計する"""
+    if _multiprocess_dir():
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+def mark_process_dead() -> None:
+    """終了するワーカーの処理中の件数などのゲージを合計から外す（アプリの終了時に呼ぶ）"""
+    if _multiprocess_dir():
+        multiprocess.mark_process_dead(os.getpid())
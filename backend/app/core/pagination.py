@@ -0,0 +1,38 @@
+# カーソル（キーセット）ページネーション用のユーティリティ
+
+import base64
+import json
+from datetime import datetime
+from typing import Any
+
+from fastapi import HTTPException
+
+
+def encode_cursor(payload: dict) -> str:
+    """ソートキーとIDを不透明なカーソル文字列に変換"""
+    def _default(value: Any) -> Any:
+        if isinstance(value, datetime):
+            return {"$dt": value.isoformat()}
+        raise TypeError(f"Unsupported cursor value: {value!r}")
+
+    raw = json.dumps(payload, default=_default, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict:
+    """カーソル文字列を復元する。不正な値の場合は400を返す"""
+    def _hook(obj: dict) -> Any:
+        if set(obj) == {"$dt"}:
+            return datetime.fromisoformat(obj["$dt"])
+        return obj
+
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode("ascii"))
+        payload = json.loads(raw, object_hook=_hook)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(payload, dict):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return payload
+
@@ -1,14 +1,20 @@
 # パスワードハッシュ、JWT関連
+import hashlib
+import time
 from datetime import datetime, timedelta
 from typing import Any, Optional
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
-import bcrypt
-from sqlalchemy.orm import Session
+from sqlalchemy import event, inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, make_transient_to_detached, object_session
 
-from app.db.session import get_db
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.hashing import PasswordHasher, check_password, hash_password
+from app.db.session import get_async_db, get_db
 from app.models.user import User
 from app.schemas.token import TokenData
 
@@ -20,14 +26,72 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7 # 1週間
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/users/login/")
 
+# 認証済みユーザーのキャッシュ（ユーザーID -> カラム値）と
+# デコード済みトークンのキャッシュ（トークンのハッシュ -> ユーザーID）
+user_cache = TTLCache(
+    "user",
+    maxsize=settings.USER_CACHE_MAX_SIZE if settings.AUTH_CACHE_ENABLED else 0,
+    ttl=settings.USER_CACHE_TTL_SECONDS,
+)
+token_cache = TTLCache(
+    "token",
+    maxsize=settings.TOKEN_CACHE_MAX_SIZE if settings.AUTH_CACHE_ENABLED else 0,
+    ttl=ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+)
+
+
+def invalidate_user_cache(user_id: int) -> None:
+    """プロフィール更新・ユーザー削除時にキャッシュを破棄する"""
+    user_cache.invalidate(user_id)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_on_flush(mapper, connection, target: User) -> None:
+    # flush時に破棄し、コミット前に他リクエストが古い値を入れた場合に備えてコミット後にも破棄する
+    invalidate_user_cache(target.id)
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("invalidated_user_ids", set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session) -> None:
+    for user_id in session.info.pop("invalidated_user_ids", ()):
+        invalidate_user_cache(user_id)
+
+
+def _user_from_cache(db: Session | AsyncSession, user_id: int) -> Optional[User]:
+    """キャッシュにあればDBに問い合わせずにセッションへ紐づけたUserを返す"""
+    values = user_cache.get(user_id)
+    if values is None:
+        return None
+    user = User(**values)
+    make_transient_to_detached(user)
+    db.add(user)
+    return user
+
+
+def _cache_user(user: User) -> None:
+    values = {attr.key: getattr(user, attr.key) for attr in inspect(User).column_attrs}
+    user_cache.set(user.id, values)
+
+
+# bcrypt はCPUを長時間使うため、エンドポイントからは password_hasher 経由で実行する
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+    rounds=settings.BCRYPT_ROUNDS,
+)
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """平文パスワードとハッシュを比較"""
-    return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+    return check_password(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
     """パスワードをハッシュ化"""
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    return hash_password(password, settings.BCRYPT_ROUNDS)
 
 def create_access_token(subject: str | Any) -> str:
     """JWTアクセストークンを生成"""
@@ -36,23 +100,63 @@ def create_access_token(subject: str | Any) -> str:
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def get_current_user(
-    db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)
-) -> User:
+def _user_id_from_token(token: str) -> int:
+    """トークンを検証してユーザーIDを返す（デコード結果は有効期限までキャッシュ）"""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    token_key = hashlib.sha256(token.encode("utf-8")).hexdigest()
+    user_id = token_cache.get(token_key)
+    if user_id is not None:
+        return user_id
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: str = payload.get("sub")
-        if user_id is None:
+        subject: str = payload.get("sub")
+        if subject is None:
             raise credentials_exception
-        token_data = TokenData(user_id=int(user_id))
+        token_data = TokenData(user_id=int(subject))
     except (JWTError, ValueError):
         raise credentials_exception
-    user = db.query(User).filter(User.id == token_data.user_id).first()
+    # トークンの有効期限まで保持する
+    expires_in = payload["exp"] - time.time() if "exp" in payload else None
+    token_cache.set(token_key, token_data.user_id, ttl=expires_in)
+    return token_data.user_id
+
+
+def _user_not_found() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+def get_current_user(
+    db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)
+) -> User:
+    user_id = _user_id_from_token(token)
+    user = _user_from_cache(db, user_id)
+    if user is not None:
+        return user
+    user = db.query(User).filter(User.id == user_id).first()
     if user is None:
-        raise credentials_exception
-    return user
\ No newline at end of file
+        raise _user_not_found()
+    _cache_user(user)
+    return user
+
+
+async def get_current_user_async(
+    db: AsyncSession = Depends(get_async_db), token: str = Depends(oauth2_scheme)
+) -> User:
+    """get_current_user の非同期DB版（DB_ASYNC=True のときに使用）"""
+    user_id = _user_id_from_token(token)
+    user = _user_from_cache(db, user_id)
+    if user is not None:
+        return user
+    user = await db.get(User, user_id)
+    if user is None:
+        raise _user_not_found()
+    _cache_user(user)
+    return user
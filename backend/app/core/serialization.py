@@ -0,0 +1,46 @@
+# 一覧レスポンスの高速化（ORMオブジェクトを作らず、列の値をそのまま JSON にする）
+#
+# 通常の経路では、ORMオブジェクトを読み込み → response_model で検証（from_attributes）→ JSON 化する。
+# 一覧では、レスポンススキーマの項目と同名の列だけを Core の SELECT で取得し、
+# 行のタプルを orjson で直接 JSON にする。値の型は列の型で決まるため検証は省く。
+# 比較用のベンチマーク: python -m benchmarks.bench_serialization
+
+from typing import Iterable, Optional, Sequence, Type
+
+import orjson
+from fastapi import Response
+from pydantic import BaseModel
+from sqlalchemy import select
+
+from app.core.metrics import track
+
+
+class RowProjection:
+    """
+    レスポンススキーマの項目をモデルの列として SELECT し、結果の行をそのまま JSON にする。
+    項目名と列名が一致しない場合は定義時に AttributeError になる。
+    """
+
+    def __init__(self, model, schema: Type[BaseModel]):
+        self.schema = schema
+        # スキーマの項目順（通常の経路と同じキー順）で取得する
+        self.fields = tuple(schema.model_fields)
+        self.columns = [getattr(model, name) for name in self.fields]
+
+    def select(self):
+        return select(*self.columns)
+
+    def dumps(self, rows: Iterable[Sequence]) -> bytes:
+        with track("serialization"):
+            return orjson.dumps([dict(zip(self.fields, row)) for row in rows])
+
+    def response(self, rows: Iterable[Sequence], response: Response, next_cursor: Optional[str] = None) -> Response:
+        """
+        JSON のレスポンスを返す（response_model による検証・変換は行われない）。
+        response はエンドポイントに注入された Response。依存関係で付けたヘッダ（ETag など）を引き継ぐ。
+        """
+        result = Response(self.dumps(rows), media_type="application/json")
+        result.headers.raw.extend(response.headers.raw)
+        if next_cursor:
+            result.headers["X-Next-Cursor"] = next_cursor
+        return result
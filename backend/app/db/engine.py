@@ -0,0 +1,110 @@
+# 設定(Settings)に基づいてDBエンジンを作成する
+
+from typing import Optional
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from app.core.config import settings
+from app.core.metrics import instrument_engine, timed_pool_class
+from app.db.search import register_search_functions
+from app.db.upsert import DIALECT_INSERTS
+
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    """接続ごとにSQLiteのPRAGMAを設定する"""
+    cursor = dbapi_connection.cursor()
+    try:
+        # WALにすると読み込みが書き込みを待たなくなり、複数ワーカーで同じDBファイルを共有できる
+        cursor.execute(f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+        cursor.execute(f"PRAGMA cache_size={int(settings.SQLITE_CACHE_SIZE)}")
+        cursor.execute(f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE)}")
+    finally:
+        cursor.close()
+
+
+def _check_backend(url: str) -> None:
+    """
+    対応しているDBか確認する。変更ジャーナルなどの更新は INSERT ... ON CONFLICT (app.db.upsert) を使うため、
+    それ以外のDBでは起動時にエラーにする（書き込みのたびに500になるのを防ぐ）。
+    """
+    backend = make_url(url).get_backend_name()
+    if backend not in DIALECT_INSERTS:
+        supported = ", ".join(sorted(DIALECT_INSERTS))
+        raise ValueError(f"Unsupported database backend '{backend}' (supported: {supported})")
+
+
+def _pool_class(url: str):
+    """ドライバの既定のプール（接続の取得時間を /metrics に記録するもの）"""
+    parsed = make_url(url)
+    return timed_pool_class(parsed.get_dialect().get_pool_class(parsed))
+
+
+def create_db_engine(url: Optional[str] = None) -> Engine:
+    """
+    SQLiteの場合は check_same_thread を外してPRAGMAを設定し、
+    それ以外のDBではコネクションプールの設定を適用したエンジンを返す。
+    SQLiteでは全文検索のトリガーが使う関数（app.db.search）も接続ごとに登録する。
+    クエリの件数・時間とプールの状態は /metrics に出る。
+    """
+    url = url or settings.SQLALCHEMY_DATABASE_URL
+    _check_backend(url)
+    if make_url(url).get_backend_name() == "sqlite":
+        engine = create_engine(url, connect_args={"check_same_thread": False}, poolclass=_pool_class(url))
+        event.listen(engine, "connect", _apply_sqlite_pragmas)
+        event.listen(engine, "connect", register_search_functions)
+    else:
+        engine = create_engine(
+            url,
+            poolclass=_pool_class(url),
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_pre_ping=settings.DB_POOL_PRE_PING,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+        )
+    instrument_engine(engine, "sync")
+    return engine
+
+
+# 非同期ドライバの対応表（URLにドライバ指定がない場合に使う）
+ASYNC_DRIVERS = {
+    "sqlite": "aiosqlite",
+    "postgresql": "asyncpg",
+}
+
+
+def async_database_url(url: str) -> str:
+    """同期用のURLを非同期ドライバのURLに変換する（例: sqlite:// -> sqlite+aiosqlite://）"""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if parsed.get_driver_name() in ASYNC_DRIVERS.values():
+        return url
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for database backend '{backend}'")
+    return parsed.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}").render_as_string(hide_password=False)
+
+
+def create_async_db_engine(url: Optional[str] = None) -> AsyncEngine:
+    """create_db_engine の非同期版（DB_ASYNC=True のときに使用）"""
+    url = async_database_url(url or settings.SQLALCHEMY_DATABASE_URL)
+    _check_backend(url)
+    if make_url(url).get_backend_name() == "sqlite":
+        engine = create_async_engine(url, poolclass=_pool_class(url))
+        event.listen(engine.sync_engine, "connect", _apply_sqlite_pragmas)
+        event.listen(engine.sync_engine, "connect", register_search_functions)
+    else:
+        engine = create_async_engine(
+            url,
+            poolclass=_pool_class(url),
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_pre_ping=settings.DB_POOL_PRE_PING,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+        )
+    instrument_engine(engine.sync_engine, "async")
+    return engine
@@ -0,0 +1,49 @@
+# テーブル・インデックスの作成（マイグレーションツール導入までの簡易版）
+
+import time
+
+from sqlalchemy import inspect
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError, ProgrammingError
+
+from app.db.base import Base
+from app.db.search import ensure_search_index
+
+
+def _add_missing_columns(engine: Engine) -> None:
+    """既存テーブルに後から追加された NULL 可の列を ALTER TABLE で追加する"""
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        missing = [c for c in table.columns if c.name not in existing and c.nullable and c.server_default is None]
+        with engine.begin() as connection:
+            for column in missing:
+                column_type = column.type.compile(dialect=engine.dialect)
+                connection.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}")
+
+
+def sync_schema(engine: Engine, attempts: int = 3) -> None:
+    """
+    存在しないテーブルを作成し、既存テーブルに後から追加された
+    インデックスと NULL 可の列も作成する。
+    (create_all は既存テーブルのインデックスを追加しないため)
+    全文検索の索引（app.db.search）もここで作成する。
+    複数ワーカーが同時に起動して先に作成された場合は、少し待ってやり直す。
+    """
+    for attempt in range(attempts):
+        try:
+            Base.metadata.create_all(bind=engine)
+            _add_missing_columns(engine)
+            for table in Base.metadata.sorted_tables:
+                for index in table.indexes:
+                    index.create(bind=engine, checkfirst=True)
+            with engine.begin() as connection:
+                ensure_search_index(connection)
+            return
+        except (OperationalError, ProgrammingError):
+            if attempt == attempts - 1:
+                raise
+            time.sleep(0.1 * (attempt + 1))
@@ -0,0 +1,130 @@
+# タスクの全文検索用インデックス（/tasks/search）
+# 日本語は空白で区切られないため、どちらのDBも3文字単位（trigram）で索引を作る。
+# - SQLite: FTS5 (tokenize='trigram') の外部コンテンツテーブル。tasks へのトリガーで同期する
+#   trigram で引けない2文字以下の語（「会議」など）用に、2文字単位（bigram）の FTS5 テーブルも作る。
+#   こちらは本文を2文字ずつに区切った文字列（search_bigrams 関数）を索引にする
+# - PostgreSQL: pg_trgm の GIN 式インデックス（tsvector は日本語を分かち書きしないため使わない）
+
+import unicodedata
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+# PostgreSQL のインデックス式。検索クエリでも同じ式を使う（式が一致しないとインデックスが使われない）
+TASK_DOCUMENT_SQL = "(coalesce(tasks.title, '') || ' ' || coalesce(tasks.description, ''))"
+
+_SQLITE_DDL = [
+    """
+    CREATE VIRTUAL TABLE tasks_fts USING fts5(
+        title, description, content='tasks', content_rowid='id', tokenize='trigram'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS tasks_fts_ai AFTER INSERT ON tasks BEGIN
+        INSERT INTO tasks_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS tasks_fts_ad AFTER DELETE ON tasks BEGIN
+        INSERT INTO tasks_fts(tasks_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS tasks_fts_au AFTER UPDATE OF title, description ON tasks BEGIN
+        INSERT INTO tasks_fts(tasks_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO tasks_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END
+    """,
+    # 既存のタスクから索引を作る
+    "INSERT INTO tasks_fts(tasks_fts) VALUES ('rebuild')",
+]
+
+# search_bigrams() はトリガーから呼ぶため、接続ごとに登録しておく (register_search_functions)
+_SQLITE_BIGRAM_DDL = [
+    # 索引だけを持つ（contentless）テーブル。削除時は登録したときと同じ値を渡す
+    """
+    CREATE VIRTUAL TABLE tasks_fts_bigram USING fts5(
+        title, description, content='', tokenize='unicode61 remove_diacritics 0'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS tasks_fts_bigram_ai AFTER INSERT ON tasks BEGIN
+        INSERT INTO tasks_fts_bigram(rowid, title, description)
+        VALUES (new.id, search_bigrams(new.title), search_bigrams(new.description));
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS tasks_fts_bigram_ad AFTER DELETE ON tasks BEGIN
+        INSERT INTO tasks_fts_bigram(tasks_fts_bigram, rowid, title, description)
+        VALUES ('delete', old.id, search_bigrams(old.title), search_bigrams(old.description));
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS tasks_fts_bigram_au AFTER UPDATE OF title, description ON tasks BEGIN
+        INSERT INTO tasks_fts_bigram(tasks_fts_bigram, rowid, title, description)
+        VALUES ('delete', old.id, search_bigrams(old.title), search_bigrams(old.description));
+        INSERT INTO tasks_fts_bigram(rowid, title, description)
+        VALUES (new.id, search_bigrams(new.title), search_bigrams(new.description));
+    END
+    """,
+    # 既存のタスクから索引を作る
+    """
+    INSERT INTO tasks_fts_bigram(rowid, title, description)
+    SELECT id, search_bigrams(title), search_bigrams(description) FROM tasks
+    """,
+]
+
+_POSTGRES_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    f"CREATE INDEX IF NOT EXISTS ix_tasks_search_trgm ON tasks USING gin ({TASK_DOCUMENT_SQL} gin_trgm_ops)",
+]
+
+
+def is_token_char(char: str) -> bool:
+    """FTS5 の unicode61 トークナイザが語の一部とみなす文字（文字・数字・私用文字）"""
+    category = unicodedata.category(char)
+    return category[0] in "LN" or category == "Co"
+
+
+def bigrams(value: Optional[str]) -> List[str]:
+    """
+    各文字から始まる2文字（末尾は1文字）の一覧。
+    1文字の語は「その文字で始まる語」の前方一致で、2文字の語は完全一致で引ける。
+    """
+    if not value:
+        return []
+    return [value[i:i + 2] for i in range(len(value))]
+
+
+def search_bigrams(value: Optional[str]) -> str:
+    """bigram の索引に入れる文字列（2文字ずつ空白で区切る。記号などは unicode61 が区切り文字として捨てる）"""
+    return " ".join(bigrams(value))
+
+
+def register_search_functions(dbapi_connection, connection_record=None) -> None:
+    """SQLiteの接続に search_bigrams() を登録する（エンジンの connect イベントから呼ぶ）"""
+    dbapi_connection.create_function("search_bigrams", 1, search_bigrams, deterministic=True)
+
+
+def _sqlite_table_exists(connection: Connection, name: str) -> bool:
+    return connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": name}
+    ).first() is not None
+
+
+def ensure_search_index(connection: Connection) -> None:
+    """検索用の索引がなければ作成する（sync_schema から呼ぶ）"""
+    dialect = connection.dialect.name
+    if dialect == "sqlite":
+        if not _sqlite_table_exists(connection, "tasks_fts"):
+            for statement in _SQLITE_DDL:
+                connection.execute(text(statement))
+        if not _sqlite_table_exists(connection, "tasks_fts_bigram"):
+            for statement in _SQLITE_BIGRAM_DDL:
+                connection.execute(text(statement))
+    elif dialect == "postgresql":
+        for statement in _POSTGRES_DDL:
+            connection.execute(text(statement))
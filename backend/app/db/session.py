@@ -1,4 +1,10 @@
+from typing import Any, Callable, TypeVar
+
 from fastapi import Request
+from sqlalchemy.ext.asyncio import AsyncSession
+
+T = TypeVar("T")
+
 
 def get_db(request: Request):
     """
@@ -11,4 +17,22 @@ def get_db(request: Request):
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+async def get_async_db(request: Request):
+    """
+    get_db の非同期版。DB_ASYNC=True のときに lifespan で作成された
+    AsyncSessionLocal からリクエストごとの AsyncSession を提供する。
+    """
+    AsyncSessionLocal = request.app.state.AsyncSessionLocal
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def run_handler(db: AsyncSession, handler: Callable[..., T], **kwargs: Any) -> T:
+    """
+    同期版のハンドラを AsyncSession の同期セッションを db として実行する（DB_ASYNC=True の非同期版ルートから使う）。
+    ハンドラの本体（クエリ・コミット・レスポンスの組み立て）は同期版と共通になる。
+    """
+    return await db.run_sync(lambda session: handler(db=session, **kwargs))
@@ -0,0 +1,12 @@
+# INSERT ... ON CONFLICT（登録済みなら更新・何もしない）を使うための方言ごとの insert
+# 対応していないDBはエンジン作成時 (app.db.engine) に弾くため、実行時に見つからないことはない
+
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+DIALECT_INSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+
+def dialect_insert(db: Session):
+    """セッションの接続先に合わせた insert（on_conflict_do_update / on_conflict_do_nothing が使える）"""
+    return DIALECT_INSERTS[db.get_bind().dialect.name]
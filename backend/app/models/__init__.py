@@ -4,5 +4,10 @@
 from app.models.user import User
 from app.models.category import Category
 from app.models.task import Task
+from app.models.task_stats import UserTaskStats, UserTaskDeadlineBucket
+from app.models.geofence import GeofenceSession
+from app.models.sync import SyncCounter, ChangeJournalEntry
+from app.models.notification import NotificationDevice
 
-__all__ = ["User", "Category", "Task"]
+__all__ = ["User", "Category", "Task", "UserTaskStats", "UserTaskDeadlineBucket", "GeofenceSession",
+           "SyncCounter", "ChangeJournalEntry", "NotificationDevice"]
@@ -1,11 +1,15 @@
 # カテゴリのデータ構造を定義
 
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, String, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.db.base import Base
 
 class Category(Base):
     __tablename__ = "categories"
+    __table_args__ = (
+        # ユーザーごとの一覧（id順）用
+        Index("ix_categories_user_id_id", "user_id", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
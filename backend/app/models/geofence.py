@@ -0,0 +1,18 @@
+# ユーザーごとのジオフェンス状態（最後に居たエリア）
+
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, Index
+from sqlalchemy.sql import func
+from sqlalchemy.orm import relationship
+from app.db.base import Base
+
+class GeofenceSession(Base):
+    __tablename__ = "geofence_sessions"
+    __table_args__ = (
+        # 場所の削除時に、その場所に居るセッションを探す
+        Index("ix_geofence_sessions_location_id", "location_id"),
+    )
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    location_id = Column(Integer, ForeignKey("locations.id"), nullable=True)  # 現在居るエリア（なければNone）
+    location = relationship("Location")
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
@@ -1,9 +1,16 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.db.base import Base
 
 class Location(Base):
     __tablename__ = "locations"
+    __table_args__ = (
+        # /locations/nearby の範囲検索用
+        Index("ix_locations_owner_lat_lon", "owner_id", "latitude", "longitude"),
+        Index("ix_locations_owner_radius", "owner_id", "radius"),
+        # 所有者 + id（一覧・/sync の IN 検索）用
+        Index("ix_locations_owner_id_id", "owner_id", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True)  # "自宅", "学校" など
@@ -1,17 +1,22 @@
-from datetime import datetime
-from typing import Optional, TYPE_CHECKING
-from sqlmodel import Field, Relationship, SQLModel
+# プッシュ通知の送信先デバイス
 
-if TYPE_CHECKING:
-    from app.models.user import User
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, String
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+from app.db.base import Base
 
-class NotificationDevice(SQLModel, table=True):
+class NotificationDevice(Base):
     __tablename__ = "notification_devices"
+    __table_args__ = (
+        # 登録の upsert 先。先頭が user_id なのでユーザーごとの読み込みにも使う
+        Index("uq_notification_devices_user_token", "user_id", "device_token", unique=True),
+    )
 
-    id: Optional[int] = Field(default=None, primary_key=True)
-    user_id: int = Field(foreign_key="user.id")
-    device_token: str = Field(index=True)
-    device_type: Optional[str] = None  # "ios", "android", "web"
-    created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    device_token = Column(String, nullable=False, index=True)  # 拒否されたトークンの削除用
+    device_type = Column(String, nullable=True)  # "ios", "android", "web"
+    created_at = Column(DateTime, nullable=False, default=func.now())
+    updated_at = Column(DateTime, nullable=False, default=func.now(), onupdate=func.now())  # 最後に登録された日時
 
-    user: Optional["User"] = Relationship(back_populates="notification_devices")
\ No newline at end of file
+    user = relationship("User", back_populates="notification_devices")
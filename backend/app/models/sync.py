@@ -0,0 +1,30 @@
+# 差分同期 (/sync) 用の変更ジャーナル
+
+from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Index, Integer, String
+from app.db.base import Base
+
+class SyncCounter(Base):
+    """ユーザーごとの変更シーケンス（最後に割り当てた番号）"""
+    __tablename__ = "sync_counters"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    last_seq = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=True)  # 最後に番号を割り当てた日時 (UTC)。Last-Modified に使う
+
+
+class ChangeJournalEntry(Base):
+    """
+    行ごとの最後の変更。同じ行が何度変わっても1行だけ持ち、seq を更新する。
+    deleted=True の行は削除の墓標（クライアントにキャッシュから消させる）。
+    """
+    __tablename__ = "change_journal"
+    __table_args__ = (
+        # /sync?since= の範囲検索用
+        Index("ix_change_journal_user_seq", "user_id", "seq"),
+    )
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    entity = Column(String, primary_key=True)       # "task" / "category" / "location"
+    entity_id = Column(Integer, primary_key=True)
+    seq = Column(Integer, nullable=False)
+    deleted = Column(Boolean, nullable=False, default=False)
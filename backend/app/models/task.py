@@ -1,13 +1,24 @@
 #タスクのデータ構造を定義（タスク名、期限、優先度、カテゴリ、完了フラグ、位置情報トリガーなど）。
 #タスクの追加/編集/削除、期限設定、完了チェック、タグ/カテゴリ、優先度設定、位置情報
 
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.db.base import Base
 
 class Task(Base):
     __tablename__ = "tasks"
+    __table_args__ = (
+        # 一覧のキーセットページング用 (owner_id, ソートキー, id)
+        Index("ix_tasks_owner_created_at_id", "owner_id", "created_at", "id"),
+        Index("ix_tasks_owner_deadline_id", "owner_id", "deadline", "id"),
+        Index("ix_tasks_owner_priority_id", "owner_id", "priority", "id"),
+        # 所有者 + id（/sync の IN 検索、id順の読み込み）用
+        Index("ix_tasks_owner_id_id", "owner_id", "id"),
+        # 場所・カテゴリの削除時に参照を外すタスクの検索、場所での絞り込み用
+        Index("ix_tasks_location_id", "location_id"),
+        Index("ix_tasks_category_id", "category_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, index=True, nullable=False)
@@ -0,0 +1,23 @@
+# ユーザーごとのタスク集計値（/tasks/stats 用のカウンタ）
+
+from sqlalchemy import Column, Integer, Date, ForeignKey
+from app.db.base import Base
+
+class UserTaskStats(Base):
+    __tablename__ = "user_task_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    total = Column(Integer, nullable=False, default=0)      # タスク総数
+    completed = Column(Integer, nullable=False, default=0)  # 完了済みタスク数
+
+
+class UserTaskDeadlineBucket(Base):
+    """
+    未完了タスクを期限日ごとに数えたもの。
+    期限切れ件数は「今日より前のバケットの合計 + 今日の分」で読み出し時に求める。
+    """
+    __tablename__ = "user_task_deadline_buckets"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    bucket_date = Column(Date, primary_key=True)            # 期限の日付
+    open_count = Column(Integer, nullable=False, default=0) # 未完了タスク数
@@ -12,9 +12,13 @@ class User(Base):
     username = Column(String, unique=True, index=True, nullable=False)
     hashed_password = Column(String, nullable=False)
     display_name = Column(String, nullable=True)  # 表示名
-    avatar_url = Column(String, nullable=True)    # アイコン画像URL（Base64も可）
+    # アイコン画像のハッシュ（画像本体は app.services.avatar_service の保存先に置く）
+    # 旧 avatar_url 列（Base64を直接保存していた）はマッピングせず、
+    # python -m app.services.avatar_service --migrate で移行する
+    avatar_hash = Column(String(64), nullable=True)
     
     # リレーション定義
     tasks = relationship("Task", back_populates="owner")
     categories = relationship("Category", back_populates="owner")
     locations = relationship("Location", back_populates="owner")
+    notification_devices = relationship("NotificationDevice", back_populates="user")
@@ -1,5 +1,6 @@
-from pydantic import BaseModel
-from typing import Optional
+from datetime import datetime
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
 
 class LocationBase(BaseModel):
     name: str
@@ -27,4 +28,30 @@ class LocationResponse(LocationBase):
 
 class NearbyLocationResponse(LocationResponse):
     """現在地からの距離情報を含む場所レスポンス"""
-    distance: float  # 現在地からの距離（メートル）
\ No newline at end of file
+    distance: float  # 現在地からの距離（メートル）
+
+class LocationFix(BaseModel):
+    """端末で取得した1回分の位置情報"""
+    timestamp: datetime
+    latitude: float
+    longitude: float
+
+class GeofenceBatchRequest(BaseModel):
+    fixes: List[LocationFix] = Field(..., max_length=1000)
+    current_location_id: Optional[int] = None  # 送信前に端末が居たエリア（なければNone）
+
+class GeofenceTransition(BaseModel):
+    """エリアへの出入りイベント"""
+    timestamp: datetime
+    event: Literal["enter", "exit"]
+    location_id: int
+    distance: Optional[float] = None  # enter時のエリア中心からの距離（メートル）
+
+class GeofenceSessionUpdate(BaseModel):
+    latitude: float
+    longitude: float
+    timestamp: Optional[datetime] = None  # 省略時はサーバーの現在時刻（いずれもタイムゾーンなしのUTCで返す）
+
+class GeofenceBatchResponse(BaseModel):
+    transitions: List[GeofenceTransition]
+    current_location_id: Optional[int] = None  # 最後の地点で居るエリア
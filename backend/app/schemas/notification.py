@@ -1,10 +1,10 @@
 from datetime import datetime
 from typing import Optional
-from sqlmodel import SQLModel
+from pydantic import BaseModel
 
-class NotificationDeviceBase(SQLModel):
+class NotificationDeviceBase(BaseModel):
     device_token: str
-    device_type: Optional[str] = None
+    device_type: Optional[str] = None  # "ios", "android", "web"
 
 class NotificationDeviceCreate(NotificationDeviceBase):
     pass
@@ -12,4 +12,7 @@ class NotificationDeviceCreate(NotificationDeviceBase):
 class NotificationDeviceResponse(NotificationDeviceBase):
     id: int
     user_id: int
-    created_at: datetime
\ No newline at end of file
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
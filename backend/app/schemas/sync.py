@@ -0,0 +1,20 @@
+from pydantic import BaseModel
+from typing import List
+
+from app.schemas.category import CategoryResponse
+from app.schemas.location import LocationResponse
+from app.schemas.task import TaskResponse
+
+class SyncDeleted(BaseModel):
+    tasks: List[int] = []
+    categories: List[int] = []
+    locations: List[int] = []
+
+class SyncResponse(BaseModel):
+    seq: int          # 次回の since に渡す値
+    has_more: bool    # True なら続きがある（すぐに seq で再取得する）
+    reset: bool       # True ならクライアントのキャッシュを破棄してから適用する
+    tasks: List[TaskResponse]
+    categories: List[CategoryResponse]
+    locations: List[LocationResponse]
+    deleted: SyncDeleted
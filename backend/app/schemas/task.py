@@ -1,6 +1,6 @@
-from pydantic import BaseModel
-from datetime import datetime
-from typing import Optional
+from pydantic import BaseModel, Field
+from datetime import date, datetime
+from typing import Annotated, List, Literal, Optional, Union
 
 class TaskBase(BaseModel):
     title: str
@@ -31,4 +31,79 @@ class TaskResponse(TaskBase):
     category_id: Optional[int] = None
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+# 一括操作 (/tasks/batch)
+class TaskBatchCreate(BaseModel):
+    op: Literal["create"]
+    task: TaskCreate
+
+class TaskBatchUpdate(BaseModel):
+    op: Literal["update"]
+    id: int
+    task: TaskUpdate
+
+class TaskBatchComplete(BaseModel):
+    op: Literal["complete"]
+    id: int
+    is_completed: bool = True  # False で未完了に戻す
+
+class TaskBatchDelete(BaseModel):
+    op: Literal["delete"]
+    id: int
+
+TaskBatchOperation = Annotated[
+    Union[TaskBatchCreate, TaskBatchUpdate, TaskBatchComplete, TaskBatchDelete],
+    Field(discriminator="op"),
+]
+
+class TaskBatchRequest(BaseModel):
+    operations: List[TaskBatchOperation] = Field(min_length=1, max_length=500)
+
+class TaskBatchItemResult(BaseModel):
+    """operations[index] の結果。見つからないタスクへの操作は status="not_found" になる"""
+    index: int
+    op: Literal["create", "update", "complete", "delete"]
+    status: Literal["ok", "not_found"]
+    id: Optional[int] = None
+    task: Optional[TaskResponse] = None  # 削除と not_found では None
+
+class TaskBatchResponse(BaseModel):
+    results: List[TaskBatchItemResult]
+
+
+# カレンダー (/tasks/calendar)
+class TaskCalendarPriority(BaseModel):
+    low: int = 0     # priority 1
+    medium: int = 0  # priority 2
+    high: int = 0    # priority 3
+
+class TaskCalendarDay(BaseModel):
+    date: date
+    # その日の範囲 [start, end)。/tasks/?start_date=&end_date= で中身を取得するときに使う
+    start: datetime
+    end: datetime
+    total: int
+    completed: int
+    overdue: int
+    priority: TaskCalendarPriority
+
+class TaskCalendarResponse(BaseModel):
+    tz: str
+    days: List[TaskCalendarDay]  # タスクのある日のみ（日付順）
+
+
+# インポート (/tasks/import)
+class TaskImportRow(TaskCreate):
+    """1行分のタスク。エクスポートしたファイルを取り込めるよう完了状態も受け付ける（id などの列は無視する）"""
+    is_completed: bool = False
+
+class TaskImportError(BaseModel):
+    line: int   # ファイルの行番号（1始まり）
+    error: str
+
+class TaskImportResponse(BaseModel):
+    created: int
+    failed: int
+    errors: List[TaskImportError]  # 先頭の100件まで
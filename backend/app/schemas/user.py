@@ -1,8 +1,10 @@
 # UserCreate, UserLogin, UserResponse, UserUpdate
 
-from pydantic import BaseModel
+from pydantic import BaseModel, computed_field
 from typing import Optional
 
+from app.services.avatar_service import avatar_url
+
 class UserBase(BaseModel):
     username: str
 
@@ -10,13 +12,19 @@ class UserCreate(UserBase):
     password: str # 作成時にパスワードを受け取る
 
 class UserUpdate(BaseModel):
+    # アイコン画像は PUT /users/me/avatar でアップロードする
     display_name: Optional[str] = None
-    avatar_url: Optional[str] = None
 
 class UserResponse(UserBase):
     id: int
     display_name: Optional[str] = None
-    avatar_url: Optional[str] = None
+    avatar_hash: Optional[str] = None
+
+    @computed_field
+    @property
+    def avatar_url(self) -> Optional[str]:
+        """アイコン画像（256px）のURL。他のサイズは末尾を 64/128/512.webp に変える"""
+        return avatar_url(self.avatar_hash)
 
     class Config:
         from_attributes = True # SQLAlchemyモデルからの変換を許可
\ No newline at end of file
@@ -0,0 +1,151 @@
+# アイコン画像の保存（内容のハッシュをキーにしたファイル保存）
+# users にはハッシュだけを持ち、画像は AVATAR_STORAGE_DIR/<先頭2文字>/<ハッシュ>/<サイズ>.webp に置く。
+# 同じ内容なら同じパスになるため、配信時は変更されない前提で長期キャッシュさせる。
+#
+# 旧形式（users.avatar_url に Base64 の data URL を保存していたもの）の移行:
+#   python -m app.services.avatar_service --migrate
+
+import argparse
+import base64
+import hashlib
+import io
+import os
+import re
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+from fastapi import HTTPException
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from app.core.config import settings
+
+# 生成するサムネイルの一辺（px）。正方形に切り抜いて縮小する
+AVATAR_SIZES = (64, 128, 256, 512)
+DEFAULT_AVATAR_SIZE = 256
+
+_ACCEPTED_FORMATS = {"JPEG", "PNG", "WEBP", "GIF"}
+_HASH_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+
+def avatar_dir(avatar_hash: str) -> Path:
+    return Path(settings.AVATAR_STORAGE_DIR) / avatar_hash[:2] / avatar_hash
+
+
+def avatar_path(avatar_hash: str, size: int) -> Optional[Path]:
+    """保存済みのサムネイルのパス。ハッシュ・サイズが不正、またはファイルがなければ None"""
+    if size not in AVATAR_SIZES or not _HASH_PATTERN.match(avatar_hash):
+        return None
+    path = avatar_dir(avatar_hash) / f"{size}.webp"
+    return path if path.is_file() else None
+
+
+def _open_image(data: bytes) -> Image.Image:
+    if len(data) > settings.AVATAR_MAX_BYTES:
+        raise HTTPException(status_code=413, detail="Image too large")
+    try:
+        image = Image.open(io.BytesIO(data))
+        if image.format not in _ACCEPTED_FORMATS:
+            raise HTTPException(status_code=415, detail="Unsupported image format")
+        if image.width * image.height > settings.AVATAR_MAX_PIXELS:
+            raise HTTPException(status_code=413, detail="Image dimensions too large")
+        image.load()
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError):
+        raise HTTPException(status_code=400, detail="Invalid image")
+    # 回転情報を反映し、アニメーションGIFは1枚目だけを使う
+    image = ImageOps.exif_transpose(image)
+    return image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    # 同じハッシュを同時に保存しても壊れたファイルが見えないよう、一時ファイルから置き換える
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def store_avatar(data: bytes) -> str:
+    """
+    画像を検証してサムネイルを作成・保存し、ハッシュ（アップロードされた内容の SHA-256）を返す。
+    保存済みのハッシュなら何もしない。CPUを使うためスレッドプールから呼ぶ。
+    """
+    avatar_hash = hashlib.sha256(data).hexdigest()
+    directory = avatar_dir(avatar_hash)
+    if all((directory / f"{size}.webp").is_file() for size in AVATAR_SIZES):
+        return avatar_hash
+
+    image = _open_image(data)
+    directory.mkdir(parents=True, exist_ok=True)
+    square = ImageOps.fit(image, (max(AVATAR_SIZES),) * 2, Image.Resampling.LANCZOS)
+    for size in sorted(AVATAR_SIZES, reverse=True):
+        thumbnail = square if size == square.width else square.resize((size, size), Image.Resampling.LANCZOS)
+        buffer = io.BytesIO()
+        thumbnail.save(buffer, "WEBP", quality=85, method=4)
+        _write_atomic(directory / f"{size}.webp", buffer.getvalue())
+    return avatar_hash
+
+
+def avatar_url(avatar_hash: Optional[str], size: int = DEFAULT_AVATAR_SIZE) -> Optional[str]:
+    if not avatar_hash:
+        return None
+    return f"{settings.API_V1_STR}/users/avatars/{avatar_hash}/{size}.webp"
+
+
+def _decode_data_url(value: str) -> Optional[bytes]:
+    """'data:image/png;base64,....' を画像のバイト列にする。data URL でなければ None"""
+    if not value.startswith("data:") or ";base64," not in value:
+        return None
+    try:
+        return base64.b64decode(value.split(";base64,", 1)[1], validate=True)
+    except ValueError:
+        return None
+
+
+def migrate_legacy_avatars(engine) -> int:
+    """users.avatar_url の data URL を保存先に移してハッシュに置き換える。移行した件数を返す"""
+    from sqlalchemy import inspect, text
+
+    if "avatar_url" not in {c["name"] for c in inspect(engine).get_columns("users")}:
+        return 0
+    migrated = 0
+    with engine.begin() as connection:
+        rows = connection.execute(
+            text("SELECT id, avatar_url FROM users WHERE avatar_url IS NOT NULL AND avatar_hash IS NULL")
+        ).all()
+        for user_id, value in rows:
+            data = _decode_data_url(value)
+            avatar_hash = None
+            if data is not None:
+                try:
+                    avatar_hash = store_avatar(data)
+                except HTTPException as exc:
+                    print(f"user {user_id}: skipped ({exc.detail})")
+            # 移行できなかった値（外部URLや壊れた画像）も users からは消す
+            connection.execute(
+                text("UPDATE users SET avatar_hash = :hash, avatar_url = NULL WHERE id = :id"),
+                {"hash": avatar_hash, "id": user_id},
+            )
+            migrated += avatar_hash is not None
+    return migrated
+
+
+if __name__ == "__main__":
+    from app.db.engine import create_db_engine
+    from app.db.schema import sync_schema
+    from app.models import user, task, category, location, task_stats, geofence, sync, notification  # noqa: F401
+
+    parser = argparse.ArgumentParser(description="アイコン画像の保存先を管理する")
+    parser.add_argument("--migrate", action="store_true", help="users.avatar_url の Base64 画像を移行する")
+    args = parser.parse_args()
+    if args.migrate:
+        engine = create_db_engine()
+        sync_schema(engine)
+        print(f"migrated {migrate_legacy_avatars(engine)} avatars")
+    else:
+        parser.print_help()
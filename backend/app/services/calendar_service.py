@@ -0,0 +1,164 @@
+# カレンダー表示用の日別集計 (/tasks/calendar)
+# 期限は日時（タイムゾーンなし・UTC）で保存されているため、表示するタイムゾーンでの日付に直して数える。
+
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, List, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from fastapi import HTTPException
+from sqlalchemy import Integer, and_, case, func, select
+from sqlalchemy.orm import Session
+
+from app.models.task import Task
+
+# 1回に集計できる期間の上限
+MAX_CALENDAR_DAYS = 366
+
+_COUNT_KEYS = ("total", "completed", "overdue", "low", "medium", "high")
+
+
+def parse_calendar_range(start: date, end: date, tz: str) -> ZoneInfo:
+    """期間とタイムゾーン名を検証する。不正なら400"""
+    try:
+        zone = ZoneInfo(tz)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise HTTPException(status_code=400, detail="Unknown time zone")
+    if end <= start:
+        raise HTTPException(status_code=400, detail="end must be after start")
+    if (end - start).days > MAX_CALENDAR_DAYS:
+        raise HTTPException(status_code=400, detail=f"Range must be at most {MAX_CALENDAR_DAYS} days")
+    return zone
+
+
+def utc_now() -> datetime:
+    return _to_utc(datetime.now(timezone.utc))
+
+
+def _to_utc(value: datetime) -> datetime:
+    """タイムゾーン付きの日時を、保存形式（タイムゾーンなしのUTC）に変換する"""
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def as_utc(value: datetime) -> datetime:
+    """クライアントから受け取った日時を保存形式に揃える。タイムゾーンなしの値はUTCとみなす"""
+    return value if value.tzinfo is None else _to_utc(value)
+
+
+def _offset(zone: ZoneInfo, utc: datetime) -> timedelta:
+    return utc.replace(tzinfo=timezone.utc).astimezone(zone).utcoffset()
+
+
+def day_range(day: date, zone: ZoneInfo) -> Tuple[datetime, datetime]:
+    """zone での day の0時から翌日0時まで（UTC）"""
+    return (
+        _to_utc(datetime.combine(day, time.min, zone)),
+        _to_utc(datetime.combine(day + timedelta(days=1), time.min, zone)),
+    )
+
+
+def utc_offset_segments(
+    start: datetime, end: datetime, zone: ZoneInfo
+) -> List[Tuple[datetime, datetime, timedelta]]:
+    """
+    UTCの範囲 [start, end) を、zone のUTCオフセットが変わる時刻（夏時間の切り替え）で区切る。
+    戻り値は (区間の開始, 終了, オフセット) の一覧。
+    """
+    segments = []
+    segment_start = start
+    offset = _offset(zone, start)
+    cursor = start
+    while cursor < end:
+        step = min(cursor + timedelta(days=1), end)
+        if _offset(zone, step) == offset:
+            cursor = step
+            continue
+        # 切り替わる時刻を秒単位で二分探索する（切り替えは秒ちょうどに起きる）
+        low, high = cursor, step
+        while high - low > timedelta(seconds=1):
+            middle = low + timedelta(seconds=(high - low) // timedelta(seconds=2))
+            if _offset(zone, middle) == offset:
+                low = middle
+            else:
+                high = middle
+        if high > segment_start:
+            segments.append((segment_start, high, offset))
+        segment_start = cursor = high
+        offset = _offset(zone, high)
+    if end > segment_start:
+        segments.append((segment_start, end, offset))
+    return segments
+
+
+def _counts(day_column, owner_id: int, now: datetime):
+    completed = Task.is_completed.is_(True)
+    overdue = and_(Task.is_completed.isnot(True), Task.deadline < now)
+
+    def count_if(condition):
+        return func.coalesce(func.sum(case((condition, 1), else_=0)), 0).cast(Integer)
+
+    return select(
+        day_column,
+        func.count(Task.id),
+        count_if(completed),
+        count_if(overdue),
+        count_if(Task.priority == 1),
+        count_if(Task.priority == 2),
+        count_if(Task.priority == 3),
+    ).where(Task.owner_id == owner_id).group_by(day_column)
+
+
+def task_calendar(
+    db: Session,
+    owner_id: int,
+    start: date,
+    end: date,
+    zone: ZoneInfo,
+    now: datetime,
+) -> List[dict]:
+    """
+    zone での日付が [start, end) の期限を日別に数える（タスクのある日のみ、日付順）。
+    (owner_id, deadline) のインデックスで期間を絞り、日付ごとに GROUP BY する。
+    """
+    range_start = day_range(start, zone)[0]
+    range_end = day_range(end - timedelta(days=1), zone)[1]
+
+    totals: Dict[date, List[int]] = defaultdict(lambda: [0] * len(_COUNT_KEYS))
+    if db.get_bind().dialect.name == "postgresql":
+        local = func.timezone(zone.key, func.timezone("UTC", Task.deadline))
+        stmt = _counts(func.date(local), owner_id, now).where(
+            Task.deadline >= range_start, Task.deadline < range_end
+        )
+        queries = [stmt]
+    else:
+        # SQLite は date(期限, '+N seconds') でずらす。オフセットが一定の区間ごとに集計する
+        queries = []
+        for segment_start, segment_end, offset in utc_offset_segments(range_start, range_end, zone):
+            seconds = int(offset.total_seconds())
+            day = func.date(Task.deadline, f"{seconds:+d} seconds")
+            queries.append(_counts(day, owner_id, now).where(
+                Task.deadline >= segment_start, Task.deadline < segment_end
+            ))
+
+    for stmt in queries:
+        for day, *counts in db.execute(stmt):
+            if isinstance(day, str):
+                day = date.fromisoformat(day)
+            bucket = totals[day]
+            for i, count in enumerate(counts):
+                bucket[i] += count
+
+    days = []
+    for day in sorted(totals):
+        total, completed, overdue, low, medium, high = totals[day]
+        day_start, day_end = day_range(day, zone)
+        days.append({
+            "date": day,
+            "start": day_start,
+            "end": day_end,
+            "total": total,
+            "completed": completed,
+            "overdue": overdue,
+            "priority": {"low": low, "medium": medium, "high": high},
+        })
+    return days
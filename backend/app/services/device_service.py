@@ -0,0 +1,69 @@
+# プッシュ通知の送信先デバイスの登録・削除・読み込み
+
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session
+
+from app.db.upsert import dialect_insert
+from app.models.notification import NotificationDevice
+
+# IN 句1回あたりの件数（SQLiteのバインド変数の上限より十分小さくする）
+_IN_CHUNK = 500
+
+def in_chunks(values: Iterable, size: int = _IN_CHUNK):
+    values = list(values)
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
+def register_device(
+    db: Session, user_id: int, device_token: str, device_type: Optional[str]
+) -> NotificationDevice:
+    """
+    (user_id, device_token) をキーに1文で登録する。登録済みなら device_type と updated_at を更新する。
+    コミットは呼び出し側で行う。
+    """
+    insert = dialect_insert(db)
+    stmt = insert(NotificationDevice).values(
+        user_id=user_id, device_token=device_token, device_type=device_type
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[NotificationDevice.user_id, NotificationDevice.device_token],
+        set_={"device_type": stmt.excluded.device_type, "updated_at": func.now()},
+    ).returning(NotificationDevice)
+    # 同じ行が読み込み済みでも RETURNING の値で上書きする
+    return db.scalars(stmt, execution_options={"populate_existing": True}).one()
+
+
+def delete_device(db: Session, user_id: int, device_token: str) -> bool:
+    result = db.execute(
+        delete(NotificationDevice).where(
+            NotificationDevice.user_id == user_id,
+            NotificationDevice.device_token == device_token,
+        )
+    )
+    return result.rowcount > 0
+
+
+def load_devices(db: Session, user_ids: Iterable[int]) -> Dict[int, List[Tuple[str, str]]]:
+    """ユーザーごとの (device_type, device_token) の一覧"""
+    devices: Dict[int, List[Tuple[str, str]]] = defaultdict(list)
+    for chunk in in_chunks(set(user_ids)):
+        rows = db.execute(
+            select(NotificationDevice.user_id, NotificationDevice.device_type, NotificationDevice.device_token)
+            .where(NotificationDevice.user_id.in_(chunk))
+        )
+        for user_id, device_type, device_token in rows:
+            devices[user_id].append((device_type or "", device_token))
+    return devices
+
+
+def remove_device_tokens(db: Session, device_tokens: Iterable[str]) -> int:
+    """送信先に拒否されたトークンを全ユーザー分削除する。コミットは呼び出し側で行う"""
+    removed = 0
+    for chunk in in_chunks(set(device_tokens)):
+        result = db.execute(delete(NotificationDevice).where(NotificationDevice.device_token.in_(chunk)))
+        removed += result.rowcount
+    return removed
@@ -0,0 +1,253 @@
+# 位置情報（ジオフェンス）関連のロジック
+
+import math
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.orm import Session, joinedload
+
+from app.db.upsert import dialect_insert
+from app.models.geofence import GeofenceSession
+from app.models.location import Location
+
+EARTH_RADIUS = 6371000  # 地球の半径（メートル）
+
+
+def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """
+    Haversine公式を使用して2点間の距離（メートル）を計算
+    """
+    R = EARTH_RADIUS
+
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    delta_phi = math.radians(lat2 - lat1)
+    delta_lambda = math.radians(lon2 - lon1)
+
+    a = math.sin(delta_phi / 2) ** 2 + \
+        math.cos(phi1) * math.cos(phi2) * math.sin(delta_lambda / 2) ** 2
+    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+    return R * c
+
+
+def bounding_box(
+    latitude: float, longitude: float, distance: float
+) -> Tuple[float, float, Optional[List[Tuple[float, float]]]]:
+    """
+    (latitude, longitude) から distance メートル以内の点をすべて含む範囲を返す。
+    戻り値は (緯度の下限, 緯度の上限, 経度の範囲リスト)。
+    経度の範囲リストが None の場合は極付近のため経度で絞り込めない。
+    日付変更線をまたぐ場合は経度の範囲が2つになる。
+    """
+    angular = distance / EARTH_RADIUS
+    # 浮動小数点の誤差で境界上の点を落とさないよう少し広げる
+    pad = 1e-9
+    delta_lat = math.degrees(angular) + pad
+    min_lat, max_lat = latitude - delta_lat, latitude + delta_lat
+
+    cos_lat = math.cos(math.radians(latitude))
+    if min_lat <= -90 or max_lat >= 90 or math.sin(angular) >= cos_lat:
+        return min_lat, max_lat, None
+
+    delta_lon = math.degrees(math.asin(math.sin(angular) / cos_lat)) + pad
+    min_lon, max_lon = longitude - delta_lon, longitude + delta_lon
+    if min_lon < -180:
+        return min_lat, max_lat, [(min_lon + 360, 180), (-180, max_lon)]
+    if max_lon > 180:
+        return min_lat, max_lat, [(min_lon, 180), (-180, max_lon - 360)]
+    return min_lat, max_lat, [(min_lon, max_lon)]
+
+
+def haversine_matrix(
+    latitudes: np.ndarray, longitudes: np.ndarray,
+    loc_latitudes: np.ndarray, loc_longitudes: np.ndarray,
+) -> np.ndarray:
+    """
+    calculate_distance のベクトル版。
+    各地点 (行) と各場所 (列) の距離（メートル）を行列で返す。
+    """
+    phi1 = np.radians(latitudes)[:, None]
+    phi2 = np.radians(loc_latitudes)[None, :]
+    delta_phi = phi2 - phi1
+    delta_lambda = np.radians(loc_longitudes)[None, :] - np.radians(longitudes)[:, None]
+
+    a = np.sin(delta_phi / 2) ** 2 + \
+        np.cos(phi1) * np.cos(phi2) * np.sin(delta_lambda / 2) ** 2
+    c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+    return EARTH_RADIUS * c
+
+
+# evaluate_trace で一度に距離を計算する地点数・場所数（距離行列の大きさを抑える）
+TRACE_CHUNK_FIXES = 256
+TRACE_CHUNK_LOCATIONS = 4096
+
+
+def _max_radius(db: Session, owner_id: int) -> Optional[float]:
+    return db.execute(
+        select(func.max(Location.radius)).where(Location.owner_id == owner_id)
+    ).scalar()
+
+
+def _within_box(latitude: float, longitude: float, distance: float) -> list:
+    """bounding_box の範囲で Location を絞り込む条件"""
+    min_lat, max_lat, lon_ranges = bounding_box(latitude, longitude, distance)
+    conditions = [Location.latitude >= min_lat, Location.latitude <= max_lat]
+    if lon_ranges is not None:
+        conditions.append(or_(*(
+            and_(Location.longitude >= low, Location.longitude <= high)
+            for low, high in lon_ranges
+        )))
+    return conditions
+
+
+def nearby_candidates(
+    db: Session, owner_id: int, latitude: float, longitude: float, extra_distance: float = 0.0
+) -> List[Location]:
+    """
+    ユーザーの場所のうち、エリア内に入り得るものだけを取得する。
+    最大半径で作った範囲を (owner_id, latitude, longitude) インデックスで絞り込む。
+    extra_distance を指定すると、その分だけ範囲を広げる（軌跡をまとめて調べる場合など）。
+    """
+    max_radius = _max_radius(db, owner_id)
+    if max_radius is None:
+        return []
+
+    return db.query(Location).filter(
+        Location.owner_id == owner_id,
+        *_within_box(latitude, longitude, max_radius + extra_distance),
+    ).all()
+
+
+def find_nearest_location(
+    db: Session, owner_id: int, latitude: float, longitude: float
+) -> Tuple[Optional[Location], float]:
+    """エリア内かつ最も近い場所と、その距離を返す"""
+    nearest_location = None
+    min_distance = float('inf')
+
+    for location in nearby_candidates(db, owner_id, latitude, longitude):
+        distance = calculate_distance(
+            latitude, longitude,
+            location.latitude, location.longitude
+        )
+
+        # エリア内かつ最も近い場所を検索
+        if distance <= location.radius and distance < min_distance:
+            min_distance = distance
+            nearest_location = location
+
+    return nearest_location, min_distance
+
+
+def evaluate_trace(
+    db: Session,
+    owner_id: int,
+    latitudes: Sequence[float],
+    longitudes: Sequence[float],
+    current_location_id: Optional[int] = None,
+) -> List[Tuple[int, Optional[int], float]]:
+    """
+    時刻順に並んだ位置の列をまとめて判定し、
+    各地点で「エリア内かつ最も近い場所」が変わった箇所を返す。
+    戻り値は (地点のインデックス, 新しい場所ID or None, 距離) のリスト。
+    判定結果は find_nearest_location を1点ずつ呼んだ場合と同じになる。
+    """
+    if len(latitudes) == 0:
+        return []
+    lats = np.asarray(latitudes, dtype=float)
+    lons = np.asarray(longitudes, dtype=float)
+    ids = np.zeros(len(lats), dtype=np.int64)
+    nearest_distance = np.full(len(lats), np.inf)
+
+    max_radius = _max_radius(db, owner_id)
+    if max_radius is not None:
+        # 地点を区切り、区間ごとに先頭の地点を中心とした円で覆って候補を取得する。
+        # 軌跡が広がっていても場所が多くても、距離行列は TRACE_CHUNK_FIXES x TRACE_CHUNK_LOCATIONS に収まる
+        for start in range(0, len(lats), TRACE_CHUNK_FIXES):
+            rows = slice(start, start + TRACE_CHUNK_FIXES)
+            first = slice(start, start + 1)
+            spread = float(haversine_matrix(lats[first], lons[first], lats[rows], lons[rows]).max())
+            candidates = db.execute(
+                select(Location.id, Location.latitude, Location.longitude, Location.radius).where(
+                    Location.owner_id == owner_id,
+                    *_within_box(lats[start], lons[start], max_radius + spread),
+                )
+            ).all()
+            if candidates:
+                _nearest_inside(lats[rows], lons[rows], np.array(candidates, dtype=float),
+                                ids[rows], nearest_distance[rows])
+    inside = np.isfinite(nearest_distance)
+
+    transitions = []
+    state = current_location_id
+    for i in range(len(lats)):
+        location_id = int(ids[i]) if inside[i] else None
+        if location_id != state:
+            distance = float(nearest_distance[i]) if inside[i] else 0.0
+            transitions.append((i, location_id, distance))
+            state = location_id
+    return transitions
+
+
+def _nearest_inside(
+    lats: np.ndarray, lons: np.ndarray, candidates: np.ndarray, ids: np.ndarray, nearest_distance: np.ndarray
+) -> None:
+    """
+    各地点についてエリア内かつ最も近い候補 (id, 緯度, 経度, 半径 の行) を探し、ids と nearest_distance に書き込む。
+    候補も TRACE_CHUNK_LOCATIONS 件ずつ調べ、距離が同じなら先の候補を残す（全件の argmin と同じ結果）。
+    """
+    rows = np.arange(len(lats))
+    for start in range(0, len(candidates), TRACE_CHUNK_LOCATIONS):
+        block = candidates[start:start + TRACE_CHUNK_LOCATIONS]
+        distances = haversine_matrix(lats, lons, block[:, 1], block[:, 2])
+        distances[distances > block[None, :, 3]] = np.inf
+        nearest = distances.argmin(axis=1)
+        best = distances[rows, nearest]
+        closer = best < nearest_distance
+        nearest_distance[closer] = best[closer]
+        ids[closer] = block[nearest[closer], 0]
+
+
+def update_geofence_session(
+    db: Session, owner_id: int, latitude: float, longitude: float
+) -> Tuple[Optional[int], Optional[Location], float]:
+    """
+    ユーザーのジオフェンス状態を現在地で更新する。
+    前回のエリア内に居る間はそのエリアとの距離だけを調べ、
+    出た場合（または前回エリア外だった場合）だけ find_nearest_location で探し直す。
+    戻り値は (前回のエリアID, 現在のエリア, 距離)。
+    状態を書き込むのはエリアが変わった場合だけで、コミットは呼び出し側で行う。
+    """
+    # 前回のエリアも同じクエリで取得する
+    session = db.get(GeofenceSession, owner_id, options=[joinedload(GeofenceSession.location)])
+    previous_id = session.location_id if session else None
+
+    current = session.location if session else None
+    if current is not None:
+        distance = calculate_distance(latitude, longitude, current.latitude, current.longitude)
+        if distance <= current.radius:
+            return previous_id, current, distance
+
+    location, distance = find_nearest_location(db, owner_id, latitude, longitude)
+    new_id = location.id if location else None
+    if session is None:
+        # 同じユーザーの最初の更新が並行しても一意制約違反にならないよう、user_id をキーに1文で登録する
+        insert = dialect_insert(db)
+        stmt = insert(GeofenceSession).values(user_id=owner_id, location_id=new_id)
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[GeofenceSession.user_id],
+            set_={"location_id": stmt.excluded.location_id, "updated_at": func.now()},
+        ))
+    elif new_id != previous_id:
+        session.location_id = new_id
+    return previous_id, location, distance
+
+
+def clear_geofence_sessions(db: Session, location_id: int) -> None:
+    """削除される場所を参照しているジオフェンス状態をエリア外に戻す"""
+    db.query(GeofenceSession).filter(GeofenceSession.location_id == location_id).update(
+        {GeofenceSession.location_id: None}, synchronize_session=False
+    )
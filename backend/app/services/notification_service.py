@@ -1,2 +1,290 @@
 #期限が近いタスクをチェックし、通知を送信するロジック（外部サービス利用やプッシュ通知の準備など）。
-#通知機能
\ No newline at end of file
+#
+# 全タスクを定期的に走査する代わりに、未完了タスクの通知時刻（期限 - DEADLINE_NOTIFY_BEFORE_MINUTES）を
+# ヒープに持ち、次の通知時刻まで眠る。タスクの作成・更新・削除は変更通知 (app.core.events) から受け取る。
+# 各ワーカーで動かすと通知が重複するため既定では無効。ワーカーが1つなら DEADLINE_SCHEDULER_ENABLED=true にする。
+# ワーカーが複数の場合は EVENT_BROKER=tcp で次のコマンドを1つだけ起動する:
+#   python -m app.services.notification_service
+
+import asyncio
+import heapq
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core.config import settings
+from app.core.events import LocalBroker
+from app.models.task import Task
+from app.services.calendar_service import utc_now
+
+logger = logging.getLogger(__name__)
+
+
+class DueNotification(NamedTuple):
+    user_id: int
+    task_id: int
+    deadline: datetime
+
+
+def _notify_timestamp(deadline: datetime, notify_before: timedelta) -> float:
+    """通知時刻のUNIX時刻。期限はタイムゾーンなしのUTCで保存されている（サーバーのタイムゾーンに依存しない）"""
+    return (deadline - notify_before).replace(tzinfo=timezone.utc).timestamp()
+
+
+# 期限のあるタスクの (id, 所有者, 期限, 完了済みか)
+TaskDeadline = Tuple[int, int, Optional[datetime], Optional[bool]]
+
+
+class DeadlineQueue:
+    """
+    通知時刻順のキュー。ヒープ＋タスクIDの索引で、更新・削除は索引だけを書き換え、
+    古くなったヒープの要素は取り出し時に読み飛ばす（遅延削除）。
+    通知済みの (タスクID, 期限) は期限が過ぎるまで覚えておき、同じ期限では再登録しない。
+    """
+
+    def __init__(self, notify_before: timedelta):
+        self.notify_before = notify_before
+        self._heap: List[Tuple[float, int, int]] = []    # (通知時刻, タスクID, 世代)
+        self._index: Dict[int, Tuple[int, int, datetime]] = {}  # タスクID -> (世代, 所有者, 期限)
+        self._notified: Dict[int, datetime] = {}  # タスクID -> 通知済みの期限
+        self._notified_heap: List[Tuple[float, int]] = []  # (期限, タスクID)。期限を過ぎた印を消す順
+        self._generation = 0
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def schedule(self, task_id: int, user_id: int, deadline: datetime, skip_before: Optional[float] = None) -> bool:
+        """
+        タスクの通知を登録（登録済みなら置き換え）する。先頭が早まったら True。
+        通知済みの期限のままなら登録しない。通知時刻が skip_before より前なら通知済みとみなす（再起動時用）
+        """
+        if self._notified.get(task_id) == deadline:
+            self._index.pop(task_id, None)
+            return False
+        self._notified.pop(task_id, None)
+        current = self._index.get(task_id)
+        if current is not None and current[1:] == (user_id, deadline):
+            return False
+        notify_at = _notify_timestamp(deadline, self.notify_before)
+        if skip_before is not None and notify_at < skip_before:
+            self._index.pop(task_id, None)
+            self._mark_notified(task_id, deadline)
+            return False
+        self._generation += 1
+        self._index[task_id] = (self._generation, user_id, deadline)
+        earliest = self.next_due()
+        heapq.heappush(self._heap, (notify_at, task_id, self._generation))
+        self._compact()
+        return earliest is None or notify_at < earliest
+
+    def cancel(self, task_id: int) -> None:
+        # 通知済みの印は残す（完了を取り消しても同じ期限では再通知しない）。期限を過ぎたら pop_due で消す
+        self._index.pop(task_id, None)
+
+    def _is_current(self, entry: Tuple[float, int, int]) -> bool:
+        current = self._index.get(entry[1])
+        return current is not None and current[0] == entry[2]
+
+    def next_due(self) -> Optional[float]:
+        """次の通知時刻（UNIX時刻）。なければ None"""
+        while self._heap and not self._is_current(self._heap[0]):
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: float) -> List[DueNotification]:
+        """通知時刻が now 以前のものをすべて取り出す"""
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            entry = heapq.heappop(self._heap)
+            if self._is_current(entry):
+                _, user_id, deadline = self._index.pop(entry[1])
+                self._mark_notified(entry[1], deadline)
+                due.append(DueNotification(user_id, entry[1], deadline))
+        # 期限を過ぎたタスクは読み込み時に除外されるので、通知済みの印も要らない
+        while self._notified_heap and self._notified_heap[0][0] < now:
+            _, task_id = heapq.heappop(self._notified_heap)
+            deadline = self._notified.get(task_id)
+            if deadline is not None and deadline.replace(tzinfo=timezone.utc).timestamp() < now:
+                del self._notified[task_id]
+        return due
+
+    def _mark_notified(self, task_id: int, deadline: datetime) -> None:
+        self._notified[task_id] = deadline
+        heapq.heappush(self._notified_heap, (deadline.replace(tzinfo=timezone.utc).timestamp(), task_id))
+
+    def _compact(self) -> None:
+        # 更新が続いて古い要素が溜まりすぎたら作り直す
+        if len(self._heap) > 2 * len(self._index) + 1024:
+            self._heap = [
+                (_notify_timestamp(deadline, self.notify_before), task_id, generation)
+                for task_id, (generation, _, deadline) in self._index.items()
+            ]
+            heapq.heapify(self._heap)
+
+
+def load_task_deadlines(db: Session, task_ids: Optional[Iterable[int]] = None) -> List[TaskDeadline]:
+    """通知対象になり得るタスクを読み込む。task_ids を省略すると期限が未来の未完了タスクすべて"""
+    stmt = select(Task.id, Task.owner_id, Task.deadline, Task.is_completed)
+    if task_ids is None:
+        stmt = stmt.where(
+            Task.deadline.isnot(None), Task.deadline >= utc_now(), Task.is_completed.isnot(True)
+        )
+    else:
+        stmt = stmt.where(Task.id.in_(list(task_ids)))
+    return [tuple(row) for row in db.execute(stmt)]
+
+
+async def log_due(notifications: List[DueNotification]) -> None:
+    for notification in notifications:
+        logger.info(
+            "deadline approaching: user=%s task=%s deadline=%s",
+            notification.user_id, notification.task_id, notification.deadline,
+        )
+
+
+class DeadlineScheduler:
+    """
+    DeadlineQueue をイベントループ上で動かす。
+    キューの操作はすべてイベントループのスレッドで行い、DBの読み込みはスレッドプールで行う。
+    """
+
+    def __init__(
+        self,
+        session_factory: sessionmaker,
+        broker: LocalBroker,
+        on_due: Callable[[List[DueNotification]], Awaitable[None]] = log_due,
+        notify_before: timedelta = timedelta(minutes=settings.DEADLINE_NOTIFY_BEFORE_MINUTES),
+    ):
+        self.session_factory = session_factory
+        self.broker = broker
+        self.on_due = on_due
+        self.queue = DeadlineQueue(notify_before)
+        self._wake = asyncio.Event()
+        self._pending_ids: Set[int] = set()
+        self._loading = False
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        # 変更の受け取りを始めてから既存のタスクを読み込む。
+        # 読み込み中に届いた変更は、読み込み後にもう一度読み直して上書きする
+        self._loading = True
+        self.broker.hub.add_listener(self._on_events)
+        try:
+            rows = await run_in_threadpool(self._load, None)
+        finally:
+            self._loading = False
+        # 停止中に通知時刻を過ぎたものは通知済みとみなす（再起動のたびに再送しない）
+        self._apply(rows, None, skip_before=time.time())
+        self._start_refresh()
+        logger.info("deadline scheduler started with %d pending deadlines", len(self.queue))
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        self.broker.hub.remove_listener(self._on_events)
+        for task in (self._task, self._refresh_task):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+
+    def _load(self, task_ids: Optional[Iterable[int]]) -> List[TaskDeadline]:
+        with self.session_factory() as db:
+            return load_task_deadlines(db, task_ids)
+
+    def _apply(
+        self, rows: List[TaskDeadline], requested_ids: Optional[Set[int]], skip_before: Optional[float] = None
+    ) -> None:
+        now = utc_now()
+        found = set()
+        wake = False
+        for task_id, user_id, deadline, is_completed in rows:
+            found.add(task_id)
+            if deadline is None or is_completed or deadline < now:
+                self.queue.cancel(task_id)
+            else:
+                wake = self.queue.schedule(task_id, user_id, deadline, skip_before) or wake
+        # 読み込めなかったタスクは削除済み
+        for task_id in (requested_ids or set()) - found:
+            self.queue.cancel(task_id)
+        if wake:
+            self._wake.set()
+
+    def _on_events(self, user_id: int, events: List[dict]) -> None:
+        for item in events:
+            # 削除も含めて読み直しで反映する（読み込み中の古い結果で削除が上書きされないように、
+            # 最後の読み込みが最後の変更より後になるようにする）
+            if item.get("type") == "change" and item.get("entity") == "task":
+                self._pending_ids.add(item["id"])
+        self._start_refresh()
+
+    def _start_refresh(self) -> None:
+        # 続けて届いた変更はまとめて1回のクエリで読み直す
+        if self._loading or not self._pending_ids:
+            return
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh())
+
+    async def _refresh(self) -> None:
+        while self._pending_ids:
+            task_ids, self._pending_ids = self._pending_ids, set()
+            try:
+                rows = await run_in_threadpool(self._load, task_ids)
+            except Exception:
+                logger.exception("failed to reload task deadlines")
+                return
+            self._apply(rows, task_ids)
+
+    async def _run(self) -> None:
+        while True:
+            due = self.queue.pop_due(time.time())
+            if due:
+                try:
+                    await self.on_due(due)
+                except Exception:
+                    logger.exception("deadline notification failed")
+            next_at = self.queue.next_due()
+            timeout = None if next_at is None else max(0.0, next_at - time.time())
+            self._wake.clear()
+            try:
+                # 次の通知時刻まで、またはより早い通知が登録されるまで眠る
+                await asyncio.wait_for(self._wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+
+async def _main() -> None:
+    from app.core.events import create_broker
+    from app.db.engine import create_db_engine
+    from app.db.schema import sync_schema
+    from app.models import user, task, category, location, task_stats, geofence, sync, notification  # noqa: F401
+    from app.services.push_service import create_push_notifier
+
+    engine = create_db_engine()
+    sync_schema(engine)
+    broker = create_broker()
+    await broker.start()
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    push_notifier = create_push_notifier(session_factory)
+    scheduler = DeadlineScheduler(session_factory, broker, on_due=push_notifier or log_due)
+    await scheduler.start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await scheduler.stop()
+        if push_notifier is not None:
+            await push_notifier.dispatcher.aclose()
+        await broker.stop()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main())
@@ -0,0 +1,299 @@
+# プッシュ通知の送信
+# 通知を送信方式（NotificationDevice.device_type: ios / android / web）ごとにまとめ、
+# 一括送信・同時送信数の上限・再試行（ジッター付き指数バックオフ）を行う。
+# 送信先に拒否されたトークン（アプリ削除など）は自動で削除する。
+#
+# 送信方式ごとの送信先は PUSH_GATEWAY_URLS で指定する（例: {"ios": "https://push.example.com/apns"}）。
+# 送信先は次の形式のJSONを受け付ける中継（APNs/FCM/Web Push の差異を吸収するゲートウェイ）を想定する:
+#   POST {"messages": [{"token", "title", "body", "data"}, ...]}
+#   -> {"results": [{"token": ..., "error": null | "invalid_token" | "unavailable"}, ...]}
+
+import asyncio
+import logging
+import random
+import time
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+import httpx
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core.config import settings
+from app.models.task import Task
+from app.services.device_service import in_chunks, load_devices, remove_device_tokens
+from app.services.notification_service import DueNotification
+
+logger = logging.getLogger(__name__)
+
+
+class PushMessage(NamedTuple):
+    device_type: str
+    token: str
+    title: str
+    body: str
+    data: dict
+
+
+class SendResult(NamedTuple):
+    invalid: List[str]             # 送信先に拒否されたトークン（再送しない・削除する）
+    retry: List[PushMessage]       # 一時的に失敗したもの（再送する）
+
+
+class PushTransportError(Exception):
+    """一括送信全体の失敗。retryable なら同じ一括をあとで再送する"""
+
+    def __init__(self, message: str, retryable: bool = True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class PushTransport(ABC):
+    """送信方式ごとの送信処理。1回の send で最大 max_batch 件を送る"""
+
+    max_batch = 500
+
+    @abstractmethod
+    async def send(self, messages: List[PushMessage]) -> SendResult:
+        """messages を送り、拒否されたトークンと再送するメッセージを返す"""
+
+    async def aclose(self) -> None:
+        pass
+
+
+class HttpPushTransport(PushTransport):
+    """
+    ゲートウェイへ一括でPOSTする。接続は httpx.AsyncClient のプールを送信方式間で共有する。
+    429/5xx・通信エラーは一括ごと再送し、その他の4xxは再送しない。
+    """
+
+    def __init__(self, client: httpx.AsyncClient, url: str, max_batch: int):
+        self.client = client
+        self.url = url
+        self.max_batch = max_batch
+
+    async def send(self, messages: List[PushMessage]) -> SendResult:
+        payload = {
+            "messages": [
+                {"token": m.token, "title": m.title, "body": m.body, "data": m.data} for m in messages
+            ]
+        }
+        try:
+            response = await self.client.post(self.url, json=payload)
+        except httpx.HTTPError as exc:
+            raise PushTransportError(f"{self.url}: {exc!r}") from exc
+        if response.status_code == 429 or response.status_code >= 500:
+            raise PushTransportError(f"{self.url}: HTTP {response.status_code}")
+        if response.status_code >= 400:
+            raise PushTransportError(f"{self.url}: HTTP {response.status_code}", retryable=False)
+
+        errors = {r["token"]: r.get("error") for r in response.json().get("results", ())}
+        invalid = [m.token for m in messages if errors.get(m.token) == "invalid_token"]
+        retry = [m for m in messages if errors.get(m.token) == "unavailable"]
+        return SendResult(invalid, retry)
+
+    async def aclose(self) -> None:
+        if not self.client.is_closed:
+            await self.client.aclose()
+
+
+class FakePushTransport(PushTransport):
+    """
+    オフラインでの動作確認・負荷試験用。latency 秒待ち、invalid_tokens は拒否し、
+    一括単位で batch_failure_rate、メッセージ単位で message_failure_rate の割合で一時的に失敗する。
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        max_batch: int = 500,
+        invalid_tokens: Iterable[str] = (),
+        batch_failure_rate: float = 0.0,
+        message_failure_rate: float = 0.0,
+        seed: Optional[int] = None,
+    ):
+        self.latency = latency
+        self.max_batch = max_batch
+        self.invalid_tokens = set(invalid_tokens)
+        self.batch_failure_rate = batch_failure_rate
+        self.message_failure_rate = message_failure_rate
+        self._random = random.Random(seed)
+        self.delivered: List[PushMessage] = []
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def send(self, messages: List[PushMessage]) -> SendResult:
+        self.requests += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            if self._random.random() < self.batch_failure_rate:
+                raise PushTransportError("fake batch failure")
+            invalid, retry = [], []
+            for message in messages:
+                if message.token in self.invalid_tokens:
+                    invalid.append(message.token)
+                elif self._random.random() < self.message_failure_rate:
+                    retry.append(message)
+                else:
+                    self.delivered.append(message)
+            return SendResult(invalid, retry)
+        finally:
+            self.in_flight -= 1
+
+
+class DispatchReport(NamedTuple):
+    sent: int
+    failed: int                 # 再試行しても送れなかった件数
+    invalid_tokens: List[str]
+    unsupported: int            # 送信方式が未設定のデバイス宛ての件数
+
+
+class PushDispatcher:
+    """
+    メッセージを送信方式ごと・max_batch 件ごとに分けて並行に送る。
+    同時に送信中の一括は全送信方式で concurrency 件まで。
+    """
+
+    def __init__(
+        self,
+        transports: Dict[str, PushTransport],
+        concurrency: int = settings.PUSH_CONCURRENCY,
+        max_attempts: int = settings.PUSH_MAX_ATTEMPTS,
+        backoff: float = settings.PUSH_BACKOFF_SECONDS,
+    ):
+        self.transports = transports
+        self.max_attempts = max(1, max_attempts)
+        self.backoff = backoff
+        self._semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def dispatch(self, messages: List[PushMessage]) -> DispatchReport:
+        by_type: Dict[str, List[PushMessage]] = defaultdict(list)
+        for message in messages:
+            by_type[message.device_type].append(message)
+
+        batches, unsupported = [], 0
+        for device_type, group in by_type.items():
+            transport = self.transports.get(device_type)
+            if transport is None:
+                unsupported += len(group)
+                continue
+            size = max(1, transport.max_batch)
+            batches.extend((transport, group[i:i + size]) for i in range(0, len(group), size))
+        if unsupported:
+            logger.warning("no push transport configured for %d messages", unsupported)
+
+        results = await asyncio.gather(*(self._send_batch(t, b) for t, b in batches))
+        invalid = [token for _, _, tokens in results for token in tokens]
+        return DispatchReport(
+            sent=sum(r[0] for r in results),
+            failed=sum(r[1] for r in results),
+            invalid_tokens=invalid,
+            unsupported=unsupported,
+        )
+
+    async def _send_batch(
+        self, transport: PushTransport, batch: List[PushMessage]
+    ) -> Tuple[int, int, List[str]]:
+        """(送信済み, 失敗, 拒否されたトークン) を返す"""
+        sent, invalid = 0, []
+        pending = batch
+        for attempt in range(self.max_attempts):
+            if attempt:
+                # Full Jitter: 再送が同じ時刻に集中しないようにする
+                await asyncio.sleep(random.uniform(0, self.backoff * 2 ** (attempt - 1)))
+            try:
+                async with self._semaphore:
+                    result = await transport.send(pending)
+            except PushTransportError as exc:
+                logger.warning("push batch failed (attempt %d): %s", attempt + 1, exc)
+                if not exc.retryable:
+                    break
+                continue
+            except Exception:
+                logger.exception("push transport error")
+                break
+            invalid.extend(result.invalid)
+            sent += len(pending) - len(result.invalid) - len(result.retry)
+            pending = result.retry
+            if not pending:
+                break
+        return sent, len(pending), invalid
+
+    async def aclose(self) -> None:
+        for transport in set(self.transports.values()):
+            await transport.aclose()
+
+
+def load_task_titles(db: Session, task_ids: Iterable[int]) -> Dict[int, str]:
+    titles: Dict[int, str] = {}
+    for chunk in in_chunks(set(task_ids)):
+        titles.update(db.execute(select(Task.id, Task.title).where(Task.id.in_(chunk))).all())
+    return titles
+
+
+class DeadlinePushNotifier:
+    """DeadlineScheduler の on_due として使う。期限が近いタスクの所有者の全デバイスへ送る"""
+
+    def __init__(self, session_factory: sessionmaker, dispatcher: PushDispatcher):
+        self.session_factory = session_factory
+        self.dispatcher = dispatcher
+
+    def _load(self, notifications: List[DueNotification]):
+        with self.session_factory() as db:
+            targets = load_devices(db, {n.user_id for n in notifications})
+            titles = load_task_titles(db, {n.task_id for n in notifications})
+            return targets, titles
+
+    def _remove(self, tokens: Set[str]) -> int:
+        with self.session_factory() as db:
+            removed = remove_device_tokens(db, tokens)
+            db.commit()
+            return removed
+
+    async def __call__(self, notifications: List[DueNotification]) -> DispatchReport:
+        start = time.perf_counter()
+        targets, titles = await run_in_threadpool(self._load, notifications)
+        messages = [
+            PushMessage(
+                device_type=device_type,
+                token=token,
+                title=titles.get(n.task_id, ""),
+                body=f"期限: {n.deadline:%Y-%m-%d %H:%M}",
+                data={"task_id": n.task_id, "deadline": n.deadline.isoformat()},
+            )
+            for n in notifications
+            for device_type, token in targets.get(n.user_id, ())
+        ]
+        report = await self.dispatcher.dispatch(messages)
+        if report.invalid_tokens:
+            removed = await run_in_threadpool(self._remove, set(report.invalid_tokens))
+            logger.info("removed %d rejected device tokens", removed)
+        logger.info(
+            "push: %d sent, %d failed, %d unsupported in %.3fs",
+            report.sent, report.failed, report.unsupported, time.perf_counter() - start,
+        )
+        return report
+
+
+def create_push_notifier(session_factory: sessionmaker) -> Optional[DeadlinePushNotifier]:
+    """PUSH_GATEWAY_URLS が未設定なら None（期限通知はログ出力のみ）"""
+    if not settings.PUSH_GATEWAY_URLS:
+        return None
+    client = httpx.AsyncClient(
+        timeout=settings.PUSH_TIMEOUT_SECONDS,
+        limits=httpx.Limits(
+            max_connections=settings.PUSH_CONCURRENCY,
+            max_keepalive_connections=settings.PUSH_CONCURRENCY,
+        ),
+    )
+    transports: Dict[str, PushTransport] = {
+        device_type: HttpPushTransport(client, url, settings.PUSH_BATCH_SIZE)
+        for device_type, url in settings.PUSH_GATEWAY_URLS.items()
+    }
+    return DeadlinePushNotifier(session_factory, PushDispatcher(transports))
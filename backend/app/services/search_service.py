@@ -0,0 +1,138 @@
+# タスクの全文検索 (/tasks/search)。索引の定義は app.db.search
+
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import and_, case, column, func, literal_column, or_, select, table, text
+from sqlalchemy.orm import Session
+
+from app.core.pagination import decode_cursor, encode_cursor
+from app.db.search import TASK_DOCUMENT_SQL, is_token_char
+from app.models.task import Task
+
+# 検索語の数の上限（それ以降は無視する）
+MAX_TERMS = 8
+
+# FTS5 の仮想テーブル（rowid = tasks.id）
+_tasks_fts = table("tasks_fts", column("rowid"))
+_tasks_bigram = table("tasks_fts_bigram", column("rowid"))
+
+# trigram の索引で引ける最短の長さ。これより短い語は bigram の索引で引く
+_TRIGRAM = 3
+
+# タイトルの一致を説明文の一致より重く評価する (bm25 の列ごとの重み)
+_TITLE_WEIGHT = 10.0
+_DESCRIPTION_WEIGHT = 1.0
+
+
+def parse_terms(q: str) -> List[str]:
+    """空白（全角を含む）で区切った検索語。重複は除く"""
+    terms: List[str] = []
+    for term in q.split():
+        if term not in terms:
+            terms.append(term)
+    return terms[:MAX_TERMS]
+
+
+def _like_pattern(term: str) -> str:
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def _contains(expr, term: str):
+    return expr.ilike(_like_pattern(term), escape="\\")
+
+
+def _fts5_query(terms: List[str]) -> str:
+    # 各語をフレーズとして AND で結ぶ（記号を演算子として解釈させない）
+    return " ".join('"' + term.replace('"', '""') + '"' for term in terms)
+
+
+def _bigram_query(terms: List[str]) -> str:
+    # 2文字の語は bigram と完全一致、1文字の語はその文字で始まる bigram（前方一致）
+    return " ".join(_fts5_query([t]) + ("*" if len(t) == 1 else "") for t in terms)
+
+
+def _sqlite_search(owner_id: int, terms: List[str]):
+    """(クエリ, 関連度の式, 関連度が大きいほど上位か)。bm25 は小さいほど上位"""
+    long_terms = [t for t in terms if len(t) >= _TRIGRAM]
+    # 記号などを含む短い語は bigram の索引に入らないため LIKE で絞り込む
+    bigram_terms = [t for t in terms if len(t) < _TRIGRAM and all(is_token_char(c) for c in t)]
+    like_terms = [t for t in terms if len(t) < _TRIGRAM and t not in bigram_terms]
+    filters = [or_(_contains(Task.title, t), _contains(Task.description, t)) for t in like_terms]
+
+    if long_terms:
+        stmt = (
+            select(Task)
+            .join(_tasks_fts, _tasks_fts.c.rowid == Task.id)
+            .where(text("tasks_fts MATCH :match").bindparams(match=_fts5_query(long_terms)))
+        )
+        rank = func.bm25(literal_column("tasks_fts"), _TITLE_WEIGHT, _DESCRIPTION_WEIGHT)
+        if bigram_terms:
+            bigram_ids = (
+                select(_tasks_bigram.c.rowid)
+                .where(text("tasks_fts_bigram MATCH :bigram").bindparams(bigram=_bigram_query(bigram_terms)))
+            )
+            filters.append(Task.id.in_(bigram_ids))
+    elif bigram_terms:
+        stmt = (
+            select(Task)
+            .join(_tasks_bigram, _tasks_bigram.c.rowid == Task.id)
+            .where(text("tasks_fts_bigram MATCH :bigram").bindparams(bigram=_bigram_query(bigram_terms)))
+        )
+        rank = func.bm25(literal_column("tasks_fts_bigram"), _TITLE_WEIGHT, _DESCRIPTION_WEIGHT)
+    else:
+        # 記号だけの短い語の場合は所有者のタスクを走査する（タイトルに含むものを先に並べる）
+        stmt = select(Task)
+        rank = case((and_(*[_contains(Task.title, t) for t in like_terms]), 0), else_=1)
+    return stmt.where(Task.owner_id == owner_id, *filters), rank, False
+
+
+def _postgres_search(owner_id: int, terms: List[str]):
+    document = literal_column(TASK_DOCUMENT_SQL)
+    query = " ".join(terms)
+    rank = func.similarity(Task.title, query) * _TITLE_WEIGHT + func.word_similarity(query, document)
+    stmt = select(Task).where(Task.owner_id == owner_id, *[_contains(document, t) for t in terms])
+    return stmt, rank, True
+
+
+def search_tasks(
+    db: Session,
+    owner_id: int,
+    q: str,
+    cursor: Optional[str] = None,
+    limit: int = 20,
+) -> Tuple[List[Task], Optional[str]]:
+    """
+    タイトル・説明文にすべての検索語を含むタスクを関連度順に返す。
+    ページングは /tasks/ と同じキーセット方式で、カーソルに最後の行の (関連度, id) を入れる。
+    戻り値は (タスク一覧, 次ページのカーソル or None)。
+    """
+    terms = parse_terms(q)
+    if not terms:
+        raise HTTPException(status_code=400, detail="Empty search query")
+
+    if db.get_bind().dialect.name == "postgresql":
+        stmt, rank, higher_first = _postgres_search(owner_id, terms)
+    else:
+        stmt, rank, higher_first = _sqlite_search(owner_id, terms)
+
+    if cursor:
+        payload = decode_cursor(cursor)
+        if payload.get("q") != terms:
+            raise HTTPException(status_code=400, detail="Cursor does not match search query")
+        try:
+            last_rank, last_id = float(payload["k"]), int(payload["i"])
+        except (KeyError, TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        beyond = rank < last_rank if higher_first else rank > last_rank
+        stmt = stmt.where(or_(beyond, and_(rank == last_rank, Task.id < last_id)))
+
+    # 1件多く取得して次ページの有無を判定する
+    order = rank.desc() if higher_first else rank.asc()
+    rows = db.execute(stmt.add_columns(rank).order_by(order, Task.id.desc()).limit(limit + 1)).all()
+    tasks = [task for task, _ in rows]
+    if len(rows) <= limit:
+        return tasks, None
+    last_task, last_rank = rows[limit - 1]
+    return tasks[:limit], encode_cursor({"q": terms, "k": last_rank, "i": last_task.id})
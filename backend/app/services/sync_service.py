@@ -0,0 +1,209 @@
+# 差分同期：変更ジャーナルへの記録と /sync 用の読み出し
+
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Literal, NamedTuple, Optional, Tuple
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.core.events import publish_after_commit
+from app.db.upsert import dialect_insert
+from app.models.category import Category
+from app.models.location import Location
+from app.models.sync import ChangeJournalEntry, SyncCounter
+from app.models.task import Task
+
+Entity = Literal["task", "category", "location"]
+
+# エンティティ名 -> (モデル, 所有者の列)
+ENTITIES = {
+    "task": (Task, Task.owner_id),
+    "category": (Category, Category.user_id),
+    "location": (Location, Location.owner_id),
+}
+
+# 削除時に ORM が外部キーを NULL にするタスクの列
+TASK_REFERENCES = {
+    "category": Task.category_id,
+    "location": Task.location_id,
+}
+
+
+class JournalEntry(NamedTuple):
+    seq: int
+    entity: str
+    entity_id: int
+    deleted: bool
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _allocate(db: Session, user_id: int, count: int) -> int:
+    """count 個のシーケンス番号を確保し、最後の番号を返す"""
+    return db.execute(
+        update(SyncCounter)
+        .where(SyncCounter.user_id == user_id)
+        .values(last_seq=SyncCounter.last_seq + count, updated_at=_utcnow())
+        .returning(SyncCounter.last_seq)
+    ).scalar_one()
+
+
+def _ensure_journal(db: Session, user_id: int) -> SyncCounter:
+    """ジャーナルがなければ既存の行をすべて変更として登録する（機能追加前から存在するユーザー用）"""
+    counter = db.get(SyncCounter, user_id)
+    if counter is not None:
+        return counter
+
+    # 同じユーザーの最初の変更が並行すると両方が登録しようとするため、カウンタ行の INSERT で先に権利を取る。
+    # 負けた側は相手のコミットを待ってから何もせず戻るので、登録済みのカウンタを読み直す
+    insert_counter = dialect_insert(db)
+    claimed = db.scalar(
+        insert_counter(SyncCounter)
+        .values(user_id=user_id, last_seq=0, updated_at=_utcnow())
+        .on_conflict_do_nothing(index_elements=[SyncCounter.user_id])
+        .returning(SyncCounter.user_id)
+    )
+    if claimed is not None:
+        entries = _initial_entries(db, user_id)
+        if entries:
+            db.execute(insert(ChangeJournalEntry), [
+                {"user_id": user_id, **entry._asdict()} for entry in entries
+            ])
+            db.execute(update(SyncCounter).where(SyncCounter.user_id == user_id).values(last_seq=len(entries)))
+    return db.get(SyncCounter, user_id)
+
+
+def _initial_entries(db: Session, user_id: int) -> List[JournalEntry]:
+    """ジャーナル作成時に登録する既存の行（エンティティ順・ID順に1から番号を振る）"""
+    entries: List[JournalEntry] = []
+    for entity, (model, owner_column) in ENTITIES.items():
+        for entity_id in db.scalars(select(model.id).where(owner_column == user_id).order_by(model.id)):
+            entries.append(JournalEntry(len(entries) + 1, entity, entity_id, False))
+    return entries
+
+
+def record_changes(db: Session, user_id: int, changes: Iterable[Tuple[Entity, int, bool]]) -> None:
+    """
+    (エンティティ, ID, 削除か) の変更をジャーナルに記録する。
+    作成した行は flush してIDが決まってから、削除する行は削除前に渡すこと。コミットは呼び出し側で行う。
+    コミットされると /events/stream の購読者にも通知される。
+    """
+    latest: Dict[Tuple[str, int], bool] = {}
+    for entity, entity_id, deleted in changes:
+        # 同じ行への変更は最後のものだけを残し、その順で番号を振る
+        latest.pop((entity, entity_id), None)
+        latest[(entity, entity_id)] = deleted
+    if not latest:
+        return
+
+    _ensure_journal(db, user_id)
+    first = _allocate(db, user_id, len(latest)) - len(latest) + 1
+
+    ids_by_entity: Dict[str, List[int]] = {}
+    for entity, entity_id in latest:
+        ids_by_entity.setdefault(entity, []).append(entity_id)
+    for entity, ids in ids_by_entity.items():
+        db.execute(delete(ChangeJournalEntry).where(
+            ChangeJournalEntry.user_id == user_id,
+            ChangeJournalEntry.entity == entity,
+            ChangeJournalEntry.entity_id.in_(ids),
+        ))
+    db.execute(insert(ChangeJournalEntry), [
+        {"user_id": user_id, "entity": entity, "entity_id": entity_id, "seq": first + i, "deleted": deleted}
+        for i, ((entity, entity_id), deleted) in enumerate(latest.items())
+    ])
+    # 接続中のクライアント (/events/stream) へはコミット後に通知する
+    publish_after_commit(db, user_id, [
+        {"type": "change", "seq": first + i, "entity": entity, "id": entity_id, "deleted": deleted}
+        for i, ((entity, entity_id), deleted) in enumerate(latest.items())
+    ])
+
+
+def record_change(db: Session, user_id: int, entity: Entity, entity_id: int) -> None:
+    """1行の作成・更新を記録する"""
+    record_changes(db, user_id, [(entity, entity_id, False)])
+
+
+def record_deletion(db: Session, user_id: int, entity: Entity, entity_id: int) -> None:
+    """
+    1行の削除を記録する（db.delete の前に呼ぶ）。
+    カテゴリ・場所の削除では参照していたタスクの外部キーも NULL になるため、それらも変更として記録する。
+    """
+    changes = [(entity, entity_id, True)]
+    column = TASK_REFERENCES.get(entity)
+    if column is not None:
+        task_ids = db.scalars(select(Task.id).where(Task.owner_id == user_id, column == entity_id))
+        changes += [("task", task_id, False) for task_id in task_ids]
+    record_changes(db, user_id, changes)
+
+
+def collection_version(db: Session, user_id: int) -> Tuple[int, Optional[datetime]]:
+    """
+    タスク・カテゴリ・場所のどれかが変わるたびに増える番号と、その最終変更日時 (UTC) を返す。
+    一覧の ETag / Last-Modified に使う。
+    ジャーナルがまだないユーザーは (0, None)。最初の変更でジャーナルが作られ、番号は必ず1以上になる。
+    """
+    counter = db.get(SyncCounter, user_id)
+    if counter is None:
+        return 0, None
+    return counter.last_seq, counter.updated_at
+
+
+def read_changes(db: Session, user_id: int, since: int, limit: int) -> Dict[str, Any]:
+    """
+    since より後の変更を seq 順に最大 limit 件返す。
+    戻り値の seq を次回の since に使う。has_more が True ならすぐに続きを取得する。
+    since がサーバーの番号より先（DBの作り直しなど）の場合は reset=True で最初から返す。
+    読み出しでは書き込まない。ジャーナルがまだないユーザーには、最初の変更で作られるジャーナルと
+    同じ番号を振った既存の行を返す（作成時に番号がずれても後ろにずれるだけなので、取りこぼしはない）。
+    """
+    counter = db.get(SyncCounter, user_id)
+    initial = _initial_entries(db, user_id) if counter is None else None
+    last_seq = len(initial) if initial is not None else counter.last_seq
+    reset = since > last_seq
+    if reset:
+        since = 0
+
+    if initial is not None:
+        entries = [entry for entry in initial if entry.seq > since][:limit + 1]
+    else:
+        entries = [JournalEntry(*row) for row in db.execute(
+            select(ChangeJournalEntry.seq, ChangeJournalEntry.entity, ChangeJournalEntry.entity_id,
+                   ChangeJournalEntry.deleted)
+            .where(ChangeJournalEntry.user_id == user_id, ChangeJournalEntry.seq > since)
+            .order_by(ChangeJournalEntry.seq)
+            .limit(limit + 1)
+        )]
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    changed: Dict[str, List[int]] = {entity: [] for entity in ENTITIES}
+    deleted: Dict[str, List[int]] = {entity: [] for entity in ENTITIES}
+    for entry in entries:
+        (deleted if entry.deleted else changed)[entry.entity].append(entry.entity_id)
+
+    rows: Dict[str, list] = {}
+    for entity, (model, owner_column) in ENTITIES.items():
+        ids = changed[entity]
+        rows[entity] = db.scalars(
+            select(model).where(model.id.in_(ids), owner_column == user_id).order_by(model.id)
+        ).all() if ids else []
+        # ジャーナルの後に消えた行は削除として返す
+        found = {row.id for row in rows[entity]}
+        deleted[entity] += [entity_id for entity_id in ids if entity_id not in found]
+
+    return {
+        "seq": entries[-1].seq if has_more else last_seq,
+        "has_more": has_more,
+        "reset": reset,
+        "tasks": rows["task"],
+        "categories": rows["category"],
+        "locations": rows["location"],
+        "deleted": {
+            "tasks": deleted["task"],
+            "categories": deleted["category"],
+            "locations": deleted["location"],
+        },
+    }
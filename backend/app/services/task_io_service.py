@@ -0,0 +1,290 @@
+# タスクのエクスポート・インポート (/tasks/export, /tasks/import)
+# 形式は NDJSON（1行に1タスクのJSON）と CSV（1行目が列名）。
+# エクスポートはサーバー側カーソル (yield_per) で少しずつ読み、インポートは受信しながら行単位で解析して
+# 一定件数ごとにまとめて INSERT するため、件数が多くてもメモリ使用量は増えない。
+
+import codecs
+import csv
+import io
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, List, Literal, Optional, Sequence, Tuple
+
+import orjson
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.metrics import track
+from app.models.category import Category
+from app.models.location import Location
+from app.models.task import Task
+from app.schemas.task import TaskImportRow
+from app.services.sync_service import record_changes
+from app.services.task_stats_service import TaskSnapshot, apply_task_changes
+
+TaskFileFormat = Literal["ndjson", "csv"]
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+# エクスポートで1回に読み込む行数（レスポンスもこの単位で送る）
+EXPORT_BATCH_SIZE = 1000
+# インポートで1回に INSERT・コミットする行数
+IMPORT_CHUNK_SIZE = 1000
+# 1行（CSVは1レコード）の文字数の上限。超えた行はエラーにして読み飛ばす
+MAX_LINE_LENGTH = 64 * 1024
+# レスポンスに含めるエラーの上限（件数は failed にすべて数える）
+MAX_REPORTED_ERRORS = 100
+
+
+# ---- エクスポート ----
+
+def export_statement(owner_id: int, columns: Sequence):
+    """所有者のタスクを id 順に読み込む SELECT（サーバー側カーソルで少しずつ取得する）"""
+    return (
+        select(*columns)
+        .where(Task.owner_id == owner_id)
+        .order_by(Task.id)
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+class TaskFileEncoder:
+    """行のタプルをエクスポート形式のバイト列にする（CSVは最初の呼び出しで列名の行を付ける）"""
+
+    def __init__(self, file_format: TaskFileFormat, fields: Sequence[str]):
+        self.format = file_format
+        self.fields = tuple(fields)
+        self._header_written = False
+
+    def encode(self, rows: Iterable[Sequence]) -> bytes:
+        with track("serialization"):
+            return self._encode(rows)
+
+    def _encode(self, rows: Iterable[Sequence]) -> bytes:
+        if self.format == "ndjson":
+            return b"".join(orjson.dumps(dict(zip(self.fields, row))) + b"\n" for row in rows)
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        if not self._header_written:
+            writer.writerow(self.fields)
+            self._header_written = True
+        writer.writerows([_csv_value(value) for value in row] for row in rows)
+        return buffer.getvalue().encode("utf-8")
+
+
+def export_tasks(db: Session, owner_id: int, encoder: TaskFileEncoder, columns: Sequence) -> Iterator[bytes]:
+    """タスクを EXPORT_BATCH_SIZE 件ずつエンコードして返すジェネレータ"""
+    # タスクがなくても CSV の列名は出力する
+    yield encoder.encode(())
+    result = db.execute(export_statement(owner_id, columns))
+    for partition in result.partitions():
+        yield encoder.encode(partition)
+
+
+async def export_tasks_async(
+    db: AsyncSession, owner_id: int, encoder: TaskFileEncoder, columns: Sequence
+) -> AsyncIterator[bytes]:
+    """export_tasks の非同期DB版"""
+    yield encoder.encode(())
+    result = await db.stream(export_statement(owner_id, columns))
+    async for partition in result.partitions():
+        yield encoder.encode(partition)
+
+
+# ---- インポート ----
+
+class TaskFileError(ValueError):
+    """ファイルの続きを読めない誤り（line はその行番号）"""
+
+    def __init__(self, line: int, message: str):
+        super().__init__(message)
+        self.line = line
+
+
+class TaskFileParser:
+    """
+    受信したバイト列を少しずつ受け取り、(行番号, レコード or エラーメッセージ) を返す。
+    行番号は1始まり（CSVの列名の行を含む）。CSVの複数行にわたるレコードは開始行の番号になる。
+    UTF-8 でない場合や CSV の列名に title がない場合は、続きを読めないため TaskFileError を送出する。
+    """
+
+    def __init__(self, file_format: TaskFileFormat):
+        self.format = file_format
+        # 先頭のBOMは取り除く
+        self._decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="strict")
+        self._buffer = ""
+        self.line_no = 0
+        self._skipping = False  # 上限を超えた行の残りを読み飛ばしている
+        self._record: List[str] = []  # CSVの閉じていないレコード
+        self._record_start = 0
+        self._header: Optional[List[str]] = None
+
+    def feed(self, chunk: bytes) -> List[Tuple[int, Any]]:
+        try:
+            self._buffer += self._decoder.decode(chunk)
+        except UnicodeDecodeError:
+            raise TaskFileError(self.line_no + 1, "File is not valid UTF-8")
+        return self._drain(final=False)
+
+    def close(self) -> List[Tuple[int, Any]]:
+        try:
+            self._buffer += self._decoder.decode(b"", final=True)
+        except UnicodeDecodeError:
+            raise TaskFileError(self.line_no + 1, "File is not valid UTF-8")
+        results = self._drain(final=True)
+        if self._record:
+            results.append((self._record_start, "Unterminated quoted field"))
+            self._record = []
+        return results
+
+    def _drain(self, final: bool) -> List[Tuple[int, Any]]:
+        results: List[Tuple[int, Any]] = []
+        while True:
+            end = self._buffer.find("\n")
+            if end < 0:
+                if final and self._buffer and not self._skipping:
+                    line, self._buffer = self._buffer, ""
+                    self._line(line, results)
+                elif len(self._buffer) > MAX_LINE_LENGTH and not self._skipping:
+                    # 改行が来ないまま上限を超えた。改行まで読み飛ばす
+                    self.line_no += 1
+                    results.append((self.line_no, "Line too long"))
+                    self._record = []
+                    self._skipping = True
+                    self._buffer = ""
+                elif self._skipping:
+                    self._buffer = ""
+                return results
+            line, self._buffer = self._buffer[:end], self._buffer[end + 1:]
+            if self._skipping:
+                self._skipping = False
+                continue
+            self._line(line, results)
+
+    def _line(self, line: str, results: List[Tuple[int, Any]]) -> None:
+        self.line_no += 1
+        if self.format == "ndjson":
+            if not line.strip():
+                return
+            if len(line) > MAX_LINE_LENGTH:
+                results.append((self.line_no, "Line too long"))
+                return
+            try:
+                record = orjson.loads(line)
+            except orjson.JSONDecodeError:
+                results.append((self.line_no, "Invalid JSON"))
+                return
+            if not isinstance(record, dict):
+                results.append((self.line_no, "Each line must be a JSON object"))
+                return
+            results.append((self.line_no, record))
+            return
+
+        # CSV: 引用符が閉じるまでの行を1レコードとしてまとめる
+        if not self._record:
+            self._record_start = self.line_no
+        self._record.append(line)
+        text = "\n".join(self._record)
+        if text.count('"') % 2:
+            if len(text) > MAX_LINE_LENGTH:
+                results.append((self._record_start, "Line too long"))
+                self._record = []
+            return
+        self._record = []
+        if not text.strip():
+            return
+        values = next(csv.reader([text]))
+        if self._header is None:
+            self._header = [name.strip() for name in values]
+            if "title" not in self._header:
+                raise TaskFileError(self.line_no, "CSV header must contain a 'title' column")
+            return
+        if len(values) > len(self._header):
+            results.append((self._record_start, "Too many columns"))
+            return
+        # 空欄は未指定として扱う（既定値を使う）
+        record = {name: value for name, value in zip(self._header, values) if value != ""}
+        results.append((self._record_start, record))
+
+
+def _validation_message(exc: ValidationError) -> str:
+    error = exc.errors()[0]
+    location = ".".join(str(part) for part in error["loc"])
+    return f"{location}: {error['msg']}" if location else error["msg"]
+
+
+class TaskImporter:
+    """
+    解析したレコードを検証してためておき、IMPORT_CHUNK_SIZE 件ごとにまとめて INSERT する。
+    場所・カテゴリのIDは自分のものだけを受け付ける。id・owner_id・created_at などの列は無視する。
+    """
+
+    def __init__(self, owner_id: int):
+        self.owner_id = owner_id
+        self.created = 0
+        self.failed = 0
+        self.errors: List[Dict[str, Any]] = []
+        self.pending: List[Dict[str, Any]] = []
+        self._location_ids: set = set()
+        self._category_ids: set = set()
+
+    def load_references(self, db: Session) -> None:
+        self._location_ids = set(db.scalars(select(Location.id).where(Location.owner_id == self.owner_id)))
+        self._category_ids = set(db.scalars(select(Category.id).where(Category.user_id == self.owner_id)))
+
+    def error(self, line: int, message: str) -> None:
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "error": message})
+
+    def add(self, line: int, record: Any) -> None:
+        """パーサーの結果を1件受け取る（文字列ならその行のエラー）"""
+        if isinstance(record, str):
+            self.error(line, record)
+            return
+        try:
+            row = TaskImportRow.model_validate(record)
+        except ValidationError as exc:
+            self.error(line, _validation_message(exc))
+            return
+        if row.location_id is not None and row.location_id not in self._location_ids:
+            self.error(line, "location_id: Location not found")
+            return
+        if row.category_id is not None and row.category_id not in self._category_ids:
+            self.error(line, "category_id: Category not found")
+            return
+        self.pending.append({**row.model_dump(), "owner_id": self.owner_id})
+
+    @property
+    def chunk_ready(self) -> bool:
+        return len(self.pending) >= IMPORT_CHUNK_SIZE
+
+    def insert_pending(self, db: Session) -> None:
+        """ためた行を INSERT し、集計カウンタと同期用のジャーナルを更新する（コミットは呼び出し側で行う）"""
+        if not self.pending:
+            return
+        rows, self.pending = self.pending, []
+        apply_task_changes(db, self.owner_id, [
+            (None, TaskSnapshot(row["is_completed"], row["deadline"])) for row in rows
+        ])
+        ids = db.scalars(insert(Task).returning(Task.id, sort_by_parameter_order=True), rows).all()
+        record_changes(db, self.owner_id, (("task", task_id, False) for task_id in ids))
+        self.created += len(ids)
+
+    def report(self) -> Dict[str, Any]:
+        return {"created": self.created, "failed": self.failed, "errors": self.errors}
@@ -1 +1,264 @@
-# タスク操作ロジック
\ No newline at end of file
+# タスク操作ロジック
+
+from datetime import datetime
+from typing import Any, Dict, List, Literal, Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import Integer, String, and_, case, delete, func, insert, or_, select, type_coerce
+from sqlalchemy.orm import Query, Session
+
+from app.core.pagination import decode_cursor, encode_cursor
+from app.models.task import Task
+from app.schemas.task import (
+    TaskBatchComplete, TaskBatchCreate, TaskBatchDelete, TaskBatchOperation, TaskBatchUpdate,
+)
+from app.services.sync_service import record_changes
+from app.services.task_stats_service import apply_task_changes, read_task_stats, snapshot
+
+SortBy = Literal["created_at", "deadline", "priority"]
+SortOrder = Literal["asc", "desc"]
+
+SORT_COLUMNS = {
+    "created_at": Task.created_at,
+    "deadline": Task.deadline,
+    "priority": Task.priority,
+}
+
+# カーソルのソートキーの型（保存値と同じくタイムゾーンなしの日時）
+SORT_KEY_TYPES = {
+    "created_at": datetime,
+    "deadline": datetime,
+    "priority": int,
+}
+
+
+def _valid_sort_key(sort_by: SortBy, key: Any) -> bool:
+    key_type = SORT_KEY_TYPES[sort_by]
+    if isinstance(key, bool) or not isinstance(key, key_type):
+        return False
+    return key_type is not datetime or key.tzinfo is None
+
+
+def _keyset_filter(query: Query, column, key, last_id: int, desc: bool):
+    """(column, id) が (key, last_id) より後ろにある行の条件を返す"""
+    if isinstance(key, datetime) and query.session.get_bind().dialect.name == "sqlite":
+        # SQLiteの日時は文字列で保存され、func.now() の値はマイクロ秒なし、
+        # Python側の値は ".000000" 付きになる。同じ時刻の両方の表記を考慮して比較する
+        column = type_coerce(column, String)
+        full = key.strftime("%Y-%m-%d %H:%M:%S.%f")
+        variants = [key.strftime("%Y-%m-%d %H:%M:%S"), full] if key.microsecond == 0 else [full]
+        equal = column.in_(variants)
+        beyond = column < variants[0] if desc else column > variants[-1]
+    else:
+        equal = column == key
+        beyond = column < key if desc else column > key
+    tie = Task.id < last_id if desc else Task.id > last_id
+    return or_(beyond, and_(equal, tie))
+
+
+def _page_segment(
+    query: Query,
+    sort_by: SortBy,
+    sort_order: SortOrder,
+    null_segment: bool,
+    after: Optional[Tuple[object, int]],
+    limit: int,
+) -> List[Task]:
+    """
+    ソートキーがNULLでない行 / NULLの行 のどちらか一方の区間を
+    (ソートキー, id) のキーセット条件で1ページ分取得する。
+    区間を分けることで、DBごとのNULLの並び順の違いに左右されず、
+    各区間で複合インデックス (owner_id, ソートキー, id) をそのまま使える。
+    """
+    column = SORT_COLUMNS[sort_by]
+    desc = sort_order == "desc"
+
+    if null_segment:
+        query = query.filter(column.is_(None))
+        if after is not None:
+            query = query.filter(Task.id < after[1] if desc else Task.id > after[1])
+        order = [Task.id.desc() if desc else Task.id.asc()]
+    else:
+        query = query.filter(column.isnot(None))
+        if after is not None:
+            query = query.filter(_keyset_filter(query, column, after[0], after[1], desc))
+        order = [column.desc(), Task.id.desc()] if desc else [column.asc(), Task.id.asc()]
+
+    return query.order_by(*order).limit(limit).all()
+
+
+def paginate_tasks(
+    query: Query,
+    sort_by: SortBy = "created_at",
+    sort_order: SortOrder = "desc",
+    cursor: Optional[str] = None,
+    limit: int = 100,
+) -> Tuple[List[Task], Optional[str]]:
+    """
+    タスクをキーセット方式でページングする。
+    query は Task の Query でも、列の Query（行のタプルが返る。id とソートキーの列を含むこと）でもよい。
+    ソートキーがNULLのタスク（期限なしなど）は昇順・降順に関わらず末尾に並ぶ。
+    戻り値は (タスク一覧, 次ページのカーソル or None)。
+    """
+    in_null_segment = False
+    after = None
+    if cursor:
+        payload = decode_cursor(cursor)
+        if payload.get("s") != sort_by or payload.get("o") != sort_order:
+            raise HTTPException(status_code=400, detail="Cursor does not match sort parameters")
+        try:
+            in_null_segment = bool(payload["n"])
+            after = (payload["k"], int(payload["i"]))
+        except (KeyError, TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        # キーの型が列と合わないとDBへの変換で失敗する（NULLの区間ではキーを使わない）
+        if not in_null_segment and not _valid_sort_key(sort_by, after[0]):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    # 1件多く取得して次ページの有無を判定する
+    fetch = limit + 1
+    rows: List[Task] = []
+    if not in_null_segment:
+        rows = _page_segment(query, sort_by, sort_order, False, after, fetch)
+        after = None
+    if len(rows) < fetch:
+        rows += _page_segment(query, sort_by, sort_order, True, after, fetch - len(rows))
+
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    last = rows[-1]
+    key = getattr(last, sort_by)
+    next_cursor = encode_cursor({
+        "s": sort_by,
+        "o": sort_order,
+        "n": key is None,
+        "k": key,
+        "i": last.id,
+    })
+    return rows, next_cursor
+
+
+def task_stats(
+    db: Session,
+    owner_id: int,
+    now: datetime,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> Dict[str, int]:
+    """
+    /tasks/stats の集計値（now はタイムゾーンなしのUTC）。
+    全期間はカウンタテーブルから読み、期間指定やカウンタがまだないユーザー（タスク未作成など）は集計クエリで求める。
+    """
+    if start is None and end is None:
+        stats = read_task_stats(db, owner_id, now)
+        if stats is not None:
+            return stats
+    return aggregate_task_stats(db, owner_id, now, start, end)
+
+
+def aggregate_task_stats(
+    db: Session,
+    owner_id: int,
+    now: datetime,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> Dict[str, int]:
+    """
+    合計・完了・期限切れの件数を1回の集計クエリで求める。
+    start/end を指定した場合は期限が [start, end) のタスクのみを対象にする。
+    """
+    completed = Task.is_completed.is_(True)
+    overdue = and_(Task.is_completed.isnot(True), Task.deadline.isnot(None), Task.deadline < now)
+    stmt = select(
+        func.count(Task.id),
+        func.coalesce(func.sum(case((completed, 1), else_=0)), 0).cast(Integer),
+        func.coalesce(func.sum(case((overdue, 1), else_=0)), 0).cast(Integer),
+    ).where(Task.owner_id == owner_id)
+    if start is not None:
+        stmt = stmt.where(Task.deadline >= start)
+    if end is not None:
+        stmt = stmt.where(Task.deadline < end)
+
+    total, completed_count, overdue_count = db.execute(stmt).one()
+    return {
+        "total": total,
+        "completed": completed_count,
+        "overdue": overdue_count,
+        "progress_rate": int((completed_count / total) * 100) if total > 0 else 0,
+    }
+
+
+def apply_task_batch(
+    db: Session, owner_id: int, operations: Sequence[TaskBatchOperation]
+) -> List[Dict[str, Any]]:
+    """
+    作成・更新・完了・削除の一括操作を1トランザクション分のSQLにまとめて実行する。
+    対象タスクは1回の IN クエリで所有者ごと確認し、見つからないものは not_found として結果に含める。
+    同じIDへの操作は先頭から順に適用する。変更は同期用のジャーナルにも記録する。
+    戻り値は操作ごとの結果（コミットは呼び出し側で行う）。
+    """
+    ids = {op.id for op in operations if not isinstance(op, TaskBatchCreate)}
+    owned = {
+        task.id: task
+        for task in db.scalars(select(Task).where(Task.id.in_(ids), Task.owner_id == owner_id))
+    } if ids else {}
+
+    results: List[Dict[str, Any]] = []
+    changes = []
+    new_rows = []
+    deleted = set()
+    for index, op in enumerate(operations):
+        result = {"index": index, "op": op.op, "status": "ok", "id": None, "task": None}
+        results.append(result)
+        if isinstance(op, TaskBatchCreate):
+            row = {**op.task.model_dump(), "is_completed": False, "owner_id": owner_id}
+            new_rows.append((result, row))
+            changes.append((None, snapshot(Task(**row))))
+            continue
+
+        result["id"] = op.id
+        task = owned.get(op.id)
+        if task is None or op.id in deleted:
+            result["status"] = "not_found"
+            continue
+
+        before = snapshot(task)
+        if isinstance(op, TaskBatchDelete):
+            deleted.add(op.id)
+            changes.append((before, None))
+            continue
+        if isinstance(op, TaskBatchUpdate):
+            for key, value in op.task.model_dump(exclude_unset=True).items():
+                setattr(task, key, value)
+        elif isinstance(op, TaskBatchComplete):
+            task.is_completed = op.is_completed
+        changes.append((before, snapshot(task)))
+        result["task"] = task
+
+    # カウンタはタスクの変更をflushする前に更新する
+    apply_task_changes(db, owner_id, changes)
+
+    # 削除するタスクは UPDATE の対象から外し、まとめて DELETE する
+    for task_id in deleted:
+        db.expunge(owned[task_id])
+    # 同じ列を更新する行は executemany の UPDATE 1回にまとめられる
+    db.flush()
+    if new_rows:
+        created = db.scalars(
+            insert(Task).returning(Task, sort_by_parameter_order=True),
+            [row for _, row in new_rows],
+        ).all()
+        for (result, _), task in zip(new_rows, created):
+            result["id"] = task.id
+            result["task"] = task
+    if deleted:
+        db.execute(
+            delete(Task).where(Task.id.in_(deleted), Task.owner_id == owner_id),
+            execution_options={"synchronize_session": False},
+        )
+    record_changes(db, owner_id, (
+        ("task", result["id"], result["op"] == "delete") for result in results if result["status"] == "ok"
+    ))
+    return results
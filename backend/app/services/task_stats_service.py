@@ -0,0 +1,210 @@
+# タスク集計カウンタ (user_task_stats / user_task_deadline_buckets) の更新と読み出し
+
+import argparse
+from datetime import date, datetime, time
+from typing import Dict, Iterable, NamedTuple, Optional, Tuple
+
+from sqlalchemy import and_, delete, func, select, update
+from sqlalchemy.orm import Session
+
+from app.db.upsert import dialect_insert
+from app.models.task import Task
+from app.models.task_stats import UserTaskDeadlineBucket, UserTaskStats
+
+
+class TaskSnapshot(NamedTuple):
+    """カウンタに影響するタスクの属性"""
+    is_completed: bool
+    deadline: Optional[datetime]
+
+
+def snapshot(task: Task) -> TaskSnapshot:
+    return TaskSnapshot(bool(task.is_completed), task.deadline)
+
+
+def _add_to_buckets(db: Session, user_id: int, deltas: Dict[date, int]) -> None:
+    """期限日ごとの件数に差分を加える。行がなければ作る（並行して作られても1文なので競合しない）"""
+    insert = dialect_insert(db)
+    stmt = insert(UserTaskDeadlineBucket)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[UserTaskDeadlineBucket.user_id, UserTaskDeadlineBucket.bucket_date],
+        set_={"open_count": UserTaskDeadlineBucket.open_count + stmt.excluded.open_count},
+    )
+    db.execute(stmt, [
+        {"user_id": user_id, "bucket_date": bucket_date, "open_count": delta}
+        for bucket_date, delta in deltas.items()
+    ])
+
+
+def _ensure_counters(db: Session, user_id: int) -> None:
+    """
+    カウンタ行がなければ tasks から作成する（最初の書き込み時。機能追加前から存在するユーザーも含む）。
+    同じユーザーの最初の書き込みが並行すると両方が作ろうとするため、カウンタ行の INSERT で先に権利を取る。
+    負けた側は相手のコミットを待ってから何もせず戻り、作られたカウンタに差分を加える。
+    """
+    # 変更中のタスクがflushされて再集計に含まれないようにする
+    with db.no_autoflush:
+        if db.get(UserTaskStats, user_id) is not None:
+            return
+        claimed = db.scalar(
+            dialect_insert(db)(UserTaskStats)
+            .values(user_id=user_id, total=0, completed=0)
+            .on_conflict_do_nothing(index_elements=[UserTaskStats.user_id])
+            .returning(UserTaskStats.user_id)
+        )
+        if claimed is not None:
+            rebuild_user_task_stats(db, user_id)
+
+
+def apply_task_change(
+    db: Session,
+    user_id: int,
+    before: Optional[TaskSnapshot],
+    after: Optional[TaskSnapshot],
+) -> None:
+    """
+    タスクの作成 (before=None)・更新・削除 (after=None) に合わせてカウンタを更新する。
+    呼び出し側のトランザクション内で実行し、コミットは呼び出し側で行う。
+    タスク自体の変更をflushする前に呼ぶこと（初回の再集計で二重に数えないため）。
+    """
+    apply_task_changes(db, user_id, [(before, after)])
+
+
+def apply_task_changes(
+    db: Session,
+    user_id: int,
+    changes: Iterable[Tuple[Optional[TaskSnapshot], Optional[TaskSnapshot]]],
+) -> None:
+    """apply_task_change の複数件版。差分を合算してからカウンタとバケットを1回ずつ更新する"""
+    _ensure_counters(db, user_id)
+
+    total_delta = 0
+    completed_delta = 0
+    bucket_deltas: Dict[date, int] = {}
+    for before, after in changes:
+        total_delta += (after is not None) - (before is not None)
+        completed_delta += (after is not None and after.is_completed) - (before is not None and before.is_completed)
+
+        # 未完了かつ期限ありのタスクだけがバケットに入る
+        old_bucket = before.deadline if before and not before.is_completed else None
+        new_bucket = after.deadline if after and not after.is_completed else None
+        if old_bucket == new_bucket:
+            continue
+        if old_bucket is not None:
+            bucket_deltas[old_bucket.date()] = bucket_deltas.get(old_bucket.date(), 0) - 1
+        if new_bucket is not None:
+            bucket_deltas[new_bucket.date()] = bucket_deltas.get(new_bucket.date(), 0) + 1
+
+    if total_delta or completed_delta:
+        db.execute(
+            update(UserTaskStats)
+            .where(UserTaskStats.user_id == user_id)
+            .values(
+                total=UserTaskStats.total + total_delta,
+                completed=UserTaskStats.completed + completed_delta,
+            )
+        )
+    bucket_deltas = {bucket_date: delta for bucket_date, delta in bucket_deltas.items() if delta}
+    if bucket_deltas:
+        _add_to_buckets(db, user_id, bucket_deltas)
+
+
+def read_task_stats(db: Session, user_id: int, now: datetime) -> Optional[Dict[str, int]]:
+    """
+    カウンタから合計・完了・期限切れ件数を読み出す（now はタイムゾーンなしのUTC）。
+    カウンタはタスクの書き込み時に作られるため、まだない場合は None（読み出しでは書き込まない）。
+    """
+    stats = db.get(UserTaskStats, user_id)
+    if stats is None:
+        return None
+
+    # 今日より前のバケットは全件が期限切れ。今日の分だけ tasks を数える
+    today_start = datetime.combine(now.date(), time.min)
+    past_overdue = db.execute(
+        select(func.coalesce(func.sum(UserTaskDeadlineBucket.open_count), 0)).where(
+            UserTaskDeadlineBucket.user_id == user_id,
+            UserTaskDeadlineBucket.bucket_date < now.date(),
+        )
+    ).scalar_one()
+    today_overdue = db.execute(
+        select(func.count(Task.id)).where(
+            Task.owner_id == user_id,
+            Task.deadline >= today_start,
+            Task.deadline < now,
+            Task.is_completed.isnot(True),
+        )
+    ).scalar_one()
+
+    total = stats.total
+    completed = stats.completed
+    return {
+        "total": total,
+        "completed": completed,
+        "overdue": int(past_overdue) + today_overdue,
+        "progress_rate": int((completed / total) * 100) if total > 0 else 0,
+    }
+
+
+def rebuild_user_task_stats(db: Session, user_id: int) -> None:
+    """tasks からユーザー1人分のカウンタを再計算する（コミットは呼び出し側）"""
+    completed = Task.is_completed.is_(True)
+    total, completed_count = db.execute(
+        select(
+            func.count(Task.id),
+            func.count(Task.id).filter(completed),
+        ).where(Task.owner_id == user_id)
+    ).one()
+
+    insert = dialect_insert(db)
+    stmt = insert(UserTaskStats).values(user_id=user_id, total=total, completed=completed_count)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[UserTaskStats.user_id],
+        set_={"total": stmt.excluded.total, "completed": stmt.excluded.completed},
+    ))
+
+    db.execute(delete(UserTaskDeadlineBucket).where(UserTaskDeadlineBucket.user_id == user_id))
+    buckets: Dict = {}
+    open_deadlines = db.execute(
+        select(Task.deadline).where(
+            and_(Task.owner_id == user_id, Task.deadline.isnot(None), Task.is_completed.isnot(True))
+        )
+    ).scalars()
+    for deadline in open_deadlines:
+        buckets[deadline.date()] = buckets.get(deadline.date(), 0) + 1
+    if buckets:
+        db.execute(insert(UserTaskDeadlineBucket), [
+            {"user_id": user_id, "bucket_date": day, "open_count": count} for day, count in buckets.items()
+        ])
+
+
+def rebuild_all_task_stats(db: Session) -> int:
+    """タスクを持つ全ユーザーのカウンタを再計算する。処理したユーザー数を返す"""
+    user_ids = db.execute(select(Task.owner_id).distinct()).scalars().all()
+    stale_ids = db.execute(select(UserTaskStats.user_id)).scalars().all()
+    for user_id in set(user_ids) | set(stale_ids):
+        rebuild_user_task_stats(db, user_id)
+    db.commit()
+    return len(set(user_ids) | set(stale_ids))
+
+
+if __name__ == "__main__":
+    # 使い方: python -m app.services.task_stats_service [--user-id ID]
+    from sqlalchemy.orm import sessionmaker
+
+    from app.db.engine import create_db_engine
+    from app.db.schema import sync_schema
+    from app.models import user, task, category, location, task_stats, geofence  # noqa: F401
+
+    parser = argparse.ArgumentParser(description="tasks から集計カウンタを再計算する")
+    parser.add_argument("--user-id", type=int, default=None, help="対象ユーザー（省略時は全員）")
+    args = parser.parse_args()
+
+    engine = create_db_engine()
+    sync_schema(engine)
+    with sessionmaker(bind=engine)() as session:
+        if args.user_id is not None:
+            rebuild_user_task_stats(session, args.user_id)
+            session.commit()
+            print(f"rebuilt task stats for user {args.user_id}")
+        else:
+            print(f"rebuilt task stats for {rebuild_all_task_stats(session)} users")
@@ -1 +1,28 @@
-# 認証ロジック
\ No newline at end of file
+# 認証ロジック
+# ユーザー登録・ログインのDBアクセス（bcrypt はエンドポイント側で password_hasher に任せる）
+
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from app.models.user import User
+from app.schemas.user import UserResponse
+
+
+def get_user_by_username(db: Session, username: str) -> Optional[User]:
+    return db.query(User).filter(User.username == username).first()
+
+
+def add_user(db: Session, user: User) -> User:
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    return user
+
+
+def set_avatar(db: Session, user: User, avatar_hash: Optional[str]) -> UserResponse:
+    """アイコン画像を変更する（コミットで属性が期限切れになる前にレスポンスを組み立てる）"""
+    user.avatar_hash = avatar_hash
+    response = UserResponse.model_validate(user)
+    db.commit()
+    return response
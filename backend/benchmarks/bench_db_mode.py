@@ -0,0 +1,113 @@
+# 同期DBモードと非同期DBモード (DB_ASYNC) の比較ベンチマーク
+# 使い方: python -m benchmarks.bench_db_mode [--requests 2000] [--concurrency 64]
+#
+# モードごとに一時SQLite DBで uvicorn を起動し、同じ負荷（タスク一覧・集計・1件取得）を
+# 並列でかけてスループットとレイテンシを表示する。httpx が必要。
+
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def wait_until_ready(client: httpx.AsyncClient) -> None:
+    for _ in range(100):
+        try:
+            if (await client.get("/health")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.1)
+    raise RuntimeError("server did not start")
+
+
+async def drive(base_url: str, n_requests: int, concurrency: int, n_tasks: int) -> dict:
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        await wait_until_ready(client)
+        await client.post("/api/v1/users/", json={"username": "bench", "password": "bench"})
+        token = (await client.post(
+            "/api/v1/users/login/", data={"username": "bench", "password": "bench"}
+        )).json()["access_token"]
+        client.headers["Authorization"] = f"Bearer {token}"
+        task_ids = [
+            (await client.post("/api/v1/tasks/", json={"title": f"task {i}"})).json()["id"]
+            for i in range(n_tasks)
+        ]
+
+        rng = random.Random(0)
+        paths = [
+            rng.choice(["/api/v1/tasks/?limit=50", "/api/v1/tasks/stats", f"/api/v1/tasks/{rng.choice(task_ids)}"])
+            for _ in range(n_requests)
+        ]
+        latencies = []
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one(path: str) -> None:
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.get(path)
+                latencies.append(time.perf_counter() - start)
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(path) for path in paths))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "rps": n_requests / elapsed,
+        "p50": latencies[len(latencies) // 2] * 1000,
+        "p95": latencies[int(len(latencies) * 0.95)] * 1000,
+    }
+
+
+def run_mode(db_async: bool, args) -> dict:
+    port = free_port()
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(
+            os.environ,
+            DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+            DB_ASYNC="true" if db_async else "false",
+        )
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+            cwd=BACKEND_DIR, env=env,
+        )
+        try:
+            return asyncio.run(drive(f"http://127.0.0.1:{port}", args.requests, args.concurrency, args.tasks))
+        finally:
+            server.terminate()
+            server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="同期DBモードと非同期DBモード (DB_ASYNC) の比較ベンチマーク")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--tasks", type=int, default=200)
+    args = parser.parse_args()
+
+    for db_async in (False, True):
+        result = run_mode(db_async, args)
+        label = "async" if db_async else "sync"
+        print(f"{label:<6} {result['rps']:8.1f} req/s  p50 {result['p50']:7.2f} ms  p95 {result['p95']:7.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# 位置情報の一括判定 (evaluate_trace) のベンチマーク
+# 使い方: python -m benchmarks.bench_geofence_batch [--locations 10000] [--fixes 1000]
+#
+# ランダムウォークで作った軌跡を、1点ずつ find_nearest_location で判定した結果
+# （calculate_distance によるスカラー実装）と比較し、出入りイベントが一致することも確認する。
+
+import argparse
+import math
+import os
+import random
+import tempfile
+import time
+
+from sqlalchemy.orm import sessionmaker
+
+from app.db.engine import create_db_engine
+from app.db.schema import sync_schema
+from app.services.location_service import evaluate_trace, find_nearest_location
+from benchmarks.bench_nearby import seed
+
+
+def random_walk(rng, n_fixes):
+    """首都圏内を 1 fix あたり最大 200m 程度動く軌跡"""
+    lat, lon = rng.uniform(35.2, 36.3), rng.uniform(139.2, 140.3)
+    fixes = []
+    for _ in range(n_fixes):
+        step = rng.uniform(0, 200) / 111320
+        bearing = rng.uniform(0, 2 * math.pi)
+        lat += step * math.cos(bearing)
+        lon += step * math.sin(bearing) / math.cos(math.radians(lat))
+        fixes.append((lat, lon))
+    return fixes
+
+
+def scalar_reference(db, owner_id, fixes):
+    transitions = []
+    state = None
+    for i, (lat, lon) in enumerate(fixes):
+        loc, distance = find_nearest_location(db, owner_id, lat, lon)
+        location_id = loc.id if loc else None
+        if location_id != state:
+            transitions.append((i, location_id, distance if loc else 0.0))
+            state = location_id
+    return transitions
+
+
+def check_trace(db, owner_id, fixes):
+    """
+    1本の軌跡をスカラー実装と一括判定 (evaluate_trace) で評価し、出入りイベントと距離が一致することを確認する。
+    戻り値は (スカラー実装の秒数, 一括判定の秒数)。
+    """
+    start = time.perf_counter()
+    expected = scalar_reference(db, owner_id, fixes)
+    scalar_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    actual = evaluate_trace(db, owner_id, [f[0] for f in fixes], [f[1] for f in fixes])
+    batch_time = time.perf_counter() - start
+
+    assert [t[:2] for t in actual] == [t[:2] for t in expected], "transitions differ"
+    assert all(math.isclose(a[2], e[2], rel_tol=1e-9, abs_tol=1e-6)
+               for a, e in zip(actual, expected)), "distances differ"
+    db.expunge_all()
+    return scalar_time, batch_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description="位置情報の一括判定 (evaluate_trace) のベンチマーク")
+    parser.add_argument("--locations", type=int, default=10000)
+    parser.add_argument("--fixes", type=int, default=1000)
+    parser.add_argument("--traces", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        sync_schema(engine)
+        db = sessionmaker(bind=engine)()
+        owner_id = seed(db, args.locations, rng)
+        print(f"{args.locations} locations, {args.traces} traces x {args.fixes} fixes")
+
+        scalar_time = batch_time = 0.0
+        for _ in range(args.traces):
+            scalar, batch = check_trace(db, owner_id, random_walk(rng, args.fixes))
+            scalar_time += scalar
+            batch_time += batch
+
+        n = args.traces * args.fixes
+        print(f"{'scalar':<8} {scalar_time / n * 1000:8.3f} ms/fix")
+        print(f"{'batch':<8} {batch_time / n * 1000:8.3f} ms/fix")
+        print("transitions identical")
+
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
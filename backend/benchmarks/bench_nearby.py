@@ -0,0 +1,93 @@
+# /locations/nearby の探索ベンチマーク
+# 使い方: python -m benchmarks.bench_nearby [--locations 10000] [--queries 500]
+#
+# 1ユーザーに大量の場所を登録した一時SQLite DBで、
+# 全件走査（従来の実装）と範囲による絞り込みを比較し、結果が一致することも確認する。
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from sqlalchemy.orm import sessionmaker
+
+from app.db.engine import create_db_engine
+from app.db.schema import sync_schema
+from app.models import user, task, category, location, task_stats, geofence  # noqa: F401
+from app.models.location import Location
+from app.models.user import User
+from app.services.location_service import calculate_distance, find_nearest_location
+
+
+def full_scan(db, owner_id, latitude, longitude):
+    """従来の実装：全件を読み込んでから距離を計算する"""
+    nearest_location = None
+    min_distance = float('inf')
+    for loc in db.query(Location).filter(Location.owner_id == owner_id).all():
+        distance = calculate_distance(latitude, longitude, loc.latitude, loc.longitude)
+        if distance <= loc.radius and distance < min_distance:
+            min_distance = distance
+            nearest_location = loc
+    return nearest_location, min_distance
+
+
+def seed(db, n_locations, rng):
+    owner = User(username="bench", hashed_password="x")
+    db.add(owner)
+    db.flush()
+    # 首都圏の範囲にばらまく（半径は 100m〜2km）
+    db.add_all(
+        Location(
+            name=f"loc{i}",
+            latitude=rng.uniform(35.0, 36.5),
+            longitude=rng.uniform(139.0, 140.5),
+            radius=rng.uniform(100, 2000),
+            owner_id=owner.id,
+        )
+        for i in range(n_locations)
+    )
+    db.commit()
+    return owner.id
+
+
+def run(label, fn, db, owner_id, points):
+    results = []
+    start = time.perf_counter()
+    for lat, lon in points:
+        loc, distance = fn(db, owner_id, lat, lon)
+        results.append((loc.id if loc else None, distance))
+        db.expunge_all()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<12} {elapsed / len(points) * 1000:8.3f} ms/query")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="/locations/nearby の探索ベンチマーク")
+    parser.add_argument("--locations", type=int, default=10000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        sync_schema(engine)
+        db = sessionmaker(bind=engine)()
+
+        owner_id = seed(db, args.locations, rng)
+        points = [(rng.uniform(35.0, 36.5), rng.uniform(139.0, 140.5)) for _ in range(args.queries)]
+        print(f"{args.locations} locations, {args.queries} queries")
+
+        expected = run("full scan", full_scan, db, owner_id, points)
+        actual = run("bounding box", find_nearest_location, db, owner_id, points)
+        assert actual == expected, "bounding box result differs from full scan"
+        print("results identical")
+
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
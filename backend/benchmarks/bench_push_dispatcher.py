@@ -0,0 +1,75 @@
+# プッシュ通知ディスパッチャのスループットと失敗時の挙動（偽の送信方式でオフライン実行）
+# 使い方: python -m benchmarks.bench_push_dispatcher [--messages 100000] [--latency 0.05]
+#
+# 送信方式ごとに latency 秒かかる FakePushTransport を使い、同時送信数ごとの処理時間と、
+# 一時的な失敗・拒否されるトークンがある場合の送信済み/失敗件数を表示する。
+
+import argparse
+import asyncio
+import logging
+import random
+import time
+
+from app.services.push_service import FakePushTransport, PushDispatcher, PushMessage
+
+DEVICE_TYPES = ("ios", "android", "web")
+
+
+def make_messages(count, rng):
+    return [
+        PushMessage(rng.choice(DEVICE_TYPES), f"token-{i}", "タスク", "期限が近づいています", {"task_id": i})
+        for i in range(count)
+    ]
+
+
+async def run(messages, args, concurrency, invalid_tokens, batch_failure_rate, message_failure_rate):
+    transports = {
+        device_type: FakePushTransport(
+            latency=args.latency,
+            max_batch=args.batch_size,
+            invalid_tokens=invalid_tokens,
+            batch_failure_rate=batch_failure_rate,
+            message_failure_rate=message_failure_rate,
+            seed=args.seed + n,
+        )
+        for n, device_type in enumerate(DEVICE_TYPES)
+    }
+    dispatcher = PushDispatcher(transports, concurrency=concurrency, max_attempts=args.attempts, backoff=args.backoff)
+    start = time.perf_counter()
+    report = await dispatcher.dispatch(messages)
+    elapsed = time.perf_counter() - start
+    requests = sum(t.requests for t in transports.values())
+    print(
+        f"concurrency={concurrency:<3} {elapsed:7.3f} s {len(messages) / elapsed:10,.0f} msg/s  "
+        f"requests={requests:<5} sent={report.sent} failed={report.failed} invalid={len(report.invalid_tokens)}"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="プッシュ通知ディスパッチャのスループットと失敗時の挙動")
+    parser.add_argument("--messages", type=int, default=100_000)
+    parser.add_argument("--latency", type=float, default=0.05, help="1リクエストあたりの疑似遅延（秒）")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--attempts", type=int, default=4)
+    parser.add_argument("--backoff", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    # 再送のたびに出る警告ログを抑える
+    logging.getLogger("app.services.push_service").setLevel(logging.ERROR)
+
+    rng = random.Random(args.seed)
+    messages = make_messages(args.messages, rng)
+
+    print("# no failures")
+    for concurrency in (1, 4, 16, 64):
+        await run(messages, args, concurrency, (), 0.0, 0.0)
+
+    # 1% のトークンが拒否され、一括の20%・メッセージの5%が一時的に失敗する
+    invalid = {m.token for m in rng.sample(messages, args.messages // 100)}
+    print("# 1% invalid tokens, 20% batch failures, 5% message failures")
+    for concurrency in (4, 16):
+        await run(messages, args, concurrency, invalid, 0.2, 0.05)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,139 @@
+# 一覧レスポンスのシリアライズの比較ベンチマーク
+# 使い方: python -m benchmarks.bench_serialization [--rows 20 100 1000] [--repeat 200]
+#
+# タスク・場所・カテゴリの一覧について、次の2つの経路を同じ行数で比較する。
+#   orm    : ORMオブジェクトを読み込み、response_model と同じ TypeAdapter で検証してから JSON にする（従来の経路）
+#   fast   : レスポンスの列だけを Core の SELECT で取得し、orjson で JSON にする (app.core.serialization)
+# 「変換のみ」は取得済みの行を JSON にする時間、「取得+変換」はDBからの読み込みを含む時間。
+# 両経路の出力が同じ内容であることも確認する。
+
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import List
+
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.api.v1.endpoints.categories import CATEGORY_ROWS
+from app.api.v1.endpoints.location import LOCATION_ROWS
+from app.api.v1.endpoints.tasks import TASK_ROWS
+from app.db.base import Base
+from app.models import Category, Task, User
+from app.models.location import Location
+
+
+@lru_cache(maxsize=None)
+def list_adapter(schema) -> TypeAdapter:
+    # FastAPI が response_model=List[schema] に対して作るものと同じ
+    return TypeAdapter(List[schema])
+
+
+def seed(session_factory, n_rows: int, rng: random.Random) -> int:
+    now = datetime.now()
+    with session_factory() as db:
+        user = User(username="bench", hashed_password="x")
+        db.add(user)
+        db.flush()
+        db.add_all(Category(name=f"カテゴリ{i}", color="#6366f1", user_id=user.id) for i in range(n_rows))
+        db.add_all(
+            Location(
+                name=f"場所{i}", latitude=35.6 + rng.random() * 0.2, longitude=139.6 + rng.random() * 0.2,
+                radius=500.0, owner_id=user.id,
+            )
+            for i in range(n_rows)
+        )
+        db.add_all(
+            Task(
+                title=f"タスク{i}", description="説明" * 10, owner_id=user.id,
+                is_completed=rng.random() < 0.3, priority=rng.randint(1, 3),
+                deadline=now + timedelta(minutes=rng.randint(-10000, 10000)) if rng.random() < 0.8 else None,
+                created_at=now,
+            )
+            for i in range(n_rows)
+        )
+        db.commit()
+        return user.id
+
+
+def measure(fn, repeat: int) -> float:
+    """1回あたりの時間（マイクロ秒、中央値）"""
+    fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1e6
+
+
+def bench_resource(session_factory, name, model, projection, owner_column, owner_id, n_rows, repeat):
+    adapter = list_adapter(projection.schema)
+
+    def load_orm(db):
+        return db.query(model).filter(owner_column == owner_id).order_by(model.id).limit(n_rows).all()
+
+    def load_rows(db):
+        stmt = projection.select().where(owner_column == owner_id).order_by(model.id).limit(n_rows)
+        return db.execute(stmt).all()
+
+    def orm_json(objects):
+        return adapter.dump_json(adapter.validate_python(objects, from_attributes=True))
+
+    with session_factory() as db:
+        objects = load_orm(db)
+        rows = load_rows(db)
+        if json.loads(orm_json(objects)) != json.loads(projection.dumps(rows)):
+            raise SystemExit(f"{name}: output differs between paths")
+
+        serialize_orm = measure(lambda: orm_json(objects), repeat)
+        serialize_fast = measure(lambda: projection.dumps(rows), repeat)
+
+    def full_orm():
+        with session_factory() as db:
+            orm_json(load_orm(db))
+
+    def full_fast():
+        with session_factory() as db:
+            projection.dumps(load_rows(db))
+
+    total_orm = measure(full_orm, repeat)
+    total_fast = measure(full_fast, repeat)
+    print(
+        f"{name:<10} {len(rows):>5} | "
+        f"{serialize_orm:>9.0f} {serialize_fast:>8.0f} {serialize_orm / serialize_fast:>5.1f}x | "
+        f"{total_orm:>9.0f} {total_fast:>8.0f} {total_orm / total_fast:>5.1f}x"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="一覧レスポンスのシリアライズの比較")
+    parser.add_argument("--rows", type=int, nargs="+", default=[20, 100, 1000], help="1回に返す行数")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_engine(f"sqlite:///{db_path}")
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(bind=engine)
+    owner_id = seed(session_factory, max(args.rows), random.Random(args.seed))
+
+    print("単位: マイクロ秒/リクエスト（中央値）")
+    print(f"{'':<10} {'rows':>5} | {'変換のみ orm':>9} {'fast':>8} {'':>6} | {'取得+変換 orm':>9} {'fast':>8}")
+    for n_rows in args.rows:
+        bench_resource(session_factory, "tasks", Task, TASK_ROWS, Task.owner_id, owner_id, n_rows, args.repeat)
+        bench_resource(session_factory, "locations", Location, LOCATION_ROWS, Location.owner_id, owner_id, n_rows, args.repeat)
+        bench_resource(session_factory, "categories", Category, CATEGORY_ROWS, Category.user_id, owner_id, n_rows, args.repeat)
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
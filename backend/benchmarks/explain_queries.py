@@ -0,0 +1,234 @@
+# v1 エンドポイントが発行するクエリの実行計画チェック（全件走査の検出）
+# 使い方: python -m benchmarks.explain_queries [--users 3] [--tasks 3000] [--verbose]
+#
+# 一時SQLite DBにデータを入れて各エンドポイントを呼び、発行されたSQLをすべて記録する。
+# 記録した SELECT / UPDATE / DELETE ごとに EXPLAIN QUERY PLAN を実行し、
+# テーブルの全件走査（"SCAN <テーブル>"。インデックス全体の走査を含む）があれば一覧を出して終了コード1で終わる。
+# インデックスを追加・変更したときや、エンドポイントのクエリを変えたときに実行する。
+
+import argparse
+import os
+import random
+import re
+import sqlite3
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+# 設定はアプリの読み込み前に決める
+_db_dir = tempfile.mkdtemp()
+DB_PATH = os.path.join(_db_dir, "explain.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ.setdefault("PASSWORD_HASH_WORKERS", "0")
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+os.environ.setdefault("DEADLINE_SCHEDULER_ENABLED", "false")
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+from sqlalchemy.engine import Engine  # noqa: E402
+
+from app.db.base import Base  # noqa: E402
+from app.db.search import register_search_functions  # noqa: E402
+from app.models import Category, Task  # noqa: E402
+from app.models.location import Location  # noqa: E402
+from main import app  # noqa: E402
+
+API = "/api/v1"
+
+# 全件走査を許すテーブル名と理由（現在はなし）
+ALLOWED_SCANS = {}
+
+_statements = []   # (ラベル, SQL, パラメータ)
+_label = None
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _record(conn, cursor, statement, parameters, context, executemany):
+    if _label is None or conn.dialect.name != "sqlite":
+        return
+    if executemany:
+        parameters = parameters[0] if parameters else ()
+    _statements.append((_label, statement, parameters))
+
+
+def call(client, label, method, path, headers, **kwargs):
+    global _label
+    _label = label
+    try:
+        response = client.request(method, API + path, headers=headers, **kwargs)
+    finally:
+        _label = None
+    if response.status_code >= 400:
+        raise SystemExit(f"{label}: {method} {path} -> {response.status_code} {response.text}")
+    return response
+
+
+def seed(session_factory, user_ids, n_tasks, rng):
+    """各ユーザーにカテゴリ・場所・タスクを入れる"""
+    now = datetime.now()
+    with session_factory() as db:
+        for user_id in user_ids:
+            categories = [Category(name=f"c{i}", user_id=user_id) for i in range(10)]
+            locations = [
+                Location(
+                    name=f"l{i}", latitude=35.6 + rng.random() * 0.2, longitude=139.6 + rng.random() * 0.2,
+                    radius=500.0, owner_id=user_id,
+                )
+                for i in range(50)
+            ]
+            db.add_all(categories + locations)
+            db.flush()
+            db.add_all(
+                Task(
+                    title=f"タスク{i} 定例会議" if i % 7 == 0 else f"タスク{i}",
+                    description="説明",
+                    owner_id=user_id,
+                    is_completed=rng.random() < 0.3,
+                    priority=rng.randint(1, 3),
+                    deadline=now + timedelta(hours=rng.randint(-24 * 60, 24 * 60)) if rng.random() < 0.8 else None,
+                    location_id=rng.choice(locations).id if rng.random() < 0.3 else None,
+                    category_id=rng.choice(categories).id if rng.random() < 0.5 else None,
+                )
+                for i in range(n_tasks)
+            )
+        db.commit()
+
+
+def exercise(client, headers, ids):
+    """確認対象のエンドポイントを呼ぶ"""
+    task_id, location_id, category_id = ids["task"], ids["location"], ids["category"]
+    month = datetime.now().date().replace(day=1)
+    r = call(client, "tasks list", "GET", "/tasks/", headers, params={"limit": 50})
+    call(client, "tasks list page 2", "GET", "/tasks/", headers,
+         params={"limit": 50, "cursor": r.headers["X-Next-Cursor"]})
+    for sort_by in ("deadline", "priority"):
+        for order in ("asc", "desc"):
+            call(client, f"tasks list sort={sort_by} {order}", "GET", "/tasks/", headers,
+                 params={"sort_by": sort_by, "sort_order": order, "limit": 50})
+    call(client, "tasks list is_completed", "GET", "/tasks/", headers, params={"is_completed": False})
+    call(client, "tasks list location_id", "GET", "/tasks/", headers, params={"location_id": location_id})
+    call(client, "tasks list date range", "GET", "/tasks/", headers, params={
+        "sort_by": "deadline", "start_date": datetime.now().isoformat(),
+        "end_date": (datetime.now() + timedelta(days=7)).isoformat(),
+    })
+    call(client, "tasks stats", "GET", "/tasks/stats", headers)
+    call(client, "tasks stats range", "GET", "/tasks/stats", headers, params={
+        "start": datetime.now().isoformat(), "end": (datetime.now() + timedelta(days=30)).isoformat(),
+    })
+    call(client, "tasks search", "GET", "/tasks/search", headers, params={"q": "定例会議"})
+    r = call(client, "tasks search short", "GET", "/tasks/search", headers, params={"q": "会議", "limit": 5})
+    call(client, "tasks search short page 2", "GET", "/tasks/search", headers,
+         params={"q": "会議", "limit": 5, "cursor": r.headers["X-Next-Cursor"]})
+    call(client, "tasks search mixed", "GET", "/tasks/search", headers, params={"q": "定例会議 タ"})
+    call(client, "tasks search one char", "GET", "/tasks/search", headers, params={"q": "議"})
+    call(client, "tasks calendar", "GET", "/tasks/calendar", headers, params={
+        "start": month.isoformat(), "end": (month + timedelta(days=31)).isoformat(), "tz": "Asia/Tokyo",
+    })
+    call(client, "task detail", "GET", f"/tasks/{task_id}", headers)
+    call(client, "task create", "POST", "/tasks/", headers, json={"title": "new", "priority": 3})
+    call(client, "task update", "PUT", f"/tasks/{task_id}", headers, json={"is_completed": True})
+    call(client, "tasks batch", "POST", "/tasks/batch", headers, json={"operations": [
+        {"op": "create", "task": {"title": "batch"}},
+        {"op": "complete", "id": task_id},
+        {"op": "update", "id": task_id, "task": {"priority": 1}},
+    ]})
+    call(client, "task delete", "DELETE", f"/tasks/{ids['task_to_delete']}", headers)
+
+    call(client, "categories list", "GET", "/categories/", headers)
+    call(client, "category detail", "GET", f"/categories/{category_id}", headers)
+    call(client, "category update", "PUT", f"/categories/{category_id}", headers, json={"name": "renamed"})
+    call(client, "category delete", "DELETE", f"/categories/{ids['category_to_delete']}", headers)
+
+    call(client, "locations list", "GET", "/locations/", headers)
+    call(client, "locations nearby", "GET", "/locations/nearby", headers,
+         params={"latitude": 35.7, "longitude": 139.7})
+    call(client, "locations session", "POST", "/locations/session", headers,
+         json={"latitude": 35.7, "longitude": 139.7})
+    call(client, "location detail", "GET", f"/locations/{location_id}", headers)
+    call(client, "location update", "PUT", f"/locations/{location_id}", headers, json={"name": "renamed"})
+    call(client, "location delete", "DELETE", f"/locations/{ids['location_to_delete']}", headers)
+
+    call(client, "users me", "GET", "/users/me", headers)
+    call(client, "sync full", "GET", "/sync/", headers, params={"since": 0})
+    call(client, "sync delta", "GET", "/sync/", headers, params={"since": 5})
+    call(client, "device register", "POST", "/users/me/devices", headers,
+         json={"device_token": "token-1", "device_type": "ios"})
+    call(client, "device delete", "DELETE", "/users/me/devices/token-1", headers)
+
+
+def full_scans(plan_rows, tables):
+    """EXPLAIN QUERY PLAN の行のうち、実テーブルを全件走査しているもの"""
+    scans = []
+    for row in plan_rows:
+        detail = row[-1]
+        match = re.match(r"SCAN (\w+)", detail)
+        if match and match.group(1) in tables and "VIRTUAL TABLE" not in detail:
+            if match.group(1) not in ALLOWED_SCANS:
+                scans.append(detail)
+    return scans
+
+
+def main():
+    parser = argparse.ArgumentParser(description="v1 エンドポイントが発行するクエリの実行計画チェック（全件走査の検出）")
+    parser.add_argument("--users", type=int, default=3)
+    parser.add_argument("--tasks", type=int, default=3000, help="ユーザーあたりのタスク数")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--verbose", action="store_true", help="全クエリの実行計画を表示する")
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    with TestClient(app) as client:
+        headers_by_user = []
+        for n in range(args.users):
+            credentials = {"username": f"explain{n}", "password": "password"}
+            client.post(f"{API}/users/", json=credentials)
+            token = client.post(f"{API}/users/login/", data=credentials).json()["access_token"]
+            headers_by_user.append({"Authorization": f"Bearer {token}"})
+        user_ids = [client.get(f"{API}/users/me", headers=h).json()["id"] for h in headers_by_user]
+        seed(app.state.SessionLocal, user_ids, args.tasks, rng)
+
+        with app.state.SessionLocal() as db:
+            owner = user_ids[0]
+            tasks = db.query(Task.id).filter(Task.owner_id == owner).limit(2).all()
+            locations = db.query(Location.id).filter(Location.owner_id == owner).limit(2).all()
+            categories = db.query(Category.id).filter(Category.user_id == owner).limit(2).all()
+        ids = {
+            "task": tasks[0][0], "task_to_delete": tasks[1][0],
+            "location": locations[0][0], "location_to_delete": locations[1][0],
+            "category": categories[0][0], "category_to_delete": categories[1][0],
+        }
+        exercise(client, headers_by_user[0], ids)
+
+    tables = set(Base.metadata.tables)
+    connection = sqlite3.connect(DB_PATH)
+    # tasks のトリガーが呼ぶ関数（UPDATE / DELETE の実行計画を作るときに必要）
+    register_search_functions(connection)
+    seen = set()
+    failures = []
+    for label, statement, parameters in _statements:
+        verb = statement.lstrip().split(None, 1)[0].upper()
+        if verb not in ("SELECT", "UPDATE", "DELETE", "WITH") or (label, statement) in seen:
+            continue
+        seen.add((label, statement))
+        plan = connection.execute("EXPLAIN QUERY PLAN " + statement, parameters).fetchall()
+        scans = full_scans(plan, tables)
+        if scans:
+            failures.append((label, statement, scans))
+        if args.verbose or scans:
+            print(f"[{'FULL SCAN' if scans else 'ok'}] {label}")
+            print("    " + " ".join(statement.split())[:300])
+            for row in plan:
+                print(f"    -> {row[-1]}")
+    connection.close()
+
+    print(f"checked {len(seen)} statements from {len({label for label, _ in seen})} endpoint calls")
+    if failures:
+        print(f"{len(failures)} statements scan a whole table:")
+        for label, _, scans in failures:
+            print(f"  {label}: {'; '.join(scans)}")
+        sys.exit(1)
+    print("no full table scans")
+
+
+if __name__ == "__main__":
+    main()
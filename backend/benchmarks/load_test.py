@@ -0,0 +1,469 @@
+# v1 API の負荷試験（再現可能な合成データ + リクエストの組み合わせ）
+# 使い方:
+#   python -m benchmarks.load_test [--users 200] [--requests 5000] [--concurrency 32]
+#                                  [--driver both|inprocess|uvicorn] [--db-async] [--output results.json]
+#   python -m benchmarks.load_test --compare base.json head.json [--threshold 10]
+#
+# 1. 一時SQLite DBに合成データ（ユーザー・カテゴリ・場所・タスク）を入れる。件数や値の分布は下の POPULATION_* を参照。
+# 2. 乱数の種から実行するリクエストの列を作る（同じ引数なら同じ列になる）。
+# 3. アプリをプロセス内 (httpx.ASGITransport) と uvicorn の両方で起動し、同じ列を並列に実行する。
+#    どちらもDBは合成直後のコピーから始める。最初の --warmup 件は集計から除く。
+# 4. エンドポイントごとの p50/p95/p99 レイテンシとスループットを表示し、--output に JSON で保存する。
+# --compare は保存した2つの結果を比べ、p95 が --threshold % 以上悪化したものがあれば終了コード1で終わる。
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from itertools import count
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+API = "/api/v1"
+PASSWORD = "loadtest-password"
+
+# ---- 合成データの分布 ----
+
+# 場所の中心にする都市（緯度, 経度）。ユーザーごとに1つを「生活圏」とする
+POPULATION_CITIES = [(35.681, 139.767), (34.702, 135.496), (35.170, 136.881), (33.590, 130.420), (43.068, 141.350)]
+# タスク数: 対数正規分布（中央値 --tasks-median、少数のユーザーが大量に持つ）
+POPULATION_TASK_SIGMA = 1.0
+POPULATION_MAX_TASKS = 5000
+# カテゴリ数・場所数の重み（0件, 1件, ...）
+POPULATION_CATEGORY_WEIGHTS = [5, 5, 10, 40, 20, 10, 5, 5]
+POPULATION_LOCATION_WEIGHTS = [15, 20, 25, 15, 10, 5, 5, 3, 2]
+POPULATION_RADII = [100.0, 200.0, 300.0, 500.0, 1000.0]
+# 優先度 1:低, 2:中, 3:高 の割合
+POPULATION_PRIORITY_WEIGHTS = [30, 50, 20]
+
+# ---- リクエストの組み合わせ（重み） ----
+
+REQUEST_MIX = {
+    "login": 5,
+    "tasks_list": 20,
+    "tasks_list_filtered": 20,
+    "tasks_stats": 20,
+    "locations_nearby": 20,
+    "task_update": 15,
+}
+
+
+@dataclass
+class Population:
+    users: List[Dict[str, Any]] = field(default_factory=list)  # id, username, 場所, タスクID
+    counts: Dict[str, int] = field(default_factory=dict)
+
+
+def _offset(lat: float, lon: float, rng: random.Random, meters: float):
+    """(lat, lon) から平均 meters 程度ずらした地点"""
+    d_lat = rng.gauss(0, meters) / 111_320
+    d_lon = rng.gauss(0, meters) / (111_320 * math.cos(math.radians(lat)))
+    return lat + d_lat, lon + d_lon
+
+
+def seed_population(db_url: str, n_users: int, tasks_median: float, rng: random.Random) -> Population:
+    """合成データをDBに入れる。パスワードは全員 PASSWORD（ハッシュは1回だけ計算して共有する）"""
+    from sqlalchemy import insert, select
+    from sqlalchemy.orm import sessionmaker
+
+    from app.core.security import get_password_hash
+    from app.db.engine import create_db_engine
+    from app.db.schema import sync_schema
+    from app.models import Category, Task, User
+    from app.models.location import Location
+    from app.services.task_stats_service import rebuild_all_task_stats
+
+    engine = create_db_engine(db_url)
+    sync_schema(engine)
+    session_factory = sessionmaker(bind=engine)
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    hashed = get_password_hash(PASSWORD)
+    population = Population()
+
+    with session_factory() as db:
+        user_ids = db.scalars(
+            insert(User).returning(User.id, sort_by_parameter_order=True),
+            [{"username": f"load{i:05d}", "hashed_password": hashed} for i in range(n_users)],
+        ).all()
+
+        task_rows = []
+        for i, user_id in enumerate(user_ids):
+            home = rng.choice(POPULATION_CITIES)
+            n_categories = rng.choices(range(len(POPULATION_CATEGORY_WEIGHTS)), POPULATION_CATEGORY_WEIGHTS)[0]
+            n_locations = rng.choices(range(len(POPULATION_LOCATION_WEIGHTS)), POPULATION_LOCATION_WEIGHTS)[0]
+            category_ids = db.scalars(
+                insert(Category).returning(Category.id, sort_by_parameter_order=True),
+                [{"name": f"カテゴリ{n}", "color": "#6366f1", "user_id": user_id} for n in range(n_categories)],
+            ).all() if n_categories else []
+
+            # 場所は生活圏の中心から数km以内に散らばる
+            locations = []
+            for n in range(n_locations):
+                lat, lon = _offset(*home, rng, 3000)
+                locations.append({
+                    "name": f"場所{n}", "latitude": lat, "longitude": lon, "radius": rng.choice(POPULATION_RADII),
+                    "owner_id": user_id, "category_id": rng.choice(category_ids) if category_ids and rng.random() < 0.3 else None,
+                })
+            location_ids = db.scalars(
+                insert(Location).returning(Location.id, sort_by_parameter_order=True), locations,
+            ).all() if locations else []
+
+            n_tasks = min(POPULATION_MAX_TASKS, int(rng.lognormvariate(math.log(tasks_median), POPULATION_TASK_SIGMA)))
+            for _ in range(n_tasks):
+                # 作成は過去180日に分布し、期限は作成から平均1週間後（過ぎたものは多くが完了済み）
+                created_at = now - timedelta(seconds=rng.uniform(0, 180 * 86400))
+                deadline = created_at + timedelta(seconds=rng.expovariate(1 / (7 * 86400))) if rng.random() < 0.7 else None
+                overdue = deadline is not None and deadline < now
+                task_rows.append({
+                    "title": f"タスク {rng.randrange(100000)}",
+                    "description": "説明 " * rng.randint(1, 20) if rng.random() < 0.5 else None,
+                    "is_completed": rng.random() < (0.8 if overdue else 0.2),
+                    "priority": rng.choices((1, 2, 3), POPULATION_PRIORITY_WEIGHTS)[0],
+                    "deadline": deadline,
+                    "created_at": created_at,
+                    "owner_id": user_id,
+                    "location_id": rng.choice(location_ids) if location_ids and rng.random() < 0.2 else None,
+                    "category_id": rng.choice(category_ids) if category_ids and rng.random() < 0.6 else None,
+                })
+            population.users.append({
+                "id": user_id, "username": f"load{i:05d}", "home": home,
+                "locations": [(row["latitude"], row["longitude"], row["radius"], location_id)
+                              for row, location_id in zip(locations, location_ids)],
+            })
+            if len(task_rows) >= 10000:
+                db.execute(insert(Task), task_rows)
+                task_rows = []
+        if task_rows:
+            db.execute(insert(Task), task_rows)
+        db.commit()
+        rebuild_all_task_stats(db)
+
+        tasks_by_owner = defaultdict(list)
+        for task_id, owner_id in db.execute(select(Task.id, Task.owner_id).order_by(Task.id)):
+            tasks_by_owner[owner_id].append(task_id)
+        for user in population.users:
+            user["tasks"] = tasks_by_owner.get(user["id"], [])
+
+        population.counts = {
+            "users": len(user_ids),
+            "tasks": sum(len(ids) for ids in tasks_by_owner.values()),
+            "categories": db.query(Category).count(),
+            "locations": db.query(Location).count(),
+        }
+    # 接続を閉じて WAL をDBファイルに書き戻す（このあとファイルをコピーする）
+    engine.dispose()
+    return population
+
+
+# ---- リクエストの列 ----
+
+def build_plan(population: Population, n_requests: int, rng: random.Random) -> List[Dict[str, Any]]:
+    """
+    実行するリクエストの列を作る。
+    よく使うユーザーほど多く選ばれるよう、ユーザーは順位の -0.8 乗に比例する重みで選ぶ。
+    """
+    users = population.users
+    user_weights = [1 / (rank + 1) ** 0.8 for rank in range(len(users))]
+    users_with_tasks = [u for u in users if u["tasks"]]
+    ops, op_weights = zip(*REQUEST_MIX.items())
+    now = datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+
+    plan = []
+    for _ in range(n_requests):
+        op = rng.choices(ops, op_weights)[0]
+        user = rng.choices(users, user_weights)[0]
+        request: Dict[str, Any] = {"op": op, "user": user["id"], "method": "GET", "params": {}}
+
+        if op == "login":
+            request.update(method="POST", path="/users/login/", data={"username": user["username"], "password": PASSWORD})
+            request["user"] = None
+        elif op == "tasks_list":
+            request.update(path="/tasks/", params={"limit": rng.choice([20, 50, 100])})
+        elif op == "tasks_list_filtered":
+            params: Dict[str, Any] = {"limit": rng.choice([20, 50, 100])}
+            variant = rng.choice(["open", "upcoming", "week", "location", "priority"])
+            if variant == "open":
+                params["is_completed"] = "false"
+            elif variant == "upcoming":
+                params.update(sort_by="deadline", sort_order="asc", start_date=now.isoformat())
+            elif variant == "week":
+                params.update(sort_by="deadline", start_date=now.isoformat(),
+                              end_date=(now + timedelta(days=7)).isoformat())
+            elif variant == "location" and user["locations"]:
+                params["location_id"] = rng.choice(user["locations"])[3]
+            else:
+                params.update(sort_by="priority", is_completed="false")
+            request.update(path="/tasks/", params=params)
+        elif op == "tasks_stats":
+            params = {}
+            if rng.random() < 0.3:
+                params = {"start": now.isoformat(), "end": (now + timedelta(days=30)).isoformat()}
+            request.update(path="/tasks/stats", params=params)
+        elif op == "locations_nearby":
+            # 7割は登録した場所の付近（エリア内に入ることが多い）、残りは生活圏のどこか
+            if user["locations"] and rng.random() < 0.7:
+                lat, lon, radius, _ = rng.choice(user["locations"])
+                lat, lon = _offset(lat, lon, rng, radius / 2)
+            else:
+                lat, lon = _offset(*user["home"], rng, 5000)
+            request.update(path="/locations/nearby", params={"latitude": round(lat, 6), "longitude": round(lon, 6)})
+        elif op == "task_update":
+            user = rng.choice(users_with_tasks)
+            body = rng.choice([
+                {"is_completed": rng.random() < 0.5},
+                {"priority": rng.randint(1, 3)},
+                {"deadline": (now + timedelta(hours=rng.randint(-48, 24 * 14))).isoformat()},
+            ])
+            request.update(user=user["id"], method="PUT", path=f"/tasks/{rng.choice(user['tasks'])}", json=body)
+        plan.append(request)
+    return plan
+
+
+# ---- 実行と集計 ----
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """線形補間のパーセンタイル（q は 0〜100）"""
+    if not sorted_values:
+        return float("nan")
+    position = (len(sorted_values) - 1) * q / 100
+    lower = math.floor(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+async def execute_plan(client: httpx.AsyncClient, plan, tokens: Dict[int, str], concurrency: int):
+    """plan を concurrency 本の並列で順に実行し、(操作ごとのレイテンシ, エラー件数, 経過秒) を返す"""
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Counter = Counter()
+    next_index = count()
+
+    async def worker():
+        while (i := next(next_index)) < len(plan):
+            request = plan[i]
+            headers = {"Authorization": f"Bearer {tokens[request['user']]}"} if request["user"] else None
+            start = time.perf_counter()
+            try:
+                response = await client.request(
+                    request["method"], API + request["path"], params=request["params"],
+                    json=request.get("json"), data=request.get("data"), headers=headers,
+                )
+                failed = response.status_code >= 400
+            except httpx.HTTPError:
+                failed = True
+            latencies[request["op"]].append(time.perf_counter() - start)
+            if failed:
+                errors[request["op"]] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - start
+
+
+def summarize(latencies: Dict[str, List[float]], errors: Counter, elapsed: float) -> Dict[str, Any]:
+    endpoints = {}
+    for op in REQUEST_MIX:
+        values = sorted(latencies.get(op, []))
+        if not values:
+            continue
+        endpoints[op] = {
+            "count": len(values),
+            "errors": errors.get(op, 0),
+            "mean_ms": sum(values) / len(values) * 1000,
+            "p50_ms": percentile(values, 50) * 1000,
+            "p95_ms": percentile(values, 95) * 1000,
+            "p99_ms": percentile(values, 99) * 1000,
+            "max_ms": values[-1] * 1000,
+        }
+    total = sum(len(v) for v in latencies.values())
+    return {
+        "requests": total,
+        "errors": sum(errors.values()),
+        "duration_s": elapsed,
+        "throughput_rps": total / elapsed if elapsed else 0.0,
+        "endpoints": endpoints,
+    }
+
+
+async def drive(client: httpx.AsyncClient, population, plan, warmup: int, concurrency: int) -> Dict[str, Any]:
+    from app.core.security import create_access_token
+
+    # ログイン以外はあらかじめ発行したトークンを使う（ログイン自体は login として計測する）
+    tokens = {user["id"]: create_access_token(user["id"]) for user in population.users}
+    await execute_plan(client, plan[:warmup], tokens, concurrency)
+    return summarize(*await execute_plan(client, plan[warmup:], tokens, concurrency))
+
+
+async def run_inprocess(population, plan, args) -> Dict[str, Any]:
+    """アプリを同じプロセスで動かす（ネットワークとサーバーのオーバーヘッドを含まない）"""
+    from main import app
+
+    async with app.router.lifespan_context(app):
+        # アプリの例外は送出せず 500 として数える（uvicorn で動かした場合と同じ扱い）
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=60) as client:
+            return await drive(client, population, plan, args.warmup, args.concurrency)
+
+
+def run_uvicorn(db_path: str, population, plan, args) -> Dict[str, Any]:
+    """uvicorn を別プロセスで起動し、HTTPで負荷をかける"""
+    from benchmarks.bench_db_mode import free_port, wait_until_ready
+
+    port = free_port()
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{db_path}")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning",
+         "--workers", str(args.workers)],
+        cwd=BACKEND_DIR, env=env,
+    )
+
+    async def run():
+        limits = httpx.Limits(max_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60) as client:
+            await wait_until_ready(client)
+            return await drive(client, population, plan, args.warmup, args.concurrency)
+
+    try:
+        return asyncio.run(run())
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def git_revision() -> Dict[str, Any]:
+    def git(*command):
+        result = subprocess.run(["git", *command], cwd=BACKEND_DIR, capture_output=True, text=True)
+        return result.stdout.strip() if result.returncode == 0 else None
+
+    status = git("status", "--porcelain", "--untracked-files=no")
+    return {"commit": git("rev-parse", "HEAD"), "dirty": bool(status) if status is not None else None}
+
+
+def print_run(name: str, run: Dict[str, Any]) -> None:
+    print(f"\n[{name}] {run['requests']} requests in {run['duration_s']:.1f}s "
+          f"= {run['throughput_rps']:.1f} req/s, errors {run['errors']}")
+    print(f"  {'endpoint':<20} {'count':>6} {'err':>4} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for op, stats in run["endpoints"].items():
+        print(f"  {op:<20} {stats['count']:>6} {stats['errors']:>4} {stats['p50_ms']:>8.2f} "
+              f"{stats['p95_ms']:>8.2f} {stats['p99_ms']:>8.2f} {stats['max_ms']:>8.2f}")
+
+
+# ---- 結果の比較 ----
+
+def compare(base_path: str, head_path: str, threshold: float) -> int:
+    with open(base_path) as f:
+        base = json.load(f)
+    with open(head_path) as f:
+        head = json.load(f)
+    print(f"base: {base['meta'].get('commit')}  head: {head['meta'].get('commit')}")
+    if base["meta"]["args"] != head["meta"]["args"]:
+        print("warning: the runs used different arguments; numbers may not be comparable")
+
+    regressions = []
+    for driver, head_run in head["runs"].items():
+        base_run = base["runs"].get(driver)
+        if base_run is None:
+            continue
+        change = (head_run["throughput_rps"] / base_run["throughput_rps"] - 1) * 100
+        print(f"\n[{driver}] throughput {base_run['throughput_rps']:.1f} -> {head_run['throughput_rps']:.1f} req/s ({change:+.1f}%)")
+        print(f"  {'endpoint':<20} {'p50 ms':>18} {'p95 ms':>18} {'p99 ms':>18}")
+        for op, head_stats in head_run["endpoints"].items():
+            base_stats = base_run["endpoints"].get(op)
+            if base_stats is None:
+                continue
+            cells = []
+            for key in ("p50_ms", "p95_ms", "p99_ms"):
+                delta = (head_stats[key] / base_stats[key] - 1) * 100
+                cells.append(f"{head_stats[key]:>8.2f} ({delta:+5.1f}%)")
+            print(f"  {op:<20} " + " ".join(cells))
+            if head_stats["p95_ms"] > base_stats["p95_ms"] * (1 + threshold / 100):
+                regressions.append(f"{driver}/{op}")
+    if regressions:
+        print(f"\np95 regressed by more than {threshold}%: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="v1 API の負荷試験")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--tasks-median", type=float, default=40, help="ユーザーあたりのタスク数の中央値")
+    parser.add_argument("--requests", type=int, default=5000, help="計測するリクエスト数（ウォームアップを除く）")
+    parser.add_argument("--warmup", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--driver", choices=["both", "inprocess", "uvicorn"], default="both")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn のワーカー数")
+    parser.add_argument("--db-async", action="store_true", help="DB_ASYNC=true で起動する")
+    parser.add_argument("--bcrypt-rounds", type=int, default=None, help="ログインのハッシュのコスト（省略時は設定のまま）")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--output", help="結果を保存するJSONファイル")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "HEAD"), help="保存した2つの結果を比較する")
+    parser.add_argument("--threshold", type=float, default=10.0, help="--compare で悪化とみなす p95 の増加率（%%）")
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(compare(*args.compare, args.threshold))
+
+    # 設定はアプリの読み込み前に決める（uvicorn の子プロセスにも引き継ぐ）
+    tmp = tempfile.mkdtemp(prefix="loadtest-")
+    template = os.path.join(tmp, "template.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'inprocess.db')}"
+    os.environ["DB_ASYNC"] = "true" if args.db_async else "false"
+    os.environ["DEADLINE_SCHEDULER_ENABLED"] = "false"
+    if args.bcrypt_rounds is not None:
+        os.environ["BCRYPT_ROUNDS"] = str(args.bcrypt_rounds)
+
+    try:
+        started = time.perf_counter()
+        population = seed_population(f"sqlite:///{template}", args.users, args.tasks_median, random.Random(args.seed))
+        print(f"seeded {population.counts} in {time.perf_counter() - started:.1f}s")
+        plan = build_plan(population, args.warmup + args.requests, random.Random(args.seed + 1))
+
+        runs = {}
+        if args.driver in ("both", "inprocess"):
+            shutil.copy(template, os.path.join(tmp, "inprocess.db"))
+            runs["inprocess"] = asyncio.run(run_inprocess(population, plan, args))
+            print_run("inprocess", runs["inprocess"])
+        if args.driver in ("both", "uvicorn"):
+            db_path = os.path.join(tmp, "uvicorn.db")
+            shutil.copy(template, db_path)
+            runs["uvicorn"] = run_uvicorn(db_path, population, plan, args)
+            print_run(f"uvicorn x{args.workers}", runs["uvicorn"])
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    if args.output:
+        from app.core.config import settings
+
+        result = {
+            "meta": {
+                **git_revision(),
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+                "bcrypt_rounds": settings.BCRYPT_ROUNDS,
+                "args": {k: v for k, v in vars(args).items() if k not in ("output", "compare", "threshold")},
+            },
+            "population": population.counts,
+            "runs": runs,
+        }
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"\nsaved {args.output}")
+
+
+if __name__ == "__main__":
+    main()
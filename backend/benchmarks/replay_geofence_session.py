@@ -0,0 +1,97 @@
+# ジオフェンス状態 (update_geofence_session) の軌跡リプレイ
+# 使い方: python -m benchmarks.replay_geofence_session [--locations 10000] [--fixes 2000]
+#
+# 合成した GPS 軌跡を1点ずつ流し、全件を calculate_distance で調べる参照実装と
+# 出入りイベントが一致することを確認する。あわせて1点あたりのSQL実行回数と時間を表示する。
+# SQL実行回数はエリア内に居る割合（場所の密度）で変わる。エリア内なら1回、エリア外なら探し直しを含めて2回以上。
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+from app.db.engine import create_db_engine
+from app.db.schema import sync_schema
+from app.models.location import Location
+from app.services.location_service import calculate_distance, update_geofence_session
+from benchmarks.bench_geofence_batch import random_walk
+from benchmarks.bench_nearby import seed
+
+
+def reference_events(locations, fixes):
+    """前回のエリア内に居る間は留まり、出たら最も近いエリアを探し直す参照実装"""
+    by_id = {loc.id: loc for loc in locations}
+    state = None
+    events = []
+    for i, (lat, lon) in enumerate(fixes):
+        if state is not None:
+            loc = by_id[state]
+            if calculate_distance(lat, lon, loc.latitude, loc.longitude) <= loc.radius:
+                continue
+        nearest, min_distance = None, float('inf')
+        for loc in locations:
+            distance = calculate_distance(lat, lon, loc.latitude, loc.longitude)
+            if distance <= loc.radius and distance < min_distance:
+                nearest, min_distance = loc.id, distance
+        if nearest != state:
+            events.append((i, state, nearest))
+            state = nearest
+    return events
+
+
+def replay(db, owner_id, fixes):
+    """軌跡を1点ずつ update_geofence_session に流し、(点の番号, 前回のエリア, 今回のエリア) の一覧を返す"""
+    events = []
+    for i, (lat, lon) in enumerate(fixes):
+        previous_id, location, _ = update_geofence_session(db, owner_id, lat, lon)
+        current_id = location.id if location else None
+        if current_id != previous_id:
+            events.append((i, previous_id, current_id))
+        db.commit()
+    return events
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ジオフェンス状態 (update_geofence_session) の軌跡リプレイ")
+    parser.add_argument("--locations", type=int, default=10000)
+    parser.add_argument("--fixes", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        sync_schema(engine)
+        db = sessionmaker(bind=engine)()
+        owner_id = seed(db, args.locations, rng)
+        locations = db.query(Location).filter(Location.owner_id == owner_id).all()
+        fixes = random_walk(rng, args.fixes)
+        expected = reference_events(locations, fixes)
+        db.expunge_all()
+
+        statements = 0
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def count_statement(*_):
+            nonlocal statements
+            statements += 1
+
+        start = time.perf_counter()
+        actual = replay(db, owner_id, fixes)
+        elapsed = time.perf_counter() - start
+
+        assert actual == expected, "session events differ from reference"
+        print(f"{args.locations} locations, {args.fixes} fixes, {len(actual)} transitions")
+        print(f"{elapsed / args.fixes * 1000:.3f} ms/fix, {statements / args.fixes:.2f} SQL statements/fix")
+        print("events identical")
+
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,8 @@
 # アプリケーションのエントリーポイント
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
 import os
@@ -11,30 +11,69 @@ import os
 load_dotenv()
 
 # DBモデルのインポート
-from app.db.base import Base
-from app.models import user, task, category, location
+from app.db.engine import create_async_db_engine, create_db_engine
+from app.db.schema import sync_schema
+from app.models import user, task, category, location, task_stats, geofence, sync, notification
 from app.core.config import settings
+from app.core.exception_handlers import register_exception_handlers
+from app.core import metrics
+from app.core.events import event_broker
+from app.core.security import password_hasher
+from app.services.notification_service import DeadlineScheduler, log_due
+from app.services.push_service import create_push_notifier
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # --- アプリケーション起動時の処理 ---
-    engine = create_engine(settings.SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+    engine = create_db_engine()
     
     # テーブル作成 (存在しない場合のみ)
-    Base.metadata.create_all(bind=engine)
+    sync_schema(engine)
     
     SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
     app.state.SessionLocal = SessionLocal
+
+    # 非同期DBモード: 主要エンドポイントは AsyncSession を使う
+    async_engine = None
+    if settings.DB_ASYNC:
+        async_engine = create_async_db_engine()
+        app.state.AsyncSessionLocal = async_sessionmaker(
+            async_engine, autoflush=False, expire_on_commit=False
+        )
+
+    # 変更通知のブローカー（/events/stream）
+    await event_broker.start()
+
+    # 期限通知のスケジューラ（タスクの変更は変更通知から受け取る）
+    # PUSH_GATEWAY_URLS があれば登録済みの全デバイスへプッシュ通知する
+    deadline_scheduler = None
+    push_notifier = None
+    if settings.DEADLINE_SCHEDULER_ENABLED:
+        push_notifier = create_push_notifier(SessionLocal)
+        deadline_scheduler = DeadlineScheduler(SessionLocal, event_broker, on_due=push_notifier or log_due)
+        await deadline_scheduler.start()
     
     yield
     # --- アプリケーション終了時の処理 ---
+    if deadline_scheduler is not None:
+        await deadline_scheduler.stop()
+    if push_notifier is not None:
+        await push_notifier.dispatcher.aclose()
+    await event_broker.stop()
+    password_hasher.shutdown()
+    engine.dispose()
+    if async_engine is not None:
+        await async_engine.dispose()
+    metrics.mark_process_dead()
 
 app = FastAPI(title="TaskMaster-Backend", lifespan=lifespan)
+register_exception_handlers(app)
 
 # CORS設定：Reactからアクセスできるようにする
 # 開発中はReactの実行URL (通常は http://localhost:5173 または http://localhost:3000) を許可します。
 origins = [
     os.getenv("FRONTEND_URL", "http://localhost:5173"),
+    "http://127.0.0.1:5173",
     "http://localhost:3000",
     "http://localhost:5174",
 ]
@@ -45,13 +84,24 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Last-Modified"],
 )
 
+# メトリクス：最後に追加したミドルウェアが最も外側になるため、CORSの処理も含めた時間を記録する
+if settings.METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+
 # ヘルスチェックエンドポイント (Render用)
 @app.get("/health")
 def health_check():
     return {"status": "healthy"}
 
+# Prometheus 形式のメトリクス（複数ワーカーの合計は PROMETHEUS_MULTIPROC_DIR を指定した場合のみ）
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    def metrics_endpoint():
+        return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
 # ルートエンドポイント
 @app.get("/")
 def read_root():
@@ -0,0 +1,27 @@
+# テスト共通のフィクスチャ
+# benchmarks/ の一致確認（参照実装との比較・実行計画の確認）を pytest から実行する。
+# 使い方: pip install -r requirements-dev.txt && python -m pytest（backend/ で実行）
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+import app.models  # noqa: F401  (sync_schema の対象にすべてのモデルを登録する)
+import app.models.location  # noqa: F401
+from app.db.engine import create_db_engine
+from app.db.schema import sync_schema
+
+
+@pytest.fixture
+def engine(tmp_path):
+    """テストごとの一時SQLite DB（アプリと同じエンジン設定・スキーマ）"""
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    sync_schema(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(engine):
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
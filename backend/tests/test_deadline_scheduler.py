@@ -0,0 +1,80 @@
+# 期限通知 (DeadlineQueue / DeadlineScheduler) が同じ期限で二度通知しないこと
+
+import asyncio
+import time
+from datetime import timedelta
+
+from sqlalchemy.orm import sessionmaker
+
+from app.core.events import EventHub, LocalBroker
+from app.models.task import Task
+from app.models.user import User
+from app.services.calendar_service import utc_now
+from app.services.notification_service import DeadlineQueue, DeadlineScheduler, DueNotification
+
+NOTIFY_BEFORE = timedelta(hours=1)
+
+
+def test_notified_deadline_is_not_rescheduled():
+    queue = DeadlineQueue(NOTIFY_BEFORE)
+    deadline = utc_now().replace(microsecond=0) + timedelta(minutes=30)
+    now = time.time()  # 通知時刻（期限の1時間前）は過ぎ、期限はまだ先
+
+    queue.schedule(7, 1, deadline)
+    assert queue.pop_due(now) == [DueNotification(1, 7, deadline)]
+
+    # タイトル変更などで読み直されても、期限が同じなら再通知しない
+    assert queue.schedule(7, 1, deadline) is False
+    assert queue.pop_due(now) == []
+    assert len(queue) == 0
+
+    # 期限が変わったら通知し直す
+    later = deadline + timedelta(minutes=10)
+    queue.schedule(7, 1, later)
+    assert queue.pop_due(now) == [DueNotification(1, 7, later)]
+
+
+def test_past_notify_time_is_skipped_at_load():
+    queue = DeadlineQueue(NOTIFY_BEFORE)
+    deadline = utc_now() + timedelta(minutes=30)
+    started_at = time.time()
+
+    assert queue.schedule(7, 1, deadline, skip_before=started_at) is False
+    assert queue.pop_due(started_at) == []
+    assert queue.schedule(7, 1, deadline) is False
+
+
+def test_scheduler_does_not_resend_after_restart_or_edit(engine, db):
+    user = User(username="alice", hashed_password="x")
+    db.add(user)
+    db.flush()
+    task = Task(title="report", owner_id=user.id, deadline=utc_now() + timedelta(minutes=30))
+    db.add(task)
+    db.commit()
+    task_id, user_id = task.id, user.id
+    session_factory = sessionmaker(bind=engine)
+    sent = []
+
+    async def on_due(notifications):
+        sent.extend(notifications)
+
+    async def run():
+        broker = LocalBroker(EventHub(queue_size=8, max_per_user=1))
+        scheduler = DeadlineScheduler(session_factory, broker, on_due=on_due, notify_before=NOTIFY_BEFORE)
+        await scheduler.start()
+        # 起動前に通知時刻を過ぎていたタスクは、起動後に編集されても通知しない
+        broker.hub.dispatch(user_id, [{"type": "change", "entity": "task", "id": task_id}])
+        await asyncio.sleep(0.2)
+        assert sent == []
+
+        # 起動後に作られたタスクは1回だけ通知し、編集（期限は同じ）では再通知しない
+        new_task = Task(title="call", owner_id=user_id, deadline=utc_now() + timedelta(minutes=30))
+        db.add(new_task)
+        db.commit()
+        for _ in range(2):
+            broker.hub.dispatch(user_id, [{"type": "change", "entity": "task", "id": new_task.id}])
+            await asyncio.sleep(0.2)
+        await scheduler.stop()
+        assert [notification.task_id for notification in sent] == [new_task.id]
+
+    asyncio.run(run())
@@ -0,0 +1,29 @@
+# 位置情報の一括判定 (evaluate_trace) が1点ずつの判定と同じ出入りイベントを返すこと
+
+import random
+
+import pytest
+
+from app.services import location_service
+from benchmarks.bench_geofence_batch import check_trace, random_walk
+from benchmarks.bench_nearby import seed
+
+
+# 場所が少ないと軌跡の大半がエリア外、多いと大半がエリア内になる
+@pytest.mark.parametrize("n_locations", [2000, 5000])
+def test_batch_matches_scalar_reference(db, n_locations):
+    rng = random.Random(7)
+    owner_id = seed(db, n_locations, rng)
+    for _ in range(3):
+        check_trace(db, owner_id, random_walk(rng, 300))
+
+
+def test_spread_trace_matches_scalar_reference_in_chunks(db, monkeypatch):
+    """地点・場所を小さく区切っても（区間の境目・候補の分割をまたいでも）結果が変わらない"""
+    monkeypatch.setattr(location_service, "TRACE_CHUNK_FIXES", 16)
+    monkeypatch.setattr(location_service, "TRACE_CHUNK_LOCATIONS", 64)
+    rng = random.Random(3)
+    owner_id = seed(db, 5000, rng)
+    # 首都圏全体に散らばった地点（候補が区間ごとに大きく変わる）
+    fixes = [(rng.uniform(35.2, 36.3), rng.uniform(139.2, 140.3)) for _ in range(200)]
+    check_trace(db, owner_id, fixes)
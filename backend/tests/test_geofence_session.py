@@ -0,0 +1,41 @@
+# ジオフェンス状態 (update_geofence_session) が参照実装と同じ出入りイベントを返すこと
+
+import random
+
+import pytest
+from sqlalchemy import event
+
+from app.models.location import Location
+from app.services.location_service import update_geofence_session
+from benchmarks.bench_geofence_batch import random_walk
+from benchmarks.bench_nearby import seed
+from benchmarks.replay_geofence_session import reference_events, replay
+
+
+@pytest.mark.parametrize("n_locations", [2000, 5000])
+def test_replay_matches_reference(db, n_locations):
+    rng = random.Random(11)
+    owner_id = seed(db, n_locations, rng)
+    locations = db.query(Location).filter(Location.owner_id == owner_id).all()
+    fixes = random_walk(rng, 500)
+    expected = reference_events(locations, fixes)
+    db.expunge_all()
+
+    assert expected, "trace never crosses a geofence"
+    assert replay(db, owner_id, fixes) == expected
+
+
+def test_staying_inside_runs_one_statement(engine, db):
+    """前回のエリア内に居続ける間は、状態と場所を読む1文だけで済む"""
+    owner_id = seed(db, 0, random.Random(0))
+    location = Location(name="home", latitude=35.0, longitude=139.0, radius=200.0, owner_id=owner_id)
+    db.add(location)
+    db.commit()
+    assert replay(db, owner_id, [(35.0, 139.0)]) == [(0, None, location.id)]
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    previous_id, current, _ = update_geofence_session(db, owner_id, 35.0005, 139.0005)
+
+    assert previous_id == current.id == location.id
+    assert len(statements) == 1
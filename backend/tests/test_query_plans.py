@@ -0,0 +1,23 @@
+# v1 エンドポイントのクエリに全件走査がないこと (benchmarks/explain_queries)
+# explain_queries は読み込み時に DATABASE_URL などを設定してアプリを読み込むため、別プロセスで実行する
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+@pytest.mark.parametrize("db_async", ["false", "true"])
+def test_no_full_table_scans(db_async):
+    env = {**os.environ, "DB_ASYNC": db_async, "PYTHONPATH": str(BACKEND_DIR)}
+    env.pop("DATABASE_URL", None)
+    result = subprocess.run(
+        [sys.executable, "-m", "benchmarks.explain_queries", "--users", "2", "--tasks", "300"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, timeout=600,
+    )
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert "no full table scans" in result.stdout
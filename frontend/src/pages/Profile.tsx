@@ -5,27 +5,34 @@ import { useAuth } from '../context/AuthContext';
 import { Button } from '../components/common/Button';
 import { Link } from 'react-router-dom';
 import { User, ArrowLeft, LogOut, Camera, Save } from 'lucide-react';
-import { apiClient } from '../utils/apiClient';
+import { apiClient, API_BASE_URL } from '../utils/apiClient';
+import type { User as UserData } from '../types';
 
 export const Profile: React.FC = () => {
     const { user, logout } = useAuth();
     const [displayName, setDisplayName] = useState(user?.display_name || '');
     const [avatarPreview, setAvatarPreview] = useState<string | null>(null);
+    const [avatarFile, setAvatarFile] = useState<File | null>(null);
     const [isSaving, setIsSaving] = useState(false);
     const [saveMessage, setSaveMessage] = useState('');
     const fileInputRef = useRef<HTMLInputElement>(null);
 
-    // ローカルストレージからアバターを読み込む
+    // 保存済みのアイコン画像（サーバーのサムネイル）を表示する
     useEffect(() => {
-        const savedAvatar = localStorage.getItem(`avatar_${user?.id}`);
-        if (savedAvatar) {
-            setAvatarPreview(savedAvatar);
+        if (user?.avatar_url) {
+            setAvatarPreview(`${API_BASE_URL}${user.avatar_url}`);
         }
         if (user?.display_name) {
             setDisplayName(user.display_name);
         }
     }, [user]);
 
+    // ローカルのプレビュー (blob: URL) は、差し替えたときと画面を離れるときに解放する
+    useEffect(() => {
+        if (!avatarPreview?.startsWith('blob:')) return;
+        return () => URL.revokeObjectURL(avatarPreview);
+    }, [avatarPreview]);
+
     // アイコン画像の選択
     const handleAvatarClick = () => {
         fileInputRef.current?.click();
@@ -35,12 +42,9 @@ export const Profile: React.FC = () => {
     const handleFileChange = (e: React.ChangeEvent<HTMLInputElement>) => {
         const file = e.target.files?.[0];
         if (file) {
-            const reader = new FileReader();
-            reader.onloadend = () => {
-                const base64 = reader.result as string;
-                setAvatarPreview(base64);
-            };
-            reader.readAsDataURL(file);
+            // 保存するまではローカルのファイルをプレビューする
+            setAvatarFile(file);
+            setAvatarPreview(URL.createObjectURL(file));
         }
     };
 
@@ -49,15 +53,20 @@ export const Profile: React.FC = () => {
         setIsSaving(true);
         setSaveMessage('');
         try {
-            // アバターをローカルストレージに保存
-            if (avatarPreview && user?.id) {
-                localStorage.setItem(`avatar_${user.id}`, avatarPreview);
+            // アイコン画像をアップロード（サーバー側でサムネイルを作成する）
+            if (avatarFile) {
+                const formData = new FormData();
+                formData.append('file', avatarFile);
+                const updated = await apiClient.postFormData<UserData>('/api/v1/users/me/avatar', formData, 'PUT');
+                setAvatarFile(null);
+                if (updated.avatar_url) {
+                    setAvatarPreview(`${API_BASE_URL}${updated.avatar_url}`);
+                }
             }
 
             // 表示名をバックエンドに保存
             await apiClient.put('/api/v1/users/me', {
                 display_name: displayName || null,
-                avatar_url: avatarPreview || null,
             });
 
             setSaveMessage('プロフィールを保存しました！');
@@ -23,7 +23,8 @@ export interface User {
   id: number;
   username: string;
   display_name?: string | null;
-  avatar_url?: string | null;
+  avatar_hash?: string | null;
+  avatar_url?: string | null; // 256px のサムネイル（API_BASE_URL からの相対パス）
 }
 
 // Legacy types for backward compatibility (can be removed later)
@@ -1,6 +1,6 @@
 // API Client for backend communication
 
-const API_BASE_URL = import.meta.env.VITE_API_BASE_URL || 'http://localhost:8000';
+export const API_BASE_URL = import.meta.env.VITE_API_BASE_URL || 'http://localhost:8000';
 
 interface RequestOptions {
   method: string;
@@ -76,7 +76,7 @@ class APIClient {
     });
   }
 
-  async postFormData<T>(endpoint: string, formData: FormData): Promise<T> {
+  async postFormData<T>(endpoint: string, formData: FormData, method: 'POST' | 'PUT' = 'POST'): Promise<T> {
     const url = `${this.baseURL}${endpoint}`;
     const token = this.getAuthToken();
 
@@ -86,7 +86,7 @@ class APIClient {
     }
 
     const config: RequestInit = {
-      method: 'POST',
+      method,
       headers,
       body: formData,
     };